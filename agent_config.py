@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Agent Configuration Registry
+Loads, validates and serializes the Deepgram Agent settings once, reloading
+them only when the file changes on disk
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_TYPES = ("Settings", "SettingsConfiguration", "AgentConfiguration")
+_TENANT_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def validate_agent_config(config):
+    """Raise ValueError if config is not a usable Deepgram Agent settings message"""
+    if not isinstance(config, dict):
+        raise ValueError("agent config must be a JSON object")
+    if config.get("type") not in SETTINGS_TYPES:
+        raise ValueError(f"agent config type must be one of {SETTINGS_TYPES}, got {config.get('type')!r}")
+
+    for section in ("audio", "agent"):
+        if section in config and not isinstance(config[section], dict):
+            raise ValueError(f"agent config '{section}' must be an object")
+    if config["type"] == "Settings":
+        for section in ("audio", "agent"):
+            if section not in config:
+                raise ValueError(f"agent config is missing '{section}'")
+
+    think = config.get("agent", {}).get("think", {})
+    functions = think.get("functions", config.get("functions", []))
+    if not isinstance(functions, list):
+        raise ValueError("agent config 'functions' must be a list")
+    for function in functions:
+        if not isinstance(function, dict) or not function.get("name"):
+            raise ValueError(f"agent function definition without a name: {function!r}")
+    return config
+
+
+class _ConfigEntry:
+    """One validated config and its serialized form"""
+
+    def __init__(self, config, path=None, mtime=None):
+        self.config = config
+        self.message = json.dumps(config)
+        self.path = path
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+
+
+class AgentConfigRegistry:
+    """Cache of validated, pre-serialized agent settings.
+
+    The base settings come from path (e.g. config.json); a tenant's variant
+    lives next to it as config.<tenant>.json. Files are re-checked at most
+    every reload_interval seconds and reloaded when their mtime changes; an
+    invalid edit is logged and the last good version keeps being served.
+    default is used when the base file does not exist.
+    """
+
+    def __init__(self, path="config.json", default=None, reload_interval=2.0):
+        self.path = path
+        self.default = validate_agent_config(default) if default is not None else None
+        self.reload_interval = reload_interval
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def message(self, tenant=None):
+        """Serialized settings ready to send to Deepgram"""
+        return self._entry(tenant).message
+
+    def config(self, tenant=None):
+        """Parsed settings; shared between calls, so treat as read-only"""
+        return self._entry(tenant).config
+
+    def _tenant_path(self, tenant):
+        if not tenant or not self.path:
+            return self.path
+        if not _TENANT_NAME.match(tenant):
+            raise ValueError(f"invalid tenant name: {tenant!r}")
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{tenant}{ext}"
+
+    def _entry(self, tenant):
+        entry = self._entries.get(tenant)
+        if entry is not None and time.monotonic() - entry.checked_at < self.reload_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None and time.monotonic() - entry.checked_at < self.reload_interval:
+                return entry
+            entry = self._load(tenant, entry)
+            self._entries[tenant] = entry
+            return entry
+
+    def _load(self, tenant, current):
+        path = self._tenant_path(tenant)
+        if not path:
+            return current or _ConfigEntry(self.default)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            if tenant:
+                logger.warning(f"No agent config for tenant {tenant!r}, using the default config")
+                return self._entry(None)
+            if self.default is None:
+                logger.error(f"{path} not found. Ensure it's in the same directory.")
+                raise
+            return current or _ConfigEntry(self.default)
+
+        if current is not None and current.mtime == mtime:
+            current.checked_at = time.monotonic()
+            return current
+
+        try:
+            with open(path, "r") as f:
+                config = validate_agent_config(json.load(f))
+        except (json.JSONDecodeError, ValueError) as e:
+            if current is None:
+                logger.error(f"Error loading {path}: {e}")
+                raise
+            logger.error(f"Error reloading {path}, keeping the previous config: {e}")
+            current.checked_at = time.monotonic()
+            return current
+
+        logger.info(f"Loaded agent config from {path}")
+        return _ConfigEntry(config, path, mtime)
@@ -5,7 +5,7 @@ Guaranteed working solution with proper error handling
 """
 
 import asyncio
-import base64
+import http
 import json
 import os
 import uuid
@@ -16,8 +16,17 @@ from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
 from dotenv import load_dotenv
 from cardiology_functions import FUNCTION_MAP
-import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from audio_buffer import AudioFrameQueue, AudioRingBuffer, framing_factory, ring_capacity_for
+from call_metrics import TurnLatencyTracker
+from twilio_media import MediaEnvelope, parse_twilio_message
+from deepgram_pool import AgentSessionPool
+from agent_config import AgentConfigRegistry
+from function_executor import FunctionExecutor
+from dial_queue import DialQueue, FINAL_STATUSES, twilio_call_placer
+from campaign import CampaignEngine, build_cohort
+from http_websocket import serve_http_and_websocket, stop_on_signals
+from static_response import StaticResponse
+from patient_registry import PatientRegistry, DEFAULT_PAGE_SIZE
 import urllib.parse
 
 load_dotenv()
@@ -32,6 +41,19 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "AC33f397657e06dac328e5d508
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "bbf7abc794d8f0eb9538350b501d033f")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "+17752586467")
 PUBLIC_URL = os.getenv("PUBLIC_URL", "https://medagg-voice-agent-production.up.railway.app")
+MEDIA_FRAMING = os.getenv("MEDIA_FRAMING", "adaptive")
+# A bad MEDIA_FRAMING fails here at startup instead of on every call
+new_framing = framing_factory(MEDIA_FRAMING)
+AUDIO_QUEUE_SIZE = int(os.getenv("AUDIO_QUEUE_SIZE", "50"))
+AUDIO_QUEUE_POLICY = os.getenv("AUDIO_QUEUE_POLICY", "drop_oldest")
+DEEPGRAM_POOL_SIZE = int(os.getenv("DEEPGRAM_POOL_SIZE", "2"))
+DEEPGRAM_POOL_IDLE_TIMEOUT = float(os.getenv("DEEPGRAM_POOL_IDLE_TIMEOUT", "10"))
+# HTTP routes and the Twilio WebSocket share this port
+PORT = int(os.getenv("PORT", "5000"))
+# Longest long-poll allowed on /calls/<call_id>?wait=N
+MAX_CALL_STATUS_WAIT = 25
+# Concurrent Twilio media streams this server takes on; campaigns dial only into free capacity
+MAX_MEDIA_BRIDGES = int(os.getenv("MAX_MEDIA_BRIDGES", "20"))
 
 # Initialize Twilio client
 try:
@@ -41,11 +63,14 @@ except Exception as e:
     logger.error(f"❌ Twilio initialization failed: {e}")
     twilio_client = None
 
-# Storage
-patients = []
+# Storage; registrations are kept up to PATIENT_REGISTRY_SIZE / PATIENT_REGISTRY_TTL
+patients = PatientRegistry()
 appointments = {}
 active_calls = {}
 
+# Deepgram Agent pool, set up by serve()
+agent_pool = None
+
 def sts_connect():
     """Connect to Deepgram Agent API"""
     api_key = os.getenv('DEEPGRAM_API_KEY')
@@ -58,45 +83,23 @@ def sts_connect():
     )
     return sts_ws
 
-def load_config():
-    """Load Deepgram Agent configuration for cardiology"""
-    try:
-        with open("config.json", "r") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading config: {e}")
-        # Return basic config if file doesn't exist
-        return {
-            "type": "AgentConfiguration",
-            "model": "nova-2",
-            "language": "en",
-            "instructions": "You are a cardiology AI assistant. Conduct UFE questionnaire for heart health assessment.",
-            "functions": []
-        }
+# Basic config used when config.json doesn't exist
+DEFAULT_AGENT_CONFIG = {
+    "type": "AgentConfiguration",
+    "model": "nova-2",
+    "language": "en",
+    "instructions": "You are a cardiology AI assistant. Conduct UFE questionnaire for heart health assessment.",
+    "functions": []
+}
 
-def execute_function_call(func_name, arguments):
-    """Execute function call"""
-    try:
-        if func_name in FUNCTION_MAP:
-            result = FUNCTION_MAP[func_name](**arguments)
-            logger.info(f"Function call result: {result}")
-            return result
-        else:
-            result = {"error": f"Unknown function: {func_name}"}
-            logger.error(result)
-            return result
-    except Exception as e:
-        logger.error(f"Error executing function {func_name}: {e}")
-        return {"error": f"Function execution failed: {str(e)}"}
+agent_config = AgentConfigRegistry("config.json", default=DEFAULT_AGENT_CONFIG)
 
-def create_function_call_response(func_id, func_name, result):
-    """Create function call response"""
-    return {
-        "type": "FunctionCallResponse",
-        "id": func_id,
-        "name": func_name,
-        "content": json.dumps(result)
-    }
+# Agent functions run off the event loop; sync functions share a bounded thread pool
+function_executor = FunctionExecutor(
+    FUNCTION_MAP,
+    max_workers=int(os.getenv("FUNCTION_WORKERS", "8")),
+    default_timeout=float(os.getenv("FUNCTION_TIMEOUT", "10")),
+)
 
 # WebSocket handler for Twilio
 class WebSocketHandler:
@@ -115,15 +118,18 @@ class WebSocketHandler:
     
     async def handle_twilio_connection(self, websocket):
         """Handle Twilio Media Stream WebSocket"""
+        call_sid = None
         try:
             # Start Deepgram Agent session
-            async with sts_connect() as sts_ws:
+            async with (agent_pool.session() if agent_pool else sts_connect()) as sts_ws:
                 # Send configuration
-                config_message = load_config()
-                await sts_ws.send(json.dumps(config_message))
+                await sts_ws.send(agent_config.message())
                 
                 # Start audio processing tasks
-                audio_queue = asyncio.Queue()
+                audio_queue = AudioFrameQueue(AUDIO_QUEUE_SIZE, AUDIO_QUEUE_POLICY)
+                inbuffer = AudioRingBuffer(ring_capacity_for(AUDIO_QUEUE_SIZE))
+                framing = new_framing()
+                latency = TurnLatencyTracker()
                 streamsid = None
                 
                 # Task to send audio to Deepgram
@@ -138,6 +144,7 @@ class WebSocketHandler:
                 # Task to receive responses from Deepgram
                 async def sts_receiver():
                     nonlocal streamsid
+                    envelope = None
                     try:
                         async for message in sts_ws:
                             if type(message) is str:
@@ -157,46 +164,52 @@ class WebSocketHandler:
                                     logger.error(f"Error parsing Deepgram message: {e}")
                             else:
                                 # Audio response from Deepgram
+                                latency.agent_audio()
                                 if streamsid:
-                                    media_message = {
-                                        "event": "media",
-                                        "streamSid": streamsid,
-                                        "media": {"payload": base64.b64encode(message).decode("ascii")}
-                                    }
-                                    await websocket.send(json.dumps(media_message))
+                                    if envelope is None or envelope.streamsid != streamsid:
+                                        envelope = MediaEnvelope(streamsid)
+                                    await websocket.send(envelope.encode(message))
                     except Exception as e:
                         logger.error(f"Error in sts_receiver: {e}")
                 
                 # Task to receive audio from Twilio
                 async def twilio_receiver():
-                    nonlocal streamsid
-                    BUFFER_SIZE = 20 * 160
-                    inbuffer = bytearray(b"")
+                    nonlocal streamsid, call_sid
                     
                     try:
                         async for message in websocket:
                             try:
-                                data = json.loads(message)
+                                event, track, payload, data = parse_twilio_message(message)
                                 
-                                if data["event"] == "start":
+                                if event == "media":
+                                    if track == "inbound":
+                                        try:
+                                            chunk = inbuffer.write_base64(payload)
+                                        except BufferError:
+                                            logger.warning("Twilio media chunk larger than the inbound buffer, dropping it")
+                                        else:
+                                            was_speaking = framing.speaking
+                                            if framing.observe(chunk):
+                                                latency.speech_ended(framing.last_speech_at)
+                                            elif framing.speaking and not was_speaking:
+                                                latency.speech_started()
+                                elif event == "start":
                                     logger.info("Call started - getting stream SID")
                                     start = data["start"]
                                     streamsid = start["streamSid"]
-                                elif data["event"] == "connected":
+                                    call_sid = start.get("callSid") or streamsid
+                                    active_calls[call_sid] = {'stream_sid': streamsid, 'started_at': datetime.now().isoformat()}
+                                    campaigns.call_connected(call_sid)
+                                elif event == "connected":
                                     continue
-                                elif data["event"] == "media":
-                                    media = data["media"]
-                                    chunk = base64.b64decode(media["payload"])
-                                    if media["track"] == "inbound":
-                                        inbuffer.extend(chunk)
-                                elif data["event"] == "stop":
+                                elif event == "stop":
                                     break
                                 
                                 # Send buffered audio to Deepgram
-                                while len(inbuffer) >= BUFFER_SIZE:
-                                    chunk = inbuffer[:BUFFER_SIZE]
-                                    await audio_queue.put(chunk)
-                                    inbuffer = inbuffer[BUFFER_SIZE:]
+                                frame = inbuffer.pop_frame(framing.frame_size)
+                                while frame is not None:
+                                    await audio_queue.push(frame)
+                                    frame = inbuffer.pop_frame(framing.frame_size)
                             except Exception as e:
                                 logger.error(f"Error processing Twilio message: {e}")
                                 break
@@ -211,9 +224,15 @@ class WebSocketHandler:
                     return_exceptions=True
                 )
                 
+                logger.info(f"Speech-to-agent latency ({framing.name} framing): {latency.histogram.snapshot()}")
+                logger.info(f"Inbound audio queue: {audio_queue.stats()}")
+                
         except Exception as e:
             logger.error(f"Error in Twilio WebSocket handler: {e}")
         finally:
+            if call_sid:
+                active_calls.pop(call_sid, None)
+                campaigns.call_ended(call_sid)
             try:
                 await websocket.close()
             except:
@@ -221,116 +240,196 @@ class WebSocketHandler:
     
     async def handle_function_call_request(self, decoded, sts_ws):
         """Handle function call requests from Deepgram Agent"""
-        try:
-            for function_call in decoded["functions"]:
-                func_name = function_call["name"]
-                func_id = function_call["id"]
-                arguments = json.loads(function_call["arguments"])
-                
-                logger.info(f"Function call: {func_name} (ID: {func_id}), arguments: {arguments}")
-                
-                result = execute_function_call(func_name, arguments)
-                
-                function_result = create_function_call_response(func_id, func_name, result)
-                await sts_ws.send(json.dumps(function_result))
-                logger.info(f"Sent function result: {function_result}")
-                
-        except Exception as e:
-            logger.error(f"Error calling function: {e}")
-            try:
-                error_result = create_function_call_response(
-                    func_id if "func_id" in locals() else "unknown",
-                    func_name if "func_name" in locals() else "unknown",
-                    {"error": f"Function call failed with: {str(e)}"}
-                )
-                await sts_ws.send(json.dumps(error_result))
-            except:
-                pass
+        await function_executor.handle_request(decoded, sts_ws)
 
 # HTTP Handler
-class HTTPHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
+class HTTPHandler:
+    """HTTP routes served next to the /twilio WebSocket on the same port"""
+    
+    def __init__(self):
+        # Pages and TwiML only depend on PUBLIC_URL: render them once, serve them from memory
+        self.home_page = StaticResponse(self.get_home_page(), 'text/html')
+        self.test_page = StaticResponse(self.get_test_page(), 'text/html')
+        self.twiml = StaticResponse(self.get_twiml(), 'text/xml')
+    
+    async def handle(self, method, path, headers, body):
+        """Return (status, headers, body) for one HTTP request"""
+        url = urllib.parse.urlsplit(path)
+        route = url.path
+        if method == 'GET':
+            if route.startswith('/calls/'):
+                return await self.call_status(route[len('/calls/'):], url.query)
+            elif route == '/campaigns':
+                return self.respond(200, 'application/json', json.dumps({'campaigns': campaigns.list()}))
+            elif route.startswith('/campaigns/'):
+                include_calls = urllib.parse.parse_qs(url.query).get('calls') == ['1']
+                campaign = campaigns.get(route[len('/campaigns/'):], include_calls)
+                if campaign is None:
+                    return self.respond(404, 'application/json', json.dumps({'error': 'Unknown campaign'}))
+                return self.respond(200, 'application/json', json.dumps(campaign))
+            elif route == '/':
+                return self.home_page.select(headers)
+            elif route == '/test':
+                return self.test_page.select(headers)
+            elif route == '/appointments':
+                return self.list_appointments(url.query)
+            elif route == '/patients':
+                return self.find_patient(None, url.query)
+            elif route.startswith('/patients/'):
+                return self.find_patient(route[len('/patients/'):], url.query)
+        elif method == 'POST':
+            if route == '/twiml':
+                # A call is about to connect; start Deepgram handshakes before Twilio opens the stream
+                if agent_pool:
+                    agent_pool.warm()
+                return self.twiml.select(headers)
+            elif route == '/register-patient':
+                return await self.register_patient(body)
+            elif route == '/campaigns':
+                return self.create_campaign(body)
+            elif route.startswith('/campaigns/'):
+                return self.control_campaign(*route[len('/campaigns/'):].partition('/')[::2])
+        return self.respond(404, 'text/plain', 'Not Found')
+    
+    def respond(self, status, content_type, content):
+        """Build a response tuple for the HTTP/WebSocket server"""
+        return http.HTTPStatus(status), [('Content-Type', content_type)], content.encode()
+    
+    async def register_patient(self, body):
         try:
-            if self.path == '/':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(self.get_home_page().encode())
-            elif self.path == '/test':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(self.get_test_page().encode())
-            elif self.path == '/appointments':
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                response = {
-                    'appointments': appointments,
-                    'patients': patients,
-                    'active_calls': len(active_calls)
-                }
-                self.wfile.write(json.dumps(response).encode())
-            else:
-                self.send_response(404)
-                self.end_headers()
-        except Exception as e:
-            logger.error(f"Error in GET request: {e}")
-            self.send_response(500)
-            self.end_headers()
+            patient_data = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            logger.error(f"Invalid patient registration: {e}")
+            return self.respond(400, 'application/json', json.dumps({'success': False, 'error': 'Invalid JSON body'}))
+        
+        # Validate phone number
+        phone = patient_data.get('phone_number', '')
+        if not phone.startswith('+91') and not phone.startswith('91'):
+            phone = '+91' + phone.lstrip('0')
+        
+        # Create patient
+        patient = {
+            'id': str(uuid.uuid4()),
+            'name': patient_data.get('name', ''),
+            'phone_number': phone,
+            'urgency': patient_data.get('urgency', 'medium'),
+            'created_at': datetime.now().isoformat()
+        }
+        
+        patients.add(patient)
+        
+        # Queue the Twilio call; dial workers place it without holding up the response
+        call_id = dial_queue.submit(phone, patient_id=patient['id'], patient_name=patient['name'])
+        patient['call_id'] = call_id
+        # Queued, or already failed when Twilio isn't configured
+        call = dial_queue.get(call_id)
+        
+        response = {
+            'success': True,
+            'patient_id': patient['id'],
+            'message': 'Patient registered successfully',
+            'call_initiated': call['status'] != 'failed',
+            'call_id': call_id,
+            'call_status': call['status'],
+            'call_error': call['error'],
+            'call_status_url': f"{PUBLIC_URL}/calls/{call_id}",
+            'voice_agent': 'Cardiology AI with Deepgram Agent API',
+            'public_url': PUBLIC_URL
+        }
+        return self.respond(200, 'application/json', json.dumps(response))
     
-    def do_POST(self):
+    def list_appointments(self, query):
+        """One page of registered patients; ?after=<next_cursor>&limit=N walks the rest"""
+        params = urllib.parse.parse_qs(query)
         try:
-            if self.path == '/twiml':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/xml')
-                self.end_headers()
-                twiml = self.get_twiml()
-                self.wfile.write(twiml.encode())
-            elif self.path == '/register-patient':
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                patient_data = json.loads(post_data.decode('utf-8'))
-                
-                # Validate phone number
-                phone = patient_data.get('phone_number', '')
-                if not phone.startswith('+91') and not phone.startswith('91'):
-                    phone = '+91' + phone.lstrip('0')
-                
-                # Create patient
-                patient = {
-                    'id': str(uuid.uuid4()),
-                    'name': patient_data.get('name', ''),
-                    'phone_number': phone,
-                    'urgency': patient_data.get('urgency', 'medium'),
-                    'created_at': datetime.now().isoformat()
-                }
-                
-                patients.append(patient)
-                
-                # Make Twilio call
-                call_success = make_twilio_call(patient)
-                
-                response = {
-                    'success': True,
-                    'patient_id': patient['id'],
-                    'message': 'Patient registered successfully',
-                    'call_initiated': call_success,
-                    'voice_agent': 'Cardiology AI with Deepgram Agent API',
-                    'public_url': PUBLIC_URL
-                }
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
-            else:
-                self.send_response(404)
-                self.end_headers()
-        except Exception as e:
-            logger.error(f"Error in POST request: {e}")
-            self.send_response(500)
-            self.end_headers()
+            limit = int(params.get('limit', [DEFAULT_PAGE_SIZE])[0])
+            after = int(params['after'][0]) if 'after' in params else None
+        except ValueError:
+            return self.respond(400, 'application/json', json.dumps({'error': 'after and limit must be integers'}))
+        page, next_cursor = patients.page(after, limit)
+        response = {
+            'appointments': appointments,
+            'patients': page,
+            'next_cursor': next_cursor,
+            'total_patients': len(patients),
+            'active_calls': len(active_calls)
+        }
+        return self.respond(200, 'application/json', json.dumps(response))
+    
+    def find_patient(self, patient_id, query):
+        """Patient by ID, or by ?phone_number= (newest registration)"""
+        if patient_id:
+            patient = patients.get(patient_id)
+        else:
+            # A literal + in the query is the country code, not an encoded space
+            phone = urllib.parse.parse_qs(query.replace('+', '%2B')).get('phone_number', [''])[0]
+            patient = patients.find_by_phone(phone) if phone else None
+        if patient is None:
+            return self.respond(404, 'application/json', json.dumps({'error': 'Unknown patient'}))
+        return self.respond(200, 'application/json', json.dumps(patient))
+    
+    async def call_status(self, call_id, query):
+        """Dial status of a queued call; ?wait=N long-polls up to N seconds for a change"""
+        try:
+            wait = min(float(urllib.parse.parse_qs(query).get('wait', ['0'])[0]), MAX_CALL_STATUS_WAIT)
+        except ValueError:
+            wait = 0
+        job = dial_queue.get(call_id)
+        if job is not None and wait > 0 and job['status'] not in FINAL_STATUSES:
+            job = await self.wait_for_call_change(call_id, job, wait)
+        if job is None:
+            return self.respond(404, 'application/json', json.dumps({'error': f'Unknown call {call_id}'}))
+        return self.respond(200, 'application/json', json.dumps(job))
+    
+    async def wait_for_call_change(self, call_id, job, timeout):
+        """The call's next status, or its current one after timeout seconds.
+        
+        The dial worker resolves a future on the event loop, so a poller holds
+        no thread while it waits.
+        """
+        loop = asyncio.get_running_loop()
+        changed = loop.create_future()
+        
+        def on_change(snapshot):
+            loop.call_soon_threadsafe(lambda: changed.done() or changed.set_result(snapshot))
+        
+        dial_queue.subscribe(call_id, on_change)
+        try:
+            # The status may have moved on before the subscription
+            current = dial_queue.get(call_id)
+            if current is None or current['status'] != job['status']:
+                return current
+            return await asyncio.wait_for(changed, timeout)
+        except asyncio.TimeoutError:
+            return dial_queue.get(call_id) or job
+        finally:
+            dial_queue.unsubscribe(call_id, on_change)
+    
+    def create_campaign(self, body):
+        """Start a call campaign for an uploaded cohort, or for registered patients filtered by urgency"""
+        try:
+            spec = json.loads(body.decode('utf-8'))
+            cohort = build_cohort(spec.get('cohort', patients), urgency=spec.get('urgency'))
+            campaign = campaigns.create(
+                spec.get('name'), cohort,
+                windows=spec.get('windows'),
+                max_concurrent=spec.get('max_concurrent'),
+                cps=spec.get('cps'),
+                start_at=spec.get('start_at'),
+            )
+        except (UnicodeDecodeError, json.JSONDecodeError, AttributeError, TypeError, ValueError) as e:
+            logger.error(f"Invalid campaign: {e}")
+            return self.respond(400, 'application/json', json.dumps({'success': False, 'error': str(e)}))
+        return self.respond(200, 'application/json', json.dumps({'success': True, 'campaign': campaign}))
+    
+    def control_campaign(self, campaign_id, action):
+        """Pause, resume or cancel a campaign"""
+        if action not in ('pause', 'resume', 'cancel'):
+            return self.respond(404, 'text/plain', 'Not Found')
+        campaign = getattr(campaigns, action)(campaign_id)
+        if campaign is None:
+            return self.respond(404, 'application/json', json.dumps({'error': 'Unknown campaign'}))
+        return self.respond(200, 'application/json', json.dumps({'success': True, 'campaign': campaign}))
     
     def get_home_page(self):
         return f'''
@@ -464,7 +563,7 @@ class HTTPHandler(BaseHTTPRequestHandler):
                                 <div class="result success">
                                     <h3>✅ Registration Successful!</h3>
                                     <p><strong>Patient ID:</strong> ${{result.patient_id}}</p>
-                                    <p><strong>Call Status:</strong> ${{result.call_initiated ? 'Initiated' : 'Failed'}}</p>
+                                    <p><strong>Call Status:</strong> ${{result.call_status}} (call ID ${{result.call_id}})</p>
                                     <p><strong>Voice Agent:</strong> Cardiology AI with Deepgram Agent API</p>
                                     <p>You will receive a call with comprehensive cardiology evaluation and appointment booking!</p>
                                 </div>
@@ -514,86 +613,45 @@ class HTTPHandler(BaseHTTPRequestHandler):
             response.hangup()
             return str(response)
 
-def make_twilio_call(patient):
-    """Make Twilio call"""
-    try:
-        if not twilio_client:
-            logger.error("Twilio client not initialized")
-            return False
-            
-        # Create TwiML URL
-        twiml_url = f"{PUBLIC_URL}/twiml"
-        
-        logger.info(f"📞 Making call to {patient['phone_number']} for {patient['name']}")
-        logger.info(f"🔗 TwiML URL: {twiml_url}")
-        logger.info(f"🔑 Using Twilio Account: {TWILIO_ACCOUNT_SID}")
-        
-        # Check if phone number is verified for trial accounts
-        if patient['phone_number'].startswith('+91'):
-            logger.warning("⚠️ Indian number detected. Trial accounts may need verification.")
-        
-        # Use Twilio client to make the call
-        call = twilio_client.calls.create(
-            url=twiml_url,
-            to=patient['phone_number'],
-            from_=TWILIO_PHONE_NUMBER
-        )
-        
-        logger.info(f"✅ Call initiated successfully!")
-        logger.info(f"📋 Call SID: {call.sid}")
-        
-        return True
-            
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"❌ Error making call: {error_msg}")
-        
-        if "401" in error_msg or "Authenticate" in error_msg:
-            logger.error("🔑 Authentication failed. Check Twilio credentials.")
-        elif "unverified" in error_msg.lower():
-            logger.error("📱 Phone number needs verification for trial accounts.")
-        elif "not a valid phone number" in error_msg.lower():
-            logger.error("📱 Invalid phone number format.")
-        
-        return False
-
-# Global WebSocket handler
+# Global WebSocket and HTTP handlers
 ws_handler = WebSocketHandler()
+http_handler = HTTPHandler()
 
-def start_http_server():
-    """Start HTTP server in background thread"""
-    def run_http():
-        try:
-            server = HTTPServer(('0.0.0.0', 5001), HTTPHandler)
-            logger.info("🌐 HTTP server started on port 5001")
-            server.serve_forever()
-        except Exception as e:
-            logger.error(f"Error starting HTTP server: {e}")
-    
-    http_thread = threading.Thread(target=run_http, daemon=True)
-    http_thread.start()
-    return http_thread
+# Outbound calls are placed by dial workers, paced to the account's Twilio CPS limit
+dial_queue = DialQueue(
+    twilio_call_placer(twilio_client, TWILIO_PHONE_NUMBER, f"{PUBLIC_URL}/twiml"),
+    account=TWILIO_ACCOUNT_SID,
+)
 
-def start_websocket_server():
-    """Start WebSocket server in background thread"""
-    def run_websocket():
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Start WebSocket server
-            server = loop.run_until_complete(websockets.serve(ws_handler.handle_websocket, "0.0.0.0", 5000))
-            logger.info("🎤 WebSocket server started on port 5000")
-            loop.run_forever()
-        except Exception as e:
-            logger.error(f"Error starting WebSocket server: {e}")
+# Bulk call campaigns feed the dial queue, pacing against free media-bridge capacity
+campaigns = CampaignEngine(dial_queue, capacity=lambda: MAX_MEDIA_BRIDGES - len(active_calls))
+
+async def serve():
+    """Serve HTTP routes and the /twilio WebSocket on PORT until SIGINT or SIGTERM"""
+    global agent_pool
+    
+    if os.getenv('DEEPGRAM_API_KEY') and DEEPGRAM_POOL_SIZE > 0:
+        agent_pool = AgentSessionPool(sts_connect, size=DEEPGRAM_POOL_SIZE, idle_timeout=DEEPGRAM_POOL_IDLE_TIMEOUT)
+        agent_pool.start()
+    dial_queue.start()
+    campaigns.start()
     
-    websocket_thread = threading.Thread(target=run_websocket, daemon=True)
-    websocket_thread.start()
-    return websocket_thread
+    stop = stop_on_signals(asyncio.get_running_loop())
+    async with serve_http_and_websocket(ws_handler.handle_websocket, http_handler.handle, "0.0.0.0", PORT,
+                                        is_websocket_path=lambda path: path == "/twilio"):
+        logger.info(f"🌐 HTTP and WebSocket server started on port {PORT}")
+        await stop
+        logger.info("Shutting down server, closing active calls...")
+    
+    if agent_pool:
+        await agent_pool.close()
+    campaigns.shutdown(wait=False)
+    dial_queue.shutdown(wait=False)
+    function_executor.shutdown()
+    logger.info("Server stopped")
 
 def main():
-    """Main function to start both servers"""
+    """Main function to start the server"""
     logger.info("🏥 MedAgg Healthcare - CARDIOLOGY VOICE AGENT")
     logger.info("=" * 70)
     logger.info("🎤 Deepgram Agent API with advanced function calling")
@@ -606,16 +664,10 @@ def main():
     logger.info("💰 Deepgram Agent API: ✅ Configured with advanced capabilities")
     logger.info("=" * 70)
     
-    # Start both servers
     try:
-        start_http_server()
-        start_websocket_server()
-        
-        # Keep main thread alive
-        while True:
-            pass
+        asyncio.run(serve())
     except KeyboardInterrupt:
-        logger.info("Shutting down servers...")
+        logger.info("Shutting down server...")
     except Exception as e:
         logger.error(f"Error in main: {e}")
 
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Inbound Audio Ring Buffer
+Preallocated buffer that turns Twilio media payloads into Deepgram frames
+without rebuilding a bytearray for every frame, plus the framing strategies
+that decide how much audio goes into each frame
+"""
+
+import abc
+import asyncio
+import binascii
+import functools
+import time
+
+# Twilio sends 20 ms of 8 kHz mu-law per media event
+TWILIO_CHUNK_SIZE = 160
+CHUNK_DURATION_MS = 20
+
+# Fixed framing modes accepted by MEDIA_FRAMING, in milliseconds
+FIXED_FRAMING_MS = (20, 40, 100)
+MAX_FRAME_SIZE = max(FIXED_FRAMING_MS) // CHUNK_DURATION_MS * TWILIO_CHUNK_SIZE
+
+# Outbound audio queue between twilio_receiver and sts_sender
+DEFAULT_QUEUE_SIZE = 50
+QUEUE_POLICIES = ("drop_oldest", "coalesce", "backpressure")
+
+
+def ring_capacity_for(queue_size, frame_size=MAX_FRAME_SIZE):
+    """Ring size that keeps every queued frame, the frame being sent and the one being filled valid"""
+    return (queue_size + 2) * frame_size + TWILIO_CHUNK_SIZE
+
+
+class AudioRingBuffer:
+    """Fixed-size ring buffer handing out memoryview frames.
+
+    Frames returned by pop_frame() point into the ring and stay valid until
+    another `capacity` bytes have been written. The number of frames in
+    flight is bounded by AudioFrameQueue, and ring_capacity_for() sizes the
+    ring to cover them, so the writer never overwrites audio still queued.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or ring_capacity_for(DEFAULT_QUEUE_SIZE)
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        # Monotonic byte counters; positions in the ring are taken modulo capacity
+        self._written = 0
+        self._popped = 0
+
+    def __len__(self):
+        """Bytes written but not yet handed out as frames"""
+        return self._written - self._popped
+
+    def write(self, data):
+        """Copy raw audio into the ring"""
+        size = len(data)
+        if size > self.capacity:
+            raise BufferError(f"chunk of {size} bytes exceeds ring capacity ({self.capacity} bytes)")
+
+        start = self._written % self.capacity
+        first = min(size, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if first < size:
+            self._view[:size - first] = data[first:]
+        self._written += size
+        return size
+
+    def write_base64(self, payload):
+        """Decode a base64 media payload, append it to the ring and return the raw audio"""
+        chunk = binascii.a2b_base64(payload)
+        self.write(chunk)
+        return chunk
+
+    def pop_frame(self, size):
+        """Return the next frame as a memoryview, or None if not enough audio is buffered.
+
+        A frame never wraps around the end of the ring; if the requested size
+        would cross it, the shorter contiguous tail is returned instead.
+        """
+        if len(self) < size:
+            return None
+
+        start = self._popped % self.capacity
+        size = min(size, self.capacity - start)
+        self._popped += size
+        return self._view[start:start + size]
+
+    def reset(self):
+        """Drop all buffered audio"""
+        self._written = self._popped = 0
+
+
+class AudioFrameQueue(asyncio.Queue):
+    """Bounded queue of inbound frames with an explicit overflow policy.
+
+    When the queue is full because Deepgram is not keeping up, push() applies
+    one of QUEUE_POLICIES:
+
+    - drop_oldest: discard the oldest queued frame so the freshest audio is sent
+    - coalesce: collapse the queued frames into one frame copied out of the
+      ring, so Deepgram catches up with fewer, larger sends; only audio beyond
+      maxsize * MAX_FRAME_SIZE bytes of backlog is discarded
+    - backpressure: wait for space, which stops reading from the Twilio socket
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, policy="drop_oldest"):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown audio queue policy: {policy}")
+        if maxsize <= 0:
+            raise ValueError("Audio queue must be bounded")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.max_coalesced_bytes = maxsize * MAX_FRAME_SIZE
+        self.max_depth = 0
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+        self.coalesced_frames = 0
+        self.backpressure_waits = 0
+
+    async def push(self, frame):
+        """Enqueue a frame, applying the overflow policy if the queue is full"""
+        if self.full():
+            if self.policy == "backpressure":
+                self.backpressure_waits += 1
+                await self.put(frame)
+                self.max_depth = max(self.max_depth, self.qsize())
+                return
+            if self.policy == "coalesce":
+                self._coalesce(frame)
+                return
+            dropped = self.get_nowait()
+            self.dropped_frames += 1
+            self.dropped_bytes += len(dropped)
+
+        self.put_nowait(frame)
+        self.max_depth = max(self.max_depth, self.qsize())
+
+    def _coalesce(self, frame):
+        """Collapse every queued frame plus the new one into a single copied frame"""
+        frames = [self.get_nowait() for _ in range(self.qsize())]
+        frames.append(frame)
+        merged = b"".join(frames)
+        # Copying releases the ring views; cap the copy so a long stall stays bounded
+        if len(merged) > self.max_coalesced_bytes:
+            self.dropped_bytes += len(merged) - self.max_coalesced_bytes
+            merged = merged[-self.max_coalesced_bytes:]
+        self.coalesced_frames += len(frames) - 1
+        self.put_nowait(merged)
+
+    def stats(self):
+        """Per-call queue depth and overflow counters"""
+        return {
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "depth": self.qsize(),
+            "max_depth": self.max_depth,
+            "dropped_frames": self.dropped_frames,
+            "dropped_bytes": self.dropped_bytes,
+            "coalesced_frames": self.coalesced_frames,
+            "backpressure_waits": self.backpressure_waits,
+        }
+
+
+def _mulaw_level(byte):
+    """Linear magnitude of a mu-law sample, scaled down to fit in one byte"""
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    mantissa = byte & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return magnitude >> 7
+
+
+# bytes.translate() table so a chunk's energy is a single C-level sum()
+MULAW_LEVEL_TABLE = bytes(_mulaw_level(b) for b in range(256))
+
+
+class FramingStrategy(abc.ABC):
+    """Base framing strategy with a simple energy-based speech detector.
+
+    observe() is fed every inbound chunk and returns True on the chunk where
+    the caller is judged to have stopped speaking; last_speech_at then holds
+    the monotonic time of the last voiced chunk.
+    """
+
+    name = "base"
+
+    def __init__(self, speech_level=4, hangover_ms=300):
+        self.speech_level = speech_level
+        self.hangover_chunks = max(1, hangover_ms // CHUNK_DURATION_MS)
+        self.speaking = False
+        self.last_speech_at = None
+        self._silent_chunks = 0
+
+    @property
+    @abc.abstractmethod
+    def frame_size(self):
+        """Bytes of audio to send in the next frame"""
+
+    def observe(self, chunk, timestamp=None):
+        """Update the speech state with one chunk of mu-law audio"""
+        if not chunk:
+            return False
+        level = sum(chunk.translate(MULAW_LEVEL_TABLE)) / len(chunk)
+        if level >= self.speech_level:
+            self.speaking = True
+            self.last_speech_at = timestamp if timestamp is not None else time.monotonic()
+            self._silent_chunks = 0
+            return False
+
+        if self.speaking:
+            self._silent_chunks += 1
+            if self._silent_chunks >= self.hangover_chunks:
+                self.speaking = False
+                return True
+        return False
+
+
+class FixedFraming(FramingStrategy):
+    """Always send frames of the same duration"""
+
+    def __init__(self, frame_ms=20, **kwargs):
+        super().__init__(**kwargs)
+        self.name = f"fixed-{frame_ms}ms"
+        self._frame_size = frame_ms // CHUNK_DURATION_MS * TWILIO_CHUNK_SIZE
+
+    @property
+    def frame_size(self):
+        return self._frame_size
+
+
+class AdaptiveFraming(FramingStrategy):
+    """Small frames while the caller speaks, larger batches during silence"""
+
+    name = "adaptive"
+
+    def __init__(self, speech_frame_ms=20, silence_frame_ms=100, **kwargs):
+        super().__init__(**kwargs)
+        self.speech_frame_size = speech_frame_ms // CHUNK_DURATION_MS * TWILIO_CHUNK_SIZE
+        self.silence_frame_size = silence_frame_ms // CHUNK_DURATION_MS * TWILIO_CHUNK_SIZE
+
+    @property
+    def frame_size(self):
+        return self.speech_frame_size if self.speaking else self.silence_frame_size
+
+
+def create_framing(mode="adaptive"):
+    """Build a framing strategy from a MEDIA_FRAMING value ("adaptive", "20", "40", "100")"""
+    mode = str(mode).strip().lower().removesuffix("ms")
+    if mode == "adaptive":
+        return AdaptiveFraming()
+    try:
+        frame_ms = int(mode)
+    except ValueError:
+        raise ValueError(f"Unknown media framing mode: {mode}")
+    if frame_ms not in FIXED_FRAMING_MS:
+        raise ValueError(f"Fixed media framing must be one of {FIXED_FRAMING_MS} ms, got {frame_ms}")
+    return FixedFraming(frame_ms)
+
+
+def framing_factory(mode="adaptive"):
+    """Validate a MEDIA_FRAMING value once; returns a callable building a fresh strategy for each call"""
+    create_framing(mode)
+    return functools.partial(create_framing, mode)
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from database import get_db, Patient, Hospital, Appointment, CallSession
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, async_session_scope, pool_status, Patient, Hospital, Appointment, CallSession, CallStatusEnum
 from schemas import PatientResponse, HospitalResponse, AppointmentResponse, CallSessionResponse
 from services import PatientService, HospitalService, AppointmentService, CallService, EmailService
+from services.appointment_service import SlotUnavailableError
 from typing import List, Optional
 from datetime import datetime, timedelta
 import json
@@ -23,10 +25,10 @@ async def get_all_patients(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all patients with pagination and search"""
-    query = db.query(Patient)
+    query = select(Patient)
     
     if search:
         query = query.filter(
@@ -35,13 +37,44 @@ async def get_all_patients(
             Patient.location.ilike(f"%{search}%")
         )
     
-    patients = query.offset(skip).limit(limit).all()
+    patients = (await db.scalars(query.offset(skip).limit(limit))).all()
     return [PatientResponse.from_orm(patient) for patient in patients]
 
+@admin_router.get("/patients/cohort")
+async def export_call_cohort(
+    language: Optional[str] = None,
+    sub_category: Optional[str] = None,
+    registered_after: Optional[datetime] = None,
+    limit: int = Query(10000, ge=1, le=100000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Export patients as a call campaign cohort, ready to POST to the voice agent's /campaigns"""
+    query = select(Patient.id, Patient.name, Patient.phone_number, Patient.language_preference)
+
+    if language:
+        query = query.filter(Patient.language_preference == language)
+    if sub_category:
+        query = query.filter(Patient.sub_category == sub_category)
+    if registered_after:
+        query = query.filter(Patient.created_at >= registered_after)
+
+    rows = (await db.execute(query.order_by(Patient.id).limit(limit))).all()
+    return {
+        "cohort": [
+            {
+                "patient_id": row.id,
+                "name": row.name,
+                "phone_number": row.phone_number,
+                "language": row.language_preference.value if row.language_preference else None
+            }
+            for row in rows
+        ]
+    }
+
 @admin_router.get("/patients/{patient_id}", response_model=PatientResponse)
-async def get_patient_details(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient_details(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get detailed patient information"""
-    patient = patient_service.get_patient(patient_id)
+    patient = await patient_service.get_patient(patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return PatientResponse.from_orm(patient)
@@ -50,18 +83,18 @@ async def get_patient_details(patient_id: int, db: Session = Depends(get_db)):
 async def update_patient(
     patient_id: int, 
     update_data: dict, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update patient information"""
-    patient = patient_service.update_patient(patient_id, update_data)
+    patient = await patient_service.update_patient(patient_id, update_data)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return PatientResponse.from_orm(patient)
 
 @admin_router.delete("/patients/{patient_id}")
-async def delete_patient(patient_id: int, db: Session = Depends(get_db)):
+async def delete_patient(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete patient"""
-    success = patient_service.delete_patient(patient_id)
+    success = await patient_service.delete_patient(patient_id)
     if not success:
         raise HTTPException(status_code=404, detail="Patient not found")
     return {"message": "Patient deleted successfully"}
@@ -73,17 +106,17 @@ async def get_all_hospitals(
     limit: int = Query(100, ge=1, le=1000),
     location: Optional[str] = None,
     specialization: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all hospitals with filtering"""
     hospitals = await hospital_service.get_hospitals(specialization, location)
     return [HospitalResponse.from_orm(hospital) for hospital in hospitals[skip:skip+limit]]
 
 @admin_router.post("/hospitals", response_model=HospitalResponse)
-async def create_hospital(hospital_data: dict, db: Session = Depends(get_db)):
+async def create_hospital(hospital_data: dict, db: AsyncSession = Depends(get_async_db)):
     """Create new hospital"""
     try:
-        hospital = hospital_service.create_hospital(hospital_data)
+        hospital = await hospital_service.create_hospital(hospital_data)
         return HospitalResponse.from_orm(hospital)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -92,18 +125,18 @@ async def create_hospital(hospital_data: dict, db: Session = Depends(get_db)):
 async def update_hospital(
     hospital_id: int, 
     update_data: dict, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update hospital information"""
-    hospital = hospital_service.update_hospital(hospital_id, update_data)
+    hospital = await hospital_service.update_hospital(hospital_id, update_data)
     if not hospital:
         raise HTTPException(status_code=404, detail="Hospital not found")
     return HospitalResponse.from_orm(hospital)
 
 @admin_router.delete("/hospitals/{hospital_id}")
-async def delete_hospital(hospital_id: int, db: Session = Depends(get_db)):
+async def delete_hospital(hospital_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete hospital"""
-    success = hospital_service.delete_hospital(hospital_id)
+    success = await hospital_service.delete_hospital(hospital_id)
     if not success:
         raise HTTPException(status_code=404, detail="Hospital not found")
     return {"message": "Hospital deleted successfully"}
@@ -118,10 +151,10 @@ async def get_all_appointments(
     patient_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all appointments with filtering"""
-    query = db.query(Appointment)
+    query = select(Appointment)
     
     if status:
         query = query.filter(Appointment.status == status)
@@ -134,13 +167,13 @@ async def get_all_appointments(
     if end_date:
         query = query.filter(Appointment.appointment_date <= end_date)
     
-    appointments = query.offset(skip).limit(limit).all()
+    appointments = (await db.scalars(query.offset(skip).limit(limit))).all()
     return [AppointmentResponse.from_orm(appointment) for appointment in appointments]
 
 @admin_router.get("/appointments/{appointment_id}", response_model=AppointmentResponse)
-async def get_appointment_details(appointment_id: int, db: Session = Depends(get_db)):
+async def get_appointment_details(appointment_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get detailed appointment information"""
-    appointment = appointment_service.get_appointment(appointment_id)
+    appointment = await appointment_service.get_appointment(appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return AppointmentResponse.from_orm(appointment)
@@ -150,27 +183,33 @@ async def update_appointment_status(
     appointment_id: int,
     status: str,
     notes: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update appointment status"""
     from database import AppointmentStatusEnum
     try:
         status_enum = AppointmentStatusEnum(status)
-        appointment = appointment_service.update_appointment_status(appointment_id, status_enum, notes)
-        if not appointment:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        return AppointmentResponse.from_orm(appointment)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid status")
+    try:
+        appointment = await appointment_service.update_appointment_status(appointment_id, status_enum, notes)
+    except SlotUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not appointment:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return AppointmentResponse.from_orm(appointment)
 
 @admin_router.put("/appointments/{appointment_id}/reschedule")
 async def reschedule_appointment(
     appointment_id: int,
     new_date: datetime,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reschedule appointment"""
-    appointment = appointment_service.reschedule_appointment(appointment_id, new_date)
+    try:
+        appointment = await appointment_service.reschedule_appointment(appointment_id, new_date)
+    except SlotUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return AppointmentResponse.from_orm(appointment)
@@ -179,10 +218,10 @@ async def reschedule_appointment(
 async def cancel_appointment(
     appointment_id: int,
     reason: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel appointment"""
-    appointment = appointment_service.cancel_appointment(appointment_id, reason)
+    appointment = await appointment_service.cancel_appointment(appointment_id, reason)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return AppointmentResponse.from_orm(appointment)
@@ -194,50 +233,50 @@ async def get_all_call_sessions(
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = None,
     patient_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all call sessions with filtering"""
-    query = db.query(CallSession)
+    query = select(CallSession)
     
     if status:
         query = query.filter(CallSession.status == status)
     if patient_id:
         query = query.filter(CallSession.patient_id == patient_id)
     
-    call_sessions = query.offset(skip).limit(limit).all()
+    call_sessions = (await db.scalars(query.offset(skip).limit(limit))).all()
     return [CallSessionResponse.from_orm(session) for session in call_sessions]
 
 @admin_router.get("/calls/{call_id}", response_model=CallSessionResponse)
-async def get_call_details(call_id: str, db: Session = Depends(get_db)):
+async def get_call_details(call_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get detailed call session information"""
-    call_session = call_service.get_call_session(call_id)
+    call_session = await call_service.get_call_session(call_id)
     if not call_session:
         raise HTTPException(status_code=404, detail="Call session not found")
     return CallSessionResponse.from_orm(call_session)
 
 # Analytics and Reporting APIs
 @admin_router.get("/analytics/overview")
-async def get_system_overview(db: Session = Depends(get_db)):
+async def get_system_overview(db: AsyncSession = Depends(get_async_db)):
     """Get system overview statistics"""
     try:
-        # Patient statistics
-        total_patients = db.query(Patient).count()
-        
-        # Hospital statistics
-        total_hospitals = db.query(Hospital).count()
+        # Patient, hospital, call session and recent-activity counts in one round trip
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        calls = select(
+            func.count().label("total"),
+            func.count().filter(CallSession.status == CallStatusEnum.COMPLETED).label("completed"),
+            func.count().filter(CallSession.status == CallStatusEnum.FAILED).label("failed")
+        ).select_from(CallSession).subquery()
+        counts = (await db.execute(select(
+            select(func.count()).select_from(Patient).scalar_subquery(),
+            select(func.count()).select_from(Patient).filter(Patient.created_at >= week_ago).scalar_subquery(),
+            select(func.count()).select_from(Hospital).scalar_subquery(),
+            select(func.count()).select_from(Appointment).filter(Appointment.created_at >= week_ago).scalar_subquery(),
+            calls.c.total, calls.c.completed, calls.c.failed
+        ))).one()
+        total_patients, recent_patients, total_hospitals, recent_appointments, total_calls, completed_calls, failed_calls = counts
         
         # Appointment statistics
-        appointment_stats = appointment_service.get_appointment_statistics()
-        
-        # Call session statistics
-        total_calls = db.query(CallSession).count()
-        completed_calls = db.query(CallSession).filter(CallSession.status == "completed").count()
-        failed_calls = db.query(CallSession).filter(CallSession.status == "failed").count()
-        
-        # Recent activity (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_patients = db.query(Patient).filter(Patient.created_at >= week_ago).count()
-        recent_appointments = db.query(Appointment).filter(Appointment.created_at >= week_ago).count()
+        appointment_stats = await appointment_service.get_appointment_statistics()
         
         return {
             "patients": {
@@ -265,7 +304,7 @@ async def get_system_overview(db: Session = Depends(get_db)):
 @admin_router.get("/analytics/patients/trends")
 async def get_patient_trends(
     days: int = Query(30, ge=7, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get patient registration trends"""
     try:
@@ -273,10 +312,10 @@ async def get_patient_trends(
         start_date = end_date - timedelta(days=days)
         
         # Get daily patient registrations
-        daily_patients = db.query(Patient).filter(
+        daily_patients = (await db.scalars(select(Patient).filter(
             Patient.created_at >= start_date,
             Patient.created_at <= end_date
-        ).all()
+        ))).all()
         
         # Group by date
         trends = {}
@@ -295,7 +334,7 @@ async def get_patient_trends(
 @admin_router.get("/analytics/appointments/trends")
 async def get_appointment_trends(
     days: int = Query(30, ge=7, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get appointment trends"""
     try:
@@ -303,10 +342,10 @@ async def get_appointment_trends(
         start_date = end_date - timedelta(days=days)
         
         # Get appointments in date range
-        appointments = db.query(Appointment).filter(
+        appointments = (await db.scalars(select(Appointment).filter(
             Appointment.created_at >= start_date,
             Appointment.created_at <= end_date
-        ).all()
+        ))).all()
         
         # Group by date and status
         trends = {}
@@ -343,7 +382,7 @@ async def send_custom_email(
         raise HTTPException(status_code=500, detail=str(e))
 
 @admin_router.post("/emails/send-reminders")
-async def send_appointment_reminders():
+async def send_appointment_reminders(db: AsyncSession = Depends(get_async_db)):
     """Send appointment reminders for tomorrow's appointments"""
     try:
         # Get tomorrow's appointments
@@ -351,17 +390,17 @@ async def send_appointment_reminders():
         start_of_day = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_day = tomorrow.replace(hour=23, minute=59, second=59, microsecond=999999)
         
-        appointments = db.query(Appointment).filter(
+        appointments = (await db.scalars(select(Appointment).filter(
             Appointment.appointment_date >= start_of_day,
             Appointment.appointment_date <= end_of_day,
             Appointment.status.in_(["scheduled", "confirmed"])
-        ).all()
+        ))).all()
         
         sent_count = 0
         for appointment in appointments:
             # Get patient and hospital details
-            patient = patient_service.get_patient(appointment.patient_id)
-            hospital = hospital_service.get_hospital(appointment.hospital_id)
+            patient = await patient_service.get_patient(appointment.patient_id)
+            hospital = await hospital_service.get_hospital(appointment.hospital_id)
             
             if patient and hospital:
                 appointment_data = {
@@ -405,8 +444,8 @@ async def system_health_check():
     """Check system health"""
     try:
         # Check database connection
-        db = next(get_db())
-        db.execute("SELECT 1")
+        async with async_session_scope() as db:
+            await db.execute(text("SELECT 1"))
         
         # Check Redis connection (if available)
         # redis_client = redis.Redis.from_url(redis_url)
@@ -425,4 +464,10 @@ async def system_health_check():
             "timestamp": datetime.utcnow().isoformat()
         }
 
-
+@admin_router.get("/system/db-pool")
+async def get_db_pool_status():
+    """Database connection pool occupancy and checkout metrics"""
+    return {
+        **pool_status(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
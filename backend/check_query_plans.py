@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Query-plan check: appointment and call-session hot queries
+Seeds a database with synthetic patients, appointments and call sessions,
+then EXPLAINs the queries behind hospital search, get_available_slots, the
+date-range and reminder lookups, the admin filters and the analytics
+counts, and fails if any of them stops using its index
+
+Usage:
+    python check_query_plans.py [--rows N] [--database-url URL] [--repeat N] [--seed N]
+
+--rows is the number of appointments (default 1,000,000); there are a
+tenth as many patients and half as many call sessions. Without
+--database-url a temporary SQLite file is used. A PostgreSQL URL must
+point at an empty scratch database: the tables are created and filled.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from database import (
+    Base, Patient, Hospital, HospitalSpecialization, HospitalSlot, Appointment, CallSession,
+    GenderEnum, LanguageEnum, MedicalCategoryEnum, SubCategoryEnum,
+    AppointmentStatusEnum, CallStatusEnum
+)
+
+BATCH_SIZE = 20000
+HOSPITALS = 200
+SPECIALIZATIONS = ["interventional_cardiology", "chronic_total_occlusion", "radiofrequency_ablation",
+                   "electrophysiology", "heart_failure", "structural_heart", "vascular_surgery", "cardiac_imaging"]
+SLOTS = ["08:00", "09:00", "10:00", "11:00", "13:00", "14:00", "15:00", "16:00"]
+# Seeded appointments are spread over this many days, starting here
+START_DATE = datetime(2025, 1, 1)
+DAYS = 730
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (or EXPLAIN QUERY PLAN on SQLite) for a statement, executed with its parameters"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == "sqlite" else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def weighted(random_, choices):
+    values, weights = zip(*choices)
+    return random_.choices(values, weights, k=1)[0]
+
+
+def seed(engine, rows, random_):
+    """Create the tables and fill them with rows appointments"""
+    Base.metadata.create_all(engine)
+    patients = max(1, rows // 10)
+    calls = rows // 2
+    statuses = [(AppointmentStatusEnum.SCHEDULED, 40), (AppointmentStatusEnum.CONFIRMED, 25),
+                (AppointmentStatusEnum.COMPLETED, 25), (AppointmentStatusEnum.RESCHEDULED, 6),
+                (AppointmentStatusEnum.CANCELLED, 4)]
+    call_statuses = [(CallStatusEnum.COMPLETED, 80), (CallStatusEnum.INITIATED, 5),
+                     (CallStatusEnum.IN_PROGRESS, 2), (CallStatusEnum.FAILED, 3),
+                     (CallStatusEnum.RINGING, 10)]
+
+    with engine.begin() as conn:
+        conn.execute(Hospital.__table__.insert(), [
+            {"id": i, "name": f"Hospital {i}", "location": f"City {i % 7}", "address": f"{i} Main Road",
+             "phone_number": f"+1555{i:07d}", "email": f"h{i}@example.com", "created_at": START_DATE}
+            for i in range(1, HOSPITALS + 1)
+        ])
+        conn.execute(HospitalSpecialization.__table__.insert(), [
+            {"hospital_id": i, "specialization": specialization}
+            for i in range(1, HOSPITALS + 1) for specialization in random_.sample(SPECIALIZATIONS, 2)
+        ])
+        conn.execute(HospitalSlot.__table__.insert(), [
+            {"hospital_id": i, "slot_time": slot} for i in range(1, HOSPITALS + 1) for slot in SLOTS
+        ])
+
+        for start in range(1, patients + 1, BATCH_SIZE):
+            conn.execute(Patient.__table__.insert(), [
+                {"id": i, "name": f"Patient {i}", "gender": random_.choice(list(GenderEnum)),
+                 "phone_number": f"+91{i:010d}", "age": random_.randint(18, 90), "location": f"City {i % 7}",
+                 "language_preference": random_.choice(list(LanguageEnum)), "problem_description": "Chest pain",
+                 "medical_category": random_.choice(list(MedicalCategoryEnum)),
+                 "sub_category": random_.choice(list(SubCategoryEnum)),
+                 "created_at": START_DATE + timedelta(minutes=random_.randrange(DAYS * 24 * 60))}
+                for i in range(start, min(start + BATCH_SIZE, patients + 1))
+            ])
+
+        # A slot has at most one active booking (ux_appointments_active_slot); later ones are cancelled
+        taken = set()
+        for start in range(1, rows + 1, BATCH_SIZE):
+            batch = []
+            for i in range(start, min(start + BATCH_SIZE, rows + 1)):
+                created_at = START_DATE + timedelta(minutes=random_.randrange(DAYS * 24 * 60))
+                hospital_id = random_.randint(1, HOSPITALS)
+                appointment_date = created_at.replace(minute=0, second=0) + timedelta(days=random_.randint(1, 14),
+                                                                                      hours=random_.randint(0, 8))
+                status = weighted(random_, statuses)
+                if status != AppointmentStatusEnum.CANCELLED:
+                    if (hospital_id, appointment_date) in taken:
+                        status = AppointmentStatusEnum.CANCELLED
+                    else:
+                        taken.add((hospital_id, appointment_date))
+                batch.append({
+                    "id": i, "patient_id": random_.randint(1, patients), "hospital_id": hospital_id,
+                    "appointment_date": appointment_date, "status": status,
+                    "created_at": created_at, "updated_at": created_at,
+                })
+            conn.execute(Appointment.__table__.insert(), batch)
+
+        for start in range(1, calls + 1, BATCH_SIZE):
+            conn.execute(CallSession.__table__.insert(), [
+                {"id": f"call-{i}", "patient_id": random_.randint(1, patients),
+                 "status": weighted(random_, call_statuses),
+                 "created_at": START_DATE + timedelta(minutes=random_.randrange(DAYS * 24 * 60))}
+                for i in range(start, min(start + BATCH_SIZE, calls + 1))
+            ])
+
+    # Fresh statistics, as a long-running database would have
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def hot_queries(random_, patients):
+    """(name, statement, acceptable indexes) for the queries the backend issues"""
+    day = START_DATE + timedelta(days=random_.randrange(DAYS))
+    end_of_day = day.replace(hour=23, minute=59, second=59, microsecond=999999)
+    booked = [AppointmentStatusEnum.SCHEDULED, AppointmentStatusEnum.CONFIRMED]
+    return [
+        ("hospitals by specialization",
+         select(Hospital).filter(Hospital.id.in_(
+             select(HospitalSpecialization.hospital_id).filter(
+                 HospitalSpecialization.specialization == random_.choice(SPECIALIZATIONS)))),
+         {"ix_hospital_specializations_specialization"}),
+        ("hospital slot times",
+         select(HospitalSlot.slot_time).filter(HospitalSlot.hospital_id == random_.randint(1, HOSPITALS)),
+         {"sqlite_autoindex_hospital_slots_1", "hospital_slots_pkey"}),
+        ("available slots (hospital, day, status)",
+         select(Appointment).filter(
+             Appointment.hospital_id == random_.randint(1, HOSPITALS),
+             Appointment.appointment_date >= day,
+             Appointment.appointment_date <= end_of_day,
+             Appointment.status.in_(booked)),
+         {"ix_appointments_hospital_date_status"}),
+        ("appointments by date range (one week)",
+         select(Appointment).filter(
+             Appointment.appointment_date >= day,
+             Appointment.appointment_date <= day + timedelta(days=7)),
+         {"ix_appointments_date"}),
+        ("reminders (day, status list)",
+         select(Appointment).filter(
+             Appointment.appointment_date >= day,
+             Appointment.appointment_date <= end_of_day,
+             Appointment.status.in_(booked)),
+         {"ix_appointments_date", "ix_appointments_status_date"}),
+        ("admin filter (status, date range)",
+         select(Appointment).filter(
+             Appointment.status == AppointmentStatusEnum.CANCELLED,
+             Appointment.appointment_date >= day,
+             Appointment.appointment_date <= day + timedelta(days=30)).limit(100),
+         {"ix_appointments_status_date"}),
+        ("appointments by patient",
+         select(Appointment).filter(Appointment.patient_id == random_.randint(1, patients)),
+         {"ix_appointments_patient_id"}),
+        ("new appointments this week",
+         select(func.count()).select_from(Appointment).filter(
+             Appointment.created_at >= START_DATE + timedelta(days=DAYS - 7)),
+         {"ix_appointments_created_at"}),
+        ("new patients this week",
+         select(func.count()).select_from(Patient).filter(
+             Patient.created_at >= START_DATE + timedelta(days=DAYS - 7)),
+         {"ix_patients_created_at"}),
+        ("call sessions by patient",
+         select(CallSession).filter(CallSession.patient_id == random_.randint(1, patients)),
+         {"ix_call_sessions_patient_id"}),
+        ("failed call sessions",
+         select(CallSession).filter(CallSession.status == CallStatusEnum.FAILED).limit(100),
+         {"ix_call_sessions_status"}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the backend's hot queries use their indexes")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="appointments to seed")
+    parser.add_argument("--database-url", help="scratch database to seed (default: temporary SQLite file)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random_ = random.Random(args.seed)
+
+    scratch = None
+    url = args.database_url
+    if not url:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        scratch.close()
+        url = f"sqlite:///{scratch.name}"
+    engine = create_engine(url)
+
+    try:
+        print(f"Seeding {args.rows:,} appointments into {engine.url.render_as_string(hide_password=True)} ...")
+        start = time.perf_counter()
+        seed(engine, args.rows, random_)
+        print(f"  seeded in {time.perf_counter() - start:.1f} s")
+
+        failures = []
+        with engine.connect() as conn:
+            for name, statement, indexes in hot_queries(random_, max(1, args.rows // 10)):
+                plan = "\n".join(" ".join(str(value) for value in row) for row in conn.execute(Explain(statement)))
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    conn.execute(statement).all()
+                    timings.append(time.perf_counter() - start)
+                used = sorted(index for index in indexes if index in plan)
+                print(f"  {name:40s} {statistics.median(timings) * 1000:8.2f} ms  "
+                      f"{', '.join(used) if used else 'NO INDEX'}")
+                if not used:
+                    failures.append(f"{name}: expected one of {sorted(indexes)}, plan was:\n{plan}")
+    finally:
+        engine.dispose()
+        if scratch:
+            os.unlink(scratch.name)
+
+    if failures:
+        raise SystemExit("Query plan regressions:\n" + "\n\n".join(failures))
+    print("All hot queries use their indexes")
+
+
+if __name__ == "__main__":
+    main()
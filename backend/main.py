@@ -1,12 +1,12 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
 import uvicorn
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 
-from database import get_db, engine, Base
+from database import engine, async_engine, Base
 from schemas import (
     PatientCreate, PatientResponse, HospitalResponse, 
     AppointmentCreate, AppointmentResponse, CallSessionResponse
@@ -15,6 +15,8 @@ from services import (
     PatientService, HospitalService, AppointmentService, 
     AIService, CallService, EmailService
 )
+from services.appointment_service import SlotUnavailableError
+from services.availability_service import availability
 from admin_routes import admin_router
 
 # Load environment variables
@@ -55,8 +57,15 @@ async def startup_event():
     """Initialize data on startup"""
     # Create dummy hospitals
     await hospital_service.create_dummy_hospitals()
+    # Build the slot calendar before the first booking needs it
+    await availability.ensure_loaded()
     print("MedAgg Healthcare POC started successfully!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled database connections"""
+    await async_engine.dispose()
+
 @app.get("/")
 async def root():
     return {"message": "MedAgg Healthcare POC API", "status": "running"}
@@ -76,9 +85,9 @@ async def create_patient(patient_data: PatientCreate, background_tasks: Backgrou
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/patients/{patient_id}", response_model=PatientResponse)
-async def get_patient(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient(patient_id: int):
     """Get patient by ID"""
-    patient = patient_service.get_patient(patient_id)
+    patient = await patient_service.get_patient(patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return PatientResponse.from_orm(patient)
@@ -95,13 +104,21 @@ async def create_appointment(appointment_data: AppointmentCreate):
     try:
         appointment = await appointment_service.create_appointment(appointment_data)
         return AppointmentResponse.from_orm(appointment)
+    except SlotUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/api/availability")
+async def get_availability(specialization: str = None, location: str = None, limit: int = 5,
+                           after: datetime = None):
+    """Earliest free appointment slots across matching hospitals"""
+    return await appointment_service.find_next_slots(specialization, location, min(max(limit, 1), 100), after)
+
 @app.get("/api/appointments/{appointment_id}", response_model=AppointmentResponse)
 async def get_appointment(appointment_id: int):
     """Get appointment by ID"""
-    appointment = appointment_service.get_appointment(appointment_id)
+    appointment = await appointment_service.get_appointment(appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return AppointmentResponse.from_orm(appointment)
@@ -136,7 +153,7 @@ async def initiate_ai_call(patient_id: int):
     """Initiate AI call to patient"""
     try:
         # Get patient details
-        patient = patient_service.get_patient(patient_id)
+        patient = await patient_service.get_patient(patient_id)
         if not patient:
             return
         
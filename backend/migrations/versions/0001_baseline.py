@@ -0,0 +1,97 @@
+"""Baseline: the schema as created by Base.metadata.create_all
+
+Databases that already have these tables should be marked with
+'alembic stamp 0001_baseline' before 'alembic upgrade head'.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database import (
+    GenderEnum, LanguageEnum, MedicalCategoryEnum, SubCategoryEnum,
+    CallStatusEnum, AppointmentStatusEnum
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "patients",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("gender", sa.Enum(GenderEnum), nullable=False),
+        sa.Column("phone_number", sa.String(20), nullable=False, unique=True),
+        sa.Column("age", sa.Integer(), nullable=False),
+        sa.Column("location", sa.String(100), nullable=False),
+        sa.Column("language_preference", sa.Enum(LanguageEnum), nullable=False),
+        sa.Column("problem_description", sa.Text(), nullable=False),
+        sa.Column("medical_category", sa.Enum(MedicalCategoryEnum), nullable=False),
+        sa.Column("sub_category", sa.Enum(SubCategoryEnum), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_patients_id", "patients", ["id"])
+
+    op.create_table(
+        "hospitals",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("location", sa.String(100), nullable=False),
+        sa.Column("address", sa.Text(), nullable=False),
+        sa.Column("phone_number", sa.String(20), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("specializations", sa.Text(), nullable=False),
+        sa.Column("available_slots", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_hospitals_id", "hospitals", ["id"])
+
+    op.create_table(
+        "appointments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("hospital_id", sa.Integer(), sa.ForeignKey("hospitals.id"), nullable=False),
+        sa.Column("appointment_date", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.Enum(AppointmentStatusEnum)),
+        sa.Column("notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_appointments_id", "appointments", ["id"])
+
+    op.create_table(
+        "call_sessions",
+        sa.Column("id", sa.String(50), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("twilio_call_sid", sa.String(100)),
+        sa.Column("status", sa.Enum(CallStatusEnum)),
+        sa.Column("conversation_log", sa.Text()),
+        sa.Column("diagnosis_notes", sa.Text()),
+        sa.Column("scheduled_appointment_id", sa.Integer(), sa.ForeignKey("appointments.id")),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("completed_at", sa.DateTime()),
+    )
+    op.create_index("ix_call_sessions_id", "call_sessions", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("call_sessions")
+    op.drop_table("appointments")
+    op.drop_table("hospitals")
+    op.drop_table("patients")
+    bind = op.get_bind()
+    for enum_class in (GenderEnum, LanguageEnum, MedicalCategoryEnum, SubCategoryEnum,
+                       CallStatusEnum, AppointmentStatusEnum):
+        sa.Enum(enum_class).drop(bind, checkfirst=True)
@@ -0,0 +1,51 @@
+"""Indexes for the appointment and call-session hot queries
+
+Covers get_available_slots (hospital, day, status), date-range and
+reminder lookups, the admin status/date filters, per-patient lookups and
+the analytics counts over created_at. The indexes are created with
+IF NOT EXISTS, since main.py's create_all also creates them from the
+models.
+
+On a large PostgreSQL table, create them ahead of the deploy with
+CREATE INDEX CONCURRENTLY to avoid locking writes; this migration then
+finds them in place.
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_hot_query_indexes"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (table, columns); kept in step with the models' __table_args__
+INDEXES = {
+    "ix_patients_created_at": ("patients", ["created_at"]),
+    "ix_appointments_hospital_date_status": ("appointments", ["hospital_id", "appointment_date", "status"]),
+    "ix_appointments_date": ("appointments", ["appointment_date"]),
+    "ix_appointments_status_date": ("appointments", ["status", "appointment_date"]),
+    "ix_appointments_patient_id": ("appointments", ["patient_id"]),
+    "ix_appointments_created_at": ("appointments", ["created_at"]),
+    "ix_call_sessions_patient_id": ("call_sessions", ["patient_id"]),
+    "ix_call_sessions_status": ("call_sessions", ["status"]),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, (table, columns) in INDEXES.items():
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, (table, columns) in INDEXES.items():
+        op.drop_index(name, table_name=table, if_exists=True)
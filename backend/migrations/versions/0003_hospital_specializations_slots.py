@@ -0,0 +1,113 @@
+"""Move hospital specializations and slots out of JSON text columns
+
+hospitals.specializations and hospitals.available_slots held JSON lists,
+so a specialization search was a LIKE scan over every hospital and each
+slot lookup parsed JSON. They become rows in hospital_specializations
+(indexed by specialization) and hospital_slots; the JSON columns are
+copied over and dropped.
+
+Revision ID: 0003_hospital_specializations_slots
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-18 11:00:00
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_hospital_specializations_slots"
+down_revision: Union[str, Sequence[str], None] = "0002_hot_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+hospitals = sa.table(
+    "hospitals",
+    sa.column("id", sa.Integer()),
+    sa.column("specializations", sa.Text()),
+    sa.column("available_slots", sa.Text()),
+)
+specializations = sa.table(
+    "hospital_specializations",
+    sa.column("hospital_id", sa.Integer()),
+    sa.column("specialization", sa.String()),
+)
+slots = sa.table(
+    "hospital_slots",
+    sa.column("hospital_id", sa.Integer()),
+    sa.column("slot_time", sa.String()),
+)
+
+
+def _json_list(value):
+    try:
+        items = json.loads(value or "[]")
+    except ValueError:
+        return []
+    return list(dict.fromkeys(items)) if isinstance(items, list) else []
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all may already have made these tables (empty) on an older database
+    op.create_table(
+        "hospital_specializations",
+        sa.Column("hospital_id", sa.Integer(), sa.ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("specialization", sa.String(50), primary_key=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_hospital_specializations_specialization", "hospital_specializations",
+                    ["specialization", "hospital_id"], if_not_exists=True)
+    op.create_table(
+        "hospital_slots",
+        sa.Column("hospital_id", sa.Integer(), sa.ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("slot_time", sa.String(5), primary_key=True),
+        if_not_exists=True,
+    )
+
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("hospitals")}
+    if "specializations" not in columns:
+        return
+
+    rows = bind.execute(sa.select(hospitals.c.id, hospitals.c.specializations, hospitals.c.available_slots)).all()
+    specialization_rows = [{"hospital_id": row.id, "specialization": value}
+                           for row in rows for value in _json_list(row.specializations)]
+    slot_rows = [{"hospital_id": row.id, "slot_time": value}
+                 for row in rows for value in _json_list(row.available_slots)]
+    if specialization_rows:
+        op.bulk_insert(specializations, specialization_rows)
+    if slot_rows:
+        op.bulk_insert(slots, slot_rows)
+
+    with op.batch_alter_table("hospitals") as batch:
+        batch.drop_column("specializations")
+        batch.drop_column("available_slots")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("hospitals") as batch:
+        batch.add_column(sa.Column("specializations", sa.Text(), nullable=False, server_default="[]"))
+        batch.add_column(sa.Column("available_slots", sa.Text(), nullable=False, server_default="[]"))
+
+    bind = op.get_bind()
+    by_hospital = {}
+    for row in bind.execute(sa.select(specializations.c.hospital_id, specializations.c.specialization)
+                            .order_by(specializations.c.hospital_id, specializations.c.specialization)):
+        by_hospital.setdefault(row.hospital_id, ([], []))[0].append(row.specialization)
+    for row in bind.execute(sa.select(slots.c.hospital_id, slots.c.slot_time)
+                            .order_by(slots.c.hospital_id, slots.c.slot_time)):
+        by_hospital.setdefault(row.hospital_id, ([], []))[1].append(row.slot_time)
+    for hospital_id, (hospital_specializations, hospital_slots) in by_hospital.items():
+        bind.execute(hospitals.update().where(hospitals.c.id == hospital_id).values(
+            specializations=json.dumps(hospital_specializations),
+            available_slots=json.dumps(hospital_slots),
+        ))
+
+    op.drop_table("hospital_slots")
+    op.drop_index("ix_hospital_specializations_specialization", table_name="hospital_specializations")
+    op.drop_table("hospital_specializations")
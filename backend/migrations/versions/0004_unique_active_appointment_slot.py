@@ -0,0 +1,45 @@
+"""One active appointment per hospital slot
+
+A partial unique index on (hospital_id, appointment_date) for appointments
+that aren't cancelled, so two worker processes can't book the same slot.
+Existing double bookings must be resolved (one of them cancelled or
+rescheduled) before this migration can run; the query in the upgrade's
+error message lists them.
+
+Revision ID: 0004_unique_active_appointment_slot
+Revises: 0003_hospital_specializations_slots
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_unique_active_appointment_slot"
+down_revision: Union[str, Sequence[str], None] = "0003_hospital_specializations_slots"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status != 'CANCELLED'"
+DUPLICATES = (
+    "SELECT hospital_id, appointment_date, COUNT(*) FROM appointments "
+    f"WHERE {ACTIVE} GROUP BY hospital_id, appointment_date HAVING COUNT(*) > 1"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    duplicates = op.get_bind().execute(sa.text(DUPLICATES)).all()
+    if duplicates:
+        raise RuntimeError(f"{len(duplicates)} hospital slots are double-booked; resolve them first:\n{DUPLICATES}")
+    op.create_index("ux_appointments_active_slot", "appointments", ["hospital_id", "appointment_date"],
+                    unique=True, if_not_exists=True,
+                    sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ux_appointments_active_slot", table_name="appointments", if_exists=True)
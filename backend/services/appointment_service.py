@@ -1,178 +1,193 @@
-from sqlalchemy.orm import Session
-from database import get_db, Appointment, AppointmentStatusEnum
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+from database import async_session_scope, month_bucket, Appointment, AppointmentStatusEnum
 from schemas import AppointmentCreate, AppointmentResponse
+from services.availability_service import availability, FREE_STATUSES
 from typing import Optional, List
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-import json
+
+class SlotUnavailableError(ValueError):
+    """The requested appointment slot is already booked"""
 
 class AppointmentService:
-    def __init__(self):
-        self.db = next(get_db())
+    """Appointment queries; each call runs in its own async session from the pool.
+    Bookings, cancellations and reschedules keep the availability calendar in step."""
     
     async def create_appointment(self, appointment_data: AppointmentCreate) -> Appointment:
         """Create a new appointment"""
-        try:
-            appointment = Appointment(
-                patient_id=appointment_data.patient_id,
-                hospital_id=appointment_data.hospital_id,
-                appointment_date=appointment_data.appointment_date,
-                notes=appointment_data.notes,
-                status=AppointmentStatusEnum.SCHEDULED
-            )
-            
-            self.db.add(appointment)
-            self.db.commit()
-            self.db.refresh(appointment)
+        hospital_id = appointment_data.hospital_id
+        appointment_date = appointment_data.appointment_date
+        async with self._claim_slot(hospital_id, appointment_date):
+            async with async_session_scope() as db:
+                appointment = Appointment(
+                    patient_id=appointment_data.patient_id,
+                    hospital_id=hospital_id,
+                    appointment_date=appointment_date,
+                    notes=appointment_data.notes,
+                    status=AppointmentStatusEnum.SCHEDULED
+                )
+                
+                db.add(appointment)
+                await db.flush()
+                await db.refresh(appointment)
             
             return appointment
-        except Exception as e:
-            self.db.rollback()
-            raise e
     
-    def get_appointment(self, appointment_id: int) -> Optional[Appointment]:
+    async def get_appointment(self, appointment_id: int) -> Optional[Appointment]:
         """Get appointment by ID"""
-        return self.db.query(Appointment).filter(Appointment.id == appointment_id).first()
+        async with async_session_scope() as db:
+            return await db.get(Appointment, appointment_id)
     
-    def get_appointments_by_patient(self, patient_id: int) -> List[Appointment]:
+    async def get_appointments_by_patient(self, patient_id: int) -> List[Appointment]:
         """Get all appointments for a patient"""
-        return self.db.query(Appointment).filter(Appointment.patient_id == patient_id).all()
+        async with async_session_scope() as db:
+            return (await db.scalars(select(Appointment).filter(Appointment.patient_id == patient_id))).all()
     
-    def get_appointments_by_hospital(self, hospital_id: int) -> List[Appointment]:
+    async def get_appointments_by_hospital(self, hospital_id: int) -> List[Appointment]:
         """Get all appointments for a hospital"""
-        return self.db.query(Appointment).filter(Appointment.hospital_id == hospital_id).all()
+        async with async_session_scope() as db:
+            return (await db.scalars(select(Appointment).filter(Appointment.hospital_id == hospital_id))).all()
     
-    def get_appointments_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Appointment]:
+    async def get_appointments_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Appointment]:
         """Get appointments within a date range"""
-        return self.db.query(Appointment).filter(
-            Appointment.appointment_date >= start_date,
-            Appointment.appointment_date <= end_date
-        ).all()
+        async with async_session_scope() as db:
+            return (await db.scalars(select(Appointment).filter(
+                Appointment.appointment_date >= start_date,
+                Appointment.appointment_date <= end_date
+            ))).all()
     
-    def update_appointment_status(self, appointment_id: int, status: AppointmentStatusEnum, notes: str = None) -> Optional[Appointment]:
+    async def update_appointment_status(self, appointment_id: int, status: AppointmentStatusEnum, notes: str = None) -> Optional[Appointment]:
         """Update appointment status (Admin function)"""
-        try:
-            appointment = self.get_appointment(appointment_id)
+        async with async_session_scope() as db:
+            appointment = await db.get(Appointment, appointment_id)
             if not appointment:
                 return None
-            
-            appointment.status = status
-            if notes:
-                appointment.notes = notes
-            appointment.updated_at = datetime.utcnow()
-            
-            self.db.commit()
-            self.db.refresh(appointment)
-            return appointment
-        except Exception as e:
-            self.db.rollback()
-            raise e
+            was_free = appointment.status in FREE_STATUSES
+            is_free = status in FREE_STATUSES
+            
+            # Reinstating a cancelled appointment needs its slot back
+            async with self._claim_slot(appointment.hospital_id, appointment.appointment_date, was_free and not is_free):
+                appointment.status = status
+                if notes:
+                    appointment.notes = notes
+                appointment.updated_at = datetime.utcnow()
+                
+                await db.flush()
+                await db.refresh(appointment)
+                await db.commit()
+        
+        if is_free and not was_free:
+            availability.release(appointment.hospital_id, appointment.appointment_date)
+        return appointment
     
-    def reschedule_appointment(self, appointment_id: int, new_date: datetime) -> Optional[Appointment]:
+    async def reschedule_appointment(self, appointment_id: int, new_date: datetime) -> Optional[Appointment]:
         """Reschedule an appointment"""
-        try:
-            appointment = self.get_appointment(appointment_id)
+        async with async_session_scope() as db:
+            appointment = await db.get(Appointment, appointment_id)
             if not appointment:
                 return None
-            
-            appointment.appointment_date = new_date
-            appointment.status = AppointmentStatusEnum.RESCHEDULED
-            appointment.updated_at = datetime.utcnow()
-            
-            self.db.commit()
-            self.db.refresh(appointment)
-            return appointment
-        except Exception as e:
-            self.db.rollback()
-            raise e
+            old_date = appointment.appointment_date
+            held_slot = appointment.status not in FREE_STATUSES
+            
+            async with self._claim_slot(appointment.hospital_id, new_date, not held_slot or new_date != old_date):
+                appointment.appointment_date = new_date
+                appointment.status = AppointmentStatusEnum.RESCHEDULED
+                appointment.updated_at = datetime.utcnow()
+                
+                await db.flush()
+                await db.refresh(appointment)
+                await db.commit()
+        
+        if held_slot and new_date != old_date:
+            availability.release(appointment.hospital_id, old_date)
+        return appointment
     
-    def cancel_appointment(self, appointment_id: int, reason: str = None) -> Optional[Appointment]:
+    async def cancel_appointment(self, appointment_id: int, reason: str = None) -> Optional[Appointment]:
         """Cancel an appointment"""
-        try:
-            appointment = self.get_appointment(appointment_id)
+        async with async_session_scope() as db:
+            appointment = await db.get(Appointment, appointment_id)
             if not appointment:
                 return None
+            held_slot = appointment.status not in FREE_STATUSES
             
             appointment.status = AppointmentStatusEnum.CANCELLED
             if reason:
                 appointment.notes = f"Cancelled: {reason}"
             appointment.updated_at = datetime.utcnow()
             
-            self.db.commit()
-            self.db.refresh(appointment)
-            return appointment
-        except Exception as e:
-            self.db.rollback()
-            raise e
+            await db.flush()
+            await db.refresh(appointment)
+        
+        if held_slot:
+            availability.release(appointment.hospital_id, appointment.appointment_date)
+        return appointment
     
-    def get_available_slots(self, hospital_id: int, date: datetime) -> List[str]:
+    async def get_available_slots(self, hospital_id: int, date: datetime) -> List[str]:
         """Get available appointment slots for a hospital on a specific date"""
         try:
-            # Get hospital
-            from services.hospital_service import HospitalService
-            hospital_service = HospitalService()
-            hospital = hospital_service.get_hospital(hospital_id)
-            
-            if not hospital:
-                return []
-            
-            # Parse available slots from hospital
-            available_slots = json.loads(hospital.available_slots)
-            
-            # Get existing appointments for the date
-            start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_day = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            existing_appointments = self.db.query(Appointment).filter(
-                Appointment.hospital_id == hospital_id,
-                Appointment.appointment_date >= start_of_day,
-                Appointment.appointment_date <= end_of_day,
-                Appointment.status.in_([AppointmentStatusEnum.SCHEDULED, AppointmentStatusEnum.CONFIRMED])
-            ).all()
-            
-            # Extract booked times
-            booked_times = []
-            for apt in existing_appointments:
-                time_str = apt.appointment_date.strftime("%H:%M")
-                booked_times.append(time_str)
-            
-            # Return available slots
-            return [slot for slot in available_slots if slot not in booked_times]
-            
+            await availability.ensure_loaded()
+            return availability.free_slots(hospital_id, date)
         except Exception as e:
             print(f"Error getting available slots: {e}")
             return []
     
-    def get_appointment_statistics(self) -> dict:
+    async def find_next_slots(self, specialization: str = None, location: str = None, limit: int = 5,
+                              after: datetime = None) -> List[dict]:
+        """Earliest free slots across hospitals matching specialization and location"""
+        await availability.ensure_loaded()
+        return availability.next_free_slots(specialization, location, limit=limit, after=after)
+    
+    async def get_appointment_statistics(self) -> dict:
         """Get appointment statistics (Admin function)"""
         try:
-            total_appointments = self.db.query(Appointment).count()
-            
-            status_counts = {}
-            for status in AppointmentStatusEnum:
-                count = self.db.query(Appointment).filter(Appointment.status == status).count()
-                status_counts[status.value] = count
-            
-            # Get appointments by month (last 12 months)
-            from datetime import datetime, timedelta
+            # One grouped query: counts per status and, for the last 12 months, per month of booking
             twelve_months_ago = datetime.utcnow() - timedelta(days=365)
+            month = case((Appointment.created_at >= twelve_months_ago, month_bucket(Appointment.created_at)))
+            async with async_session_scope() as db:
+                rows = (await db.execute(
+                    select(Appointment.status, month, func.count()).group_by(Appointment.status, month)
+                )).all()
             
-            monthly_appointments = self.db.query(Appointment).filter(
-                Appointment.created_at >= twelve_months_ago
-            ).all()
-            
+            status_counts = {status.value: 0 for status in AppointmentStatusEnum}
             monthly_stats = {}
-            for apt in monthly_appointments:
-                month_key = apt.created_at.strftime("%Y-%m")
-                monthly_stats[month_key] = monthly_stats.get(month_key, 0) + 1
+            for status, month_key, count in rows:
+                if status is not None:
+                    status_counts[status.value] += count
+                if month_key is not None:
+                    monthly_stats[month_key] = monthly_stats.get(month_key, 0) + count
             
             return {
-                "total_appointments": total_appointments,
+                "total_appointments": sum(count for _, _, count in rows),
                 "status_breakdown": status_counts,
-                "monthly_trends": monthly_stats
+                "monthly_trends": dict(sorted(monthly_stats.items()))
             }
-            
+                
         except Exception as e:
             print(f"Error getting appointment statistics: {e}")
             return {}
-
-
+    
+    @asynccontextmanager
+    async def _claim_slot(self, hospital_id: int, when: datetime, claim: bool = True):
+        """Hold the slot in the availability calendar while the block writes the appointment.
+        
+        Raises SlotUnavailableError if the slot is taken, here or (via the unique
+        index on active bookings) by another worker; gives it back if the block fails.
+        """
+        if not claim:
+            yield
+            return
+        await availability.ensure_loaded()
+        if not availability.book(hospital_id, when):
+            raise SlotUnavailableError(f"The {when:%Y-%m-%d %H:%M} slot is already booked")
+        try:
+            yield
+        except IntegrityError as e:
+            # Booked by another worker, or a bad patient/hospital ID: resync this hospital from the database
+            await availability.reload_hospital(hospital_id)
+            if availability.is_booked(hospital_id, when):
+                raise SlotUnavailableError(f"The {when:%Y-%m-%d %H:%M} slot is already booked") from e
+            raise
+        except BaseException:
+            availability.release(hospital_id, when)
+            raise
@@ -0,0 +1,300 @@
+from sqlalchemy import select
+from database import async_session_scope, Hospital, Appointment, AppointmentStatusEnum
+from typing import Optional, List, Dict
+from datetime import datetime, timedelta
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Days ahead searched for free slots when the caller doesn't say
+AVAILABILITY_SEARCH_DAYS = int(os.getenv("AVAILABILITY_SEARCH_DAYS", "30"))
+# Seconds before the calendar is reloaded to pick up other workers' bookings and hospital edits
+AVAILABILITY_REFRESH_INTERVAL = float(os.getenv("AVAILABILITY_REFRESH_INTERVAL", "30"))
+# Distinct (specialization, location) searches whose merged slot lists are kept
+AVAILABILITY_TEMPLATE_CACHE = 256
+
+# Appointments in any other status hold their slot
+FREE_STATUSES = {AppointmentStatusEnum.CANCELLED}
+
+
+class AvailabilityService:
+    """In-memory calendar of free appointment slots.
+
+    Each hospital has a fixed list of daily slot times; slot i of a day is bit
+    i of that hospital-day's booked bitmap, so a day nobody has booked costs
+    nothing and checking a slot is a dict lookup and a shift. Bookings,
+    cancellations and reschedules flip bits as they happen instead of
+    re-querying the day.
+
+    next_free_slots() walks a merged, time-ordered list of every matching
+    hospital's slots, cached per (specialization, location), and stops at the
+    limit, so a search touches only the slots it returns or skips.
+
+    book() is an atomic check-and-set, so two requests in this process can't
+    both get a slot. Other worker processes keep their own calendars; the
+    unique index on active (hospital_id, appointment_date) rejects the second
+    booking there, and the loser reloads that hospital's bookings.
+
+    Each worker's calendar only sees its own changes as they happen, so
+    ensure_loaded() reloads it from the database once it is older than
+    AVAILABILITY_REFRESH_INTERVAL seconds; until then free slots booked, and
+    hospital slot times edited, through another worker may still be offered.
+    Bookings made here while a reload is querying are replayed onto the
+    reloaded calendar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = None
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._journals = []  # changes made while a load or hospital reload is querying, to replay after it
+        self._hospitals = {}  # hospital ID -> {"name", "location", "specializations", "slots", "bits"}
+        self._booked = {}  # hospital ID -> {date ordinal -> bitmap of booked slots}
+        self._by_specialization = {}  # specialization -> set of hospital IDs
+        self._templates = {}  # (specialization, location) -> (minutes, [(minute, slot, hospital ID, bit)])
+
+    async def ensure_loaded(self):
+        """Load hospitals and upcoming appointments on first use, and reload them once stale"""
+        if self._loaded and not self._stale():
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        if self._loaded and self._load_lock.locked():
+            return  # another request is reloading; the current calendar serves meanwhile
+        async with self._load_lock:
+            if self._loaded and not self._stale():
+                return
+            try:
+                await self.load()
+            except Exception as e:
+                if not self._loaded:
+                    raise
+                # Keep serving the current calendar and try again after another interval
+                self._loaded_at = time.monotonic()
+                logger.error(f"Error reloading availability calendar: {e}")
+
+    async def load(self):
+        """(Re)build the calendar from the database"""
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        journal = self._start_journal()
+        try:
+            async with async_session_scope() as db:
+                hospitals = (await db.scalars(select(Hospital))).all()
+                bookings = (await db.execute(
+                    select(Appointment.hospital_id, Appointment.appointment_date).filter(
+                        Appointment.appointment_date >= today,
+                        Appointment.status.notin_(FREE_STATUSES)
+                    )
+                )).all()
+        finally:
+            self._stop_journal(journal)
+        with self._lock:
+            self._hospitals.clear()
+            self._booked.clear()
+            self._by_specialization.clear()
+            self._templates.clear()
+            for hospital in hospitals:
+                self._set_hospital(hospital)
+            for hospital_id, appointment_date in bookings:
+                self._mark(hospital_id, appointment_date, booked=True)
+            self._replay(journal)
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+        logger.info(f"Availability calendar loaded: {len(hospitals)} hospitals, {len(bookings)} upcoming bookings")
+
+    async def refresh(self):
+        """Rebuild the calendar if it has been loaded"""
+        if self._loaded:
+            await self.load()
+
+    async def reload_hospital(self, hospital_id: int):
+        """Pick up a hospital that was created, edited or deleted"""
+        if not self._loaded:
+            return
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        journal = self._start_journal()
+        try:
+            async with async_session_scope() as db:
+                hospital = await db.get(Hospital, hospital_id)
+                bookings = (await db.scalars(
+                    select(Appointment.appointment_date).filter(
+                        Appointment.hospital_id == hospital_id,
+                        Appointment.appointment_date >= today,
+                        Appointment.status.notin_(FREE_STATUSES)
+                    )
+                )).all() if hospital else []
+        finally:
+            self._stop_journal(journal)
+        with self._lock:
+            self._remove_hospital(hospital_id)
+            if hospital:
+                self._set_hospital(hospital)
+                for appointment_date in bookings:
+                    self._mark(hospital_id, appointment_date, booked=True)
+                self._replay([change for change in journal if change[0] == hospital_id])
+
+    def book(self, hospital_id: int, when: datetime) -> bool:
+        """Claim the slot at when; False if it is already booked.
+
+        Times that aren't one of the hospital's slots aren't tracked and always succeed.
+        """
+        with self._lock:
+            return self._mark(hospital_id, when, booked=True)
+
+    def release(self, hospital_id: int, when: datetime):
+        """Free the slot at when"""
+        with self._lock:
+            self._mark(hospital_id, when, booked=False)
+
+    def is_booked(self, hospital_id: int, when: datetime) -> bool:
+        """True if when is one of the hospital's slots and it is booked"""
+        with self._lock:
+            hospital = self._hospitals.get(hospital_id)
+            bit = hospital["bits"].get(when.strftime("%H:%M")) if hospital else None
+            if bit is None or when.second or when.microsecond:
+                return False
+            return bool(self._booked[hospital_id].get(when.toordinal(), 0) >> bit & 1)
+
+    def free_slots(self, hospital_id: int, day: datetime) -> List[str]:
+        """Free slot times of a hospital on a day, earliest first"""
+        with self._lock:
+            hospital = self._hospitals.get(hospital_id)
+            if not hospital:
+                return []
+            booked = self._booked.get(hospital_id, {}).get(day.toordinal(), 0)
+            return [slot for bit, slot in enumerate(hospital["slots"]) if not booked >> bit & 1]
+
+    def next_free_slots(self, specialization: Optional[str] = None, location: Optional[str] = None,
+                        limit: int = 5, after: Optional[datetime] = None, days: Optional[int] = None) -> List[Dict]:
+        """The earliest free slots after a time across hospitals matching specialization and location"""
+        after = after or datetime.utcnow()
+        days = days or AVAILABILITY_SEARCH_DAYS
+        first_day = after.toordinal()
+        after_minute = after.hour * 60 + after.minute + (1 if after.second or after.microsecond else 0)
+        found = []
+        with self._lock:
+            minutes, template = self._template(specialization, location)
+            if not template:
+                return found
+            for ordinal in range(first_day, first_day + days):
+                start = bisect.bisect_left(minutes, after_minute) if ordinal == first_day else 0
+                for index in range(start, len(template)):
+                    minute, slot, hospital_id, bit = template[index]
+                    if self._booked[hospital_id].get(ordinal, 0) >> bit & 1:
+                        continue
+                    hospital = self._hospitals[hospital_id]
+                    found.append({
+                        "hospital_id": hospital_id,
+                        "hospital_name": hospital["name"],
+                        "location": hospital["location"],
+                        "slot": slot,
+                        "start": datetime.fromordinal(ordinal) + timedelta(minutes=minute),
+                    })
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded else None,
+                "hospitals": len(self._hospitals),
+                "booked_days": sum(len(days) for days in self._booked.values()),
+                "cached_searches": len(self._templates),
+            }
+
+    def _stale(self):
+        return time.monotonic() - self._loaded_at >= AVAILABILITY_REFRESH_INTERVAL
+
+    def _start_journal(self):
+        journal = []
+        with self._lock:
+            self._journals.append(journal)
+        return journal
+
+    def _stop_journal(self, journal):
+        with self._lock:
+            self._journals.remove(journal)
+
+    def _replay(self, journal):
+        for hospital_id, when, booked in journal:
+            self._mark(hospital_id, when, booked)
+
+    def _set_hospital(self, hospital):
+        slots = sorted(hospital.available_slots)
+        self._hospitals[hospital.id] = {
+            "name": hospital.name,
+            "location": hospital.location,
+            "specializations": set(hospital.specializations),
+            "slots": slots,
+            "bits": {slot: bit for bit, slot in enumerate(slots)},
+        }
+        self._booked.setdefault(hospital.id, {})
+        for specialization in hospital.specializations:
+            self._by_specialization.setdefault(specialization, set()).add(hospital.id)
+        self._templates.clear()
+
+    def _remove_hospital(self, hospital_id):
+        hospital = self._hospitals.pop(hospital_id, None)
+        self._booked.pop(hospital_id, None)
+        if hospital:
+            for specialization in hospital["specializations"]:
+                self._by_specialization.get(specialization, set()).discard(hospital_id)
+        self._templates.clear()
+
+    def _mark(self, hospital_id, when, booked):
+        for journal in self._journals:
+            journal.append((hospital_id, when, booked))
+        hospital = self._hospitals.get(hospital_id)
+        bit = hospital["bits"].get(when.strftime("%H:%M")) if hospital else None
+        if bit is None or when.second or when.microsecond:
+            return True
+        days = self._booked[hospital_id]
+        ordinal = when.toordinal()
+        current = days.get(ordinal, 0)
+        if booked:
+            if current >> bit & 1:
+                return False
+            days[ordinal] = current | 1 << bit
+        elif current:
+            current &= ~(1 << bit)
+            if current:
+                days[ordinal] = current
+            else:
+                del days[ordinal]
+        return True
+
+    def _template(self, specialization, location):
+        location = (location or "").strip().lower()
+        key = (specialization, location)
+        template = self._templates.get(key)
+        if template is None:
+            if specialization:
+                candidates = self._by_specialization.get(specialization, ())
+            else:
+                candidates = self._hospitals.keys()
+            entries = []
+            for hospital_id in candidates:
+                hospital = self._hospitals[hospital_id]
+                # Same matching as HospitalService.get_hospitals: location contains the search text
+                if location and location not in hospital["location"].lower():
+                    continue
+                for bit, slot in enumerate(hospital["slots"]):
+                    hours, minutes = slot.split(":")
+                    entries.append((int(hours) * 60 + int(minutes), slot, hospital_id, bit))
+            entries.sort()
+            if len(self._templates) >= AVAILABILITY_TEMPLATE_CACHE:
+                self._templates.clear()
+            template = self._templates[key] = ([entry[0] for entry in entries], entries)
+        return template
+
+
+# Shared by every service instance, so all routes see one calendar
+availability = AvailabilityService()
@@ -1,5 +1,4 @@
-from sqlalchemy.orm import Session
-from database import get_db, CallSession, CallStatusEnum
+from database import async_session_scope, CallSession, CallStatusEnum
 from schemas import CallSessionResponse
 from typing import Optional, Dict
 from datetime import datetime
@@ -12,9 +11,15 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Free slots tried, earliest first, when booking the appointment after a call
+SCHEDULING_ATTEMPTS = 5
+
 class CallService:
+    """Call session handling. Sessions are opened per database write or read and
+    never held across the AI and telephony awaits, so a call in progress does
+    not pin a pooled connection"""
+    
     def __init__(self):
-        self.db = next(get_db())
         self.ai_service = None  # Will be initialized when needed
     
     async def create_call_session(self, patient_id: int) -> CallSession:
@@ -22,22 +27,22 @@ class CallService:
         try:
             call_session_id = str(uuid.uuid4())
             
-            call_session = CallSession(
-                id=call_session_id,
-                patient_id=patient_id,
-                status=CallStatusEnum.INITIATED,
-                conversation_log=[]
-            )
-            
-            self.db.add(call_session)
-            self.db.commit()
-            self.db.refresh(call_session)
+            async with async_session_scope() as db:
+                call_session = CallSession(
+                    id=call_session_id,
+                    patient_id=patient_id,
+                    status=CallStatusEnum.INITIATED,
+                    conversation_log=[]
+                )
+                
+                db.add(call_session)
+                await db.flush()
+                await db.refresh(call_session)
             
             logger.info(f"Created call session {call_session_id} for patient {patient_id}")
             return call_session
             
         except Exception as e:
-            self.db.rollback()
             logger.error(f"Error creating call session: {e}")
             raise e
     
@@ -68,7 +73,7 @@ class CallService:
         """Start the AI conversation"""
         try:
             # Get call session
-            call_session = self.get_call_session(call_session_id)
+            call_session = await self.get_call_session(call_session_id)
             if not call_session:
                 return
             
@@ -81,7 +86,7 @@ class CallService:
             # Get patient data
             from services.patient_service import PatientService
             patient_service = PatientService()
-            patient = patient_service.get_patient(call_session.patient_id)
+            patient = await patient_service.get_patient(call_session.patient_id)
             
             if not patient:
                 logger.error(f"Patient not found for call session {call_session_id}")
@@ -115,14 +120,14 @@ class CallService:
         """Process voice input from patient"""
         try:
             # Get call session
-            call_session = self.get_call_session(call_session_id)
+            call_session = await self.get_call_session(call_session_id)
             if not call_session:
                 return "I'm sorry, I couldn't find your call session."
             
             # Get patient data
             from services.patient_service import PatientService
             patient_service = PatientService()
-            patient = patient_service.get_patient(call_session.patient_id)
+            patient = await patient_service.get_patient(call_session.patient_id)
             
             if not patient:
                 return "I'm sorry, I couldn't find your patient information."
@@ -155,29 +160,29 @@ class CallService:
     async def _update_conversation_log(self, call_session_id: str, user_input: str, ai_response: str):
         """Update conversation log in database"""
         try:
-            call_session = self.get_call_session(call_session_id)
-            if not call_session:
-                return
-            
-            # Get current conversation log
-            conversation_log = call_session.conversation_log or []
-            
-            # Add new entries
-            conversation_log.append({
-                "role": "user",
-                "content": user_input,
-                "timestamp": datetime.utcnow().isoformat()
-            })
-            
-            conversation_log.append({
-                "role": "assistant",
-                "content": ai_response,
-                "timestamp": datetime.utcnow().isoformat()
-            })
-            
-            # Update database
-            call_session.conversation_log = conversation_log
-            self.db.commit()
+            async with async_session_scope() as db:
+                call_session = await db.get(CallSession, call_session_id)
+                if not call_session:
+                    return
+                
+                # Get current conversation log
+                conversation_log = call_session.conversation_log or []
+                
+                # Add new entries
+                conversation_log.append({
+                    "role": "user",
+                    "content": user_input,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+                
+                conversation_log.append({
+                    "role": "assistant",
+                    "content": ai_response,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+                
+                # Update database
+                call_session.conversation_log = conversation_log
             
         except Exception as e:
             logger.error(f"Error updating conversation log: {e}")
@@ -196,62 +201,59 @@ class CallService:
                 return None
             
             # Get patient data
-            call_session = self.get_call_session(call_session_id)
+            call_session = await self.get_call_session(call_session_id)
             if not call_session:
                 return None
             
             from services.patient_service import PatientService
             patient_service = PatientService()
-            patient = patient_service.get_patient(call_session.patient_id)
+            patient = await patient_service.get_patient(call_session.patient_id)
             
             if not patient:
                 return None
             
-            # Find suitable hospital
-            from services.hospital_service import HospitalService
-            hospital_service = HospitalService()
+            # Book the earliest free slot at a hospital matching the patient's
+            # medical category and location, falling back to any location
+            from services.appointment_service import AppointmentService, SlotUnavailableError
+            from schemas import AppointmentCreate
+            appointment_service = AppointmentService()
             
-            # Get hospitals matching patient's medical category and location
-            hospitals = await hospital_service.get_hospitals(
-                specialization=patient.medical_category.value,
-                location=patient.location
+            specialization = patient.medical_category.value
+            slots = await appointment_service.find_next_slots(
+                specialization=specialization, location=patient.location, limit=SCHEDULING_ATTEMPTS
             )
-            
-            if not hospitals:
-                # Fallback to any hospital with the specialization
-                hospitals = await hospital_service.get_hospitals(
-                    specialization=patient.medical_category.value
+            if not slots:
+                slots = await appointment_service.find_next_slots(
+                    specialization=specialization, limit=SCHEDULING_ATTEMPTS
                 )
             
-            if not hospitals:
-                logger.error("No suitable hospitals found")
+            if not slots:
+                logger.error("No free slots at a suitable hospital")
                 return None
             
-            # Select first available hospital
-            selected_hospital = hospitals[0]
-            
-            # Create appointment
-            from services.appointment_service import AppointmentService
-            appointment_service = AppointmentService()
-            
-            # Schedule for next available slot (simplified for POC)
-            from datetime import datetime, timedelta
-            appointment_date = datetime.utcnow() + timedelta(days=1)
-            appointment_date = appointment_date.replace(hour=10, minute=0, second=0, microsecond=0)
-            
-            appointment_data = {
-                "patient_id": patient.id,
-                "hospital_id": selected_hospital.id,
-                "appointment_date": appointment_date,
-                "notes": f"AI-scheduled appointment based on call session {call_session_id}"
-            }
-            
-            appointment = await appointment_service.create_appointment(appointment_data)
+            # Another request may take a slot between the search and the booking; try the next one
+            appointment = None
+            for slot in slots:
+                try:
+                    appointment = await appointment_service.create_appointment(AppointmentCreate(
+                        patient_id=patient.id,
+                        hospital_id=slot["hospital_id"],
+                        appointment_date=slot["start"],
+                        notes=f"AI-scheduled appointment based on call session {call_session_id}"
+                    ))
+                    break
+                except SlotUnavailableError:
+                    continue
+            
+            if not appointment:
+                logger.error(f"Free slots for patient {patient.id} were all taken while booking")
+                return None
             
             # Update call session with appointment ID
-            call_session.scheduled_appointment_id = appointment.id
-            call_session.diagnosis_notes = conversation_summary.get("diagnosis_info", {}).get("recommendation", "")
-            self.db.commit()
+            async with async_session_scope() as db:
+                call_session = await db.get(CallSession, call_session_id)
+                call_session.scheduled_appointment_id = appointment.id
+                call_session.diagnosis_notes = conversation_summary.get("diagnosis_info", {}).get("recommendation", "")
             
             logger.info(f"Appointment {appointment.id} scheduled for patient {patient.id}")
             return appointment.id
@@ -282,23 +284,24 @@ class CallService:
     async def update_call_status(self, call_session_id: str, status: CallStatusEnum):
         """Update call status"""
         try:
-            call_session = self.get_call_session(call_session_id)
-            if not call_session:
-                return
-            
-            call_session.status = status
-            if status == CallStatusEnum.COMPLETED:
-                call_session.completed_at = datetime.utcnow()
+            async with async_session_scope() as db:
+                call_session = await db.get(CallSession, call_session_id)
+                if not call_session:
+                    return
+                
+                call_session.status = status
+                if status == CallStatusEnum.COMPLETED:
+                    call_session.completed_at = datetime.utcnow()
             
-            self.db.commit()
             logger.info(f"Call session {call_session_id} status updated to {status}")
             
         except Exception as e:
             logger.error(f"Error updating call status: {e}")
     
-    def get_call_session(self, call_session_id: str) -> Optional[CallSession]:
+    async def get_call_session(self, call_session_id: str) -> Optional[CallSession]:
         """Get call session by ID"""
-        return self.db.query(CallSession).filter(CallSession.id == call_session_id).first()
+        async with async_session_scope() as db:
+            return await db.get(CallSession, call_session_id)
     
     async def handle_twilio_webhook(self, request: dict):
         """Handle Twilio webhook (for production)"""
@@ -1,20 +1,19 @@
-from sqlalchemy.orm import Session
-from database import get_db, Patient
+from sqlalchemy import select
+from database import async_session_scope, Patient
 from schemas import PatientCreate, PatientResponse
 from typing import Optional
 import uuid
 
 class PatientService:
-    def __init__(self):
-        self.db = next(get_db())
+    """Patient queries; each call runs in its own async session from the pool"""
     
     async def create_patient(self, patient_data: PatientCreate) -> Patient:
         """Create a new patient"""
-        try:
+        async with async_session_scope() as db:
             # Check if patient already exists with same phone number
-            existing_patient = self.db.query(Patient).filter(
+            existing_patient = await db.scalar(select(Patient).filter(
                 Patient.phone_number == patient_data.phone_number
-            ).first()
+            ))
             
             if existing_patient:
                 return existing_patient
@@ -32,27 +31,26 @@ class PatientService:
                 sub_category=patient_data.sub_category
             )
             
-            self.db.add(patient)
-            self.db.commit()
-            self.db.refresh(patient)
+            db.add(patient)
+            await db.flush()
+            await db.refresh(patient)
             
             return patient
-        except Exception as e:
-            self.db.rollback()
-            raise e
     
-    def get_patient(self, patient_id: int) -> Optional[Patient]:
+    async def get_patient(self, patient_id: int) -> Optional[Patient]:
         """Get patient by ID"""
-        return self.db.query(Patient).filter(Patient.id == patient_id).first()
+        async with async_session_scope() as db:
+            return await db.get(Patient, patient_id)
     
-    def get_patient_by_phone(self, phone_number: str) -> Optional[Patient]:
+    async def get_patient_by_phone(self, phone_number: str) -> Optional[Patient]:
         """Get patient by phone number"""
-        return self.db.query(Patient).filter(Patient.phone_number == phone_number).first()
+        async with async_session_scope() as db:
+            return await db.scalar(select(Patient).filter(Patient.phone_number == phone_number))
     
-    def update_patient(self, patient_id: int, update_data: dict) -> Optional[Patient]:
+    async def update_patient(self, patient_id: int, update_data: dict) -> Optional[Patient]:
         """Update patient information"""
-        try:
-            patient = self.get_patient(patient_id)
+        async with async_session_scope() as db:
+            patient = await db.get(Patient, patient_id)
             if not patient:
                 return None
             
@@ -60,23 +58,16 @@ class PatientService:
                 if hasattr(patient, key):
                     setattr(patient, key, value)
             
-            self.db.commit()
-            self.db.refresh(patient)
+            await db.flush()
+            await db.refresh(patient)
             return patient
-        except Exception as e:
-            self.db.rollback()
-            raise e
     
-    def delete_patient(self, patient_id: int) -> bool:
+    async def delete_patient(self, patient_id: int) -> bool:
         """Delete patient"""
-        try:
-            patient = self.get_patient(patient_id)
+        async with async_session_scope() as db:
+            patient = await db.get(Patient, patient_id)
             if not patient:
                 return False
             
-            self.db.delete(patient)
-            self.db.commit()
+            await db.delete(patient)
             return True
-        except Exception as e:
-            self.db.rollback()
-            raise e
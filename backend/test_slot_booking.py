@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test double-booking protection for appointment slots
+Runs AppointmentService against a scratch SQLite database: concurrent
+bookings of one slot, a slot taken by another worker process (caught by
+the ux_appointments_active_slot index) and a cancelled slot being rebooked
+
+Usage:
+    python test_slot_booking.py    (or pytest test_slot_booking.py, from backend/)
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# A scratch database, set before database.py creates its engines
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "slot_booking.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DB}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from database import (
+    Base, engine, async_engine, Patient, Hospital, HospitalSlot, Appointment,
+    GenderEnum, LanguageEnum, MedicalCategoryEnum, SubCategoryEnum, AppointmentStatusEnum
+)
+from schemas import AppointmentCreate
+from services.appointment_service import AppointmentService, SlotUnavailableError
+from services.availability_service import availability
+
+CONCURRENT_BOOKINGS = 5
+SLOTS = ["09:00", "10:00", "11:00"]
+
+appointment_service = AppointmentService()
+
+
+def setup_database():
+    """Fresh tables with one hospital and one patient"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Hospital.__table__.insert(), [{
+            "id": 1, "name": "Test Hospital", "location": "Test City", "address": "1 Main Road",
+            "phone_number": "+15550000000", "email": "test@example.com",
+        }])
+        conn.execute(Patient.__table__.insert(), [{
+            "id": 1, "name": "Test Patient", "gender": list(GenderEnum)[0], "phone_number": "+15550000001",
+            "age": 50, "location": "Test City", "language_preference": list(LanguageEnum)[0],
+            "problem_description": "Chest pain on exertion", "medical_category": list(MedicalCategoryEnum)[0],
+            "sub_category": list(SubCategoryEnum)[0],
+        }])
+        conn.execute(HospitalSlot.__table__.insert(), [{"hospital_id": 1, "slot_time": slot} for slot in SLOTS])
+
+
+def slot_start(slot):
+    """Tomorrow at slot ("HH:MM")"""
+    hours, minutes = map(int, slot.split(":"))
+    tomorrow = datetime.utcnow().date() + timedelta(days=1)
+    return datetime(tomorrow.year, tomorrow.month, tomorrow.day, hours, minutes)
+
+
+def booking(when):
+    return AppointmentCreate(patient_id=1, hospital_id=1, appointment_date=when, notes="slot booking test")
+
+
+def active_bookings(when):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(Appointment).filter(
+            Appointment.hospital_id == 1,
+            Appointment.appointment_date == when,
+            Appointment.status != AppointmentStatusEnum.CANCELLED
+        ))
+
+
+def run(coroutine):
+    """Run a test coroutine on a fresh loop and calendar"""
+    async def wrapper():
+        try:
+            await availability.load()
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(wrapper())
+
+
+def test_concurrent_bookings_of_one_slot():
+    """Only one of several simultaneous bookings of a slot succeeds"""
+    setup_database()
+    when = slot_start("09:00")
+
+    async def book_concurrently():
+        return await asyncio.gather(
+            *[appointment_service.create_appointment(booking(when)) for _ in range(CONCURRENT_BOOKINGS)],
+            return_exceptions=True
+        )
+
+    results = run(book_concurrently())
+    booked = [result for result in results if isinstance(result, Appointment)]
+    rejected = [result for result in results if isinstance(result, SlotUnavailableError)]
+    assert len(booked) == 1, results
+    assert len(rejected) == CONCURRENT_BOOKINGS - 1, results
+    # Within one process the calendar turns them away before they reach the database
+    assert all(error.__cause__ is None for error in rejected), results
+    assert active_bookings(when) == 1
+
+
+def test_slot_booked_by_another_worker():
+    """A slot this process's calendar thinks is free is rejected by the unique index"""
+    setup_database()
+    when = slot_start("10:00")
+
+    async def book_after_other_worker():
+        # Another worker process books the slot after this calendar was loaded
+        with engine.begin() as conn:
+            conn.execute(Appointment.__table__.insert(), [{
+                "patient_id": 1, "hospital_id": 1, "appointment_date": when,
+                "status": AppointmentStatusEnum.SCHEDULED,
+            }])
+        assert not availability.is_booked(1, when)
+        try:
+            await appointment_service.create_appointment(booking(when))
+        except SlotUnavailableError as e:
+            assert isinstance(e.__cause__, IntegrityError)
+            return availability.is_booked(1, when)
+        raise AssertionError("booked a slot another worker already holds")
+
+    assert run(book_after_other_worker())
+    assert active_bookings(when) == 1
+
+
+def test_cancelled_slot_can_be_rebooked():
+    """Cancelling an appointment frees its slot"""
+    setup_database()
+    when = slot_start("11:00")
+
+    async def cancel_and_rebook():
+        first = await appointment_service.create_appointment(booking(when))
+        try:
+            await appointment_service.create_appointment(booking(when))
+            raise AssertionError("booked a slot twice")
+        except SlotUnavailableError:
+            pass
+        await appointment_service.cancel_appointment(first.id, "test")
+        return await appointment_service.create_appointment(booking(when))
+
+    second = run(cancel_and_rebook())
+    assert second.status == AppointmentStatusEnum.SCHEDULED
+    assert active_bookings(when) == 1
+
+
+if __name__ == "__main__":
+    for test in (test_concurrent_bookings_of_one_slot, test_slot_booked_by_another_worker,
+                 test_cancelled_slot_can_be_rebooked):
+        test()
+        print(f"{test.__name__}: ok")
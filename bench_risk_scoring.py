@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: batch risk scoring
+Compares scoring assessments one at a time against the columnar
+risk_scoring batch API on synthetic chest pain and breathing records
+
+Usage:
+    python bench_risk_scoring.py [--records N] [--repeat N] [--seed N]
+
+numpy is used for the batch pass when installed; without it the pure
+Python batch path is measured.
+"""
+
+import argparse
+import random
+import time
+
+from risk_scoring import get_scorer, np
+
+# Answers as transcribed from real calls: a handful of phrasings per field
+CHEST_PAIN_VALUES = {
+    "pain_type": ["sharp", "Sharp stabbing", "pressure", "tightness", "dull ache", "burning", "Crushing pressure"],
+    "radiation": ["", "left arm", "Neck and jaw", "back", "none", "shoulder"],
+    "triggers": ["", "physical activity", "exercise", "stress", "after meals", "at rest"],
+    "duration": ["few minutes", "constant", "2 hours", "on and off", "seconds"],
+}
+
+BREATHING_VALUES = {
+    "severity": ["mild", "moderate", "severe", "Severe", "Moderate"],
+    "timing": ["at rest", "lying down", "during exercise", "climbing stairs", "at night"],
+    "associated_symptoms": ["", "ankle swelling", "edema", "dizziness", "fainting", "cough", "swelling and dizziness"],
+}
+
+
+def synthetic_columns(values, records, seed):
+    """Build equal-length columns by sampling each field's phrasings"""
+    rng = random.Random(seed)
+    return {field: rng.choices(options, k=records) for field, options in values.items()}
+
+
+def one_at_a_time(scorer, columns):
+    """Score record by record, as a live call does"""
+    fields = list(columns)
+    return [scorer.score(**dict(zip(fields, row)))[1] for row in zip(*columns.values())]
+
+
+def batched(scorer, columns):
+    """Score the whole batch in one call"""
+    return scorer.score_batch(columns)["risk_level"]
+
+
+def bench(func, scorer, columns, repeat):
+    """Best-of-N wall time for one pass over the batch"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(scorer, columns)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch risk scoring")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine = "numpy" if np is not None else "pure Python"
+    print(f"Risk scoring benchmark ({args.records} records per assessment type, batch engine: {engine}, best of {args.repeat})")
+    for name, scorer, values in (("chest pain", get_scorer("chest_pain"), CHEST_PAIN_VALUES),
+                                 ("breathing", get_scorer("breathing"), BREATHING_VALUES)):
+        columns = synthetic_columns(values, args.records, args.seed)
+
+        assert list(one_at_a_time(scorer, columns)) == list(batched(scorer, columns)), f"{name}: batch disagrees"
+
+        single = bench(one_at_a_time, scorer, columns, args.repeat)
+        batch = bench(batched, scorer, columns, args.repeat)
+        print(f"  {name}:")
+        print(f"    one at a time: {single * 1000:9.1f} ms  ({args.records / single / 1e6:6.2f} M records/s)")
+        print(f"    batch:         {batch * 1000:9.1f} ms  ({args.records / batch / 1e6:6.2f} M records/s)")
+        print(f"    speedup:       {single / batch:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: Twilio media frame parsing
+Compares json.loads + dict lookups + base64.b64decode against the
+twilio_media fast path on a recorded or synthetic Twilio Media Stream
+
+Usage:
+    python bench_twilio_parser.py [recording.jsonl] [--repeat N]
+
+A recording is one raw Twilio WebSocket message per line. Without one, a
+60 second synthetic call in Twilio's wire format is generated.
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import time
+
+from twilio_media import parse_twilio_message
+
+
+def synthetic_stream(seconds=60, stream_sid="MZ18ad3ab5a668481ce02b83e7395059f0"):
+    """Build the messages Twilio sends for a call of the given length"""
+    messages = [
+        json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}, separators=(",", ":")),
+        json.dumps({
+            "event": "start",
+            "sequenceNumber": "1",
+            "start": {
+                "accountSid": "AC00000000000000000000000000000000",
+                "streamSid": stream_sid,
+                "callSid": "CA00000000000000000000000000000000",
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+            },
+            "streamSid": stream_sid,
+        }, separators=(",", ":")),
+    ]
+    for i in range(seconds * 50):
+        payload = base64.b64encode(os.urandom(160)).decode("ascii")
+        messages.append(
+            '{"event":"media","sequenceNumber":"%d","media":{"track":"inbound","chunk":"%d",'
+            '"timestamp":"%d","payload":"%s"},"streamSid":"%s"}'
+            % (i + 2, i + 1, i * 20, payload, stream_sid)
+        )
+    messages.append(json.dumps({"event": "stop", "sequenceNumber": str(seconds * 50 + 2),
+                                "streamSid": stream_sid}, separators=(",", ":")))
+    return messages
+
+
+def load_recording(path):
+    """Read one Twilio message per line"""
+    with open(path, "r") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def baseline_path(messages):
+    """The original twilio_receiver parsing"""
+    audio = 0
+    for message in messages:
+        data = json.loads(message)
+        if data.get("event") == "media":
+            media = data["media"]
+            chunk = base64.b64decode(media["payload"])
+            if media["track"] == "inbound":
+                audio += len(chunk)
+    return audio
+
+
+def fast_path(messages):
+    """Parsing through twilio_media.parse_twilio_message"""
+    audio = 0
+    for message in messages:
+        event, track, payload, data = parse_twilio_message(message)
+        if event == "media" and track == "inbound":
+            audio += len(binascii.a2b_base64(payload))
+    return audio
+
+
+def bench(func, messages, repeat):
+    """Best-of-N wall time for one pass over the stream"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(messages)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Twilio media frame parsing")
+    parser.add_argument("recording", nargs="?", help="Twilio Media Stream recording, one message per line")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = load_recording(args.recording) if args.recording else synthetic_stream()
+    source = args.recording or "synthetic 60 s call"
+
+    assert baseline_path(messages) == fast_path(messages), "parsers disagree on inbound audio"
+
+    baseline = bench(baseline_path, messages, args.repeat)
+    fast = bench(fast_path, messages, args.repeat)
+    per_message = 1e6 / len(messages)
+
+    print(f"Twilio media parser benchmark ({source}, {len(messages)} messages, best of {args.repeat})")
+    print(f"  json.loads + b64decode: {baseline * 1000:8.2f} ms  ({baseline * per_message:.2f} us/message)")
+    print(f"  fast path:              {fast * 1000:8.2f} ms  ({fast * per_message:.2f} us/message)")
+    print(f"  speedup:                {baseline / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
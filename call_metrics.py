@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Call Metrics
+Lightweight in-process histograms for per-call latency measurements
+"""
+
+import bisect
+import time
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+DEFAULT_LATENCY_BUCKETS_MS = (50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        """Record one measurement in milliseconds"""
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def merge(self, other):
+        """Add the measurements of another histogram with the same buckets"""
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Approximate percentile, reported as the upper bound of its bucket"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank and value:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        """Return the histogram as a JSON-serializable dict"""
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class TurnLatencyTracker:
+    """Measures caller end-of-speech to first agent audio for one call"""
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram or LatencyHistogram()
+        self._speech_ended_at = None
+
+    def speech_ended(self, timestamp=None):
+        """Mark the moment the caller stopped speaking"""
+        self._speech_ended_at = timestamp if timestamp is not None else time.monotonic()
+
+    def speech_started(self):
+        """Forget a pending end-of-speech when the caller keeps talking"""
+        self._speech_ended_at = None
+
+    def agent_audio(self, timestamp=None):
+        """Record the latency if this is the first agent audio after caller speech"""
+        if self._speech_ended_at is None:
+            return None
+        now = timestamp if timestamp is not None else time.monotonic()
+        latency_ms = (now - self._speech_ended_at) * 1000
+        self._speech_ended_at = None
+        self.histogram.observe(latency_ms)
+        return latency_ms
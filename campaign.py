@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Outbound Call Campaigns
+Dials a cohort of patients through the dial queue inside schedule windows,
+capped by concurrency, calls per second and free media-bridge capacity
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from dial_queue import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduler passes when nothing wakes it earlier
+CAMPAIGN_TICK = float(os.getenv("CAMPAIGN_TICK", "0.5"))
+# Defaults for a campaign's concurrent calls and calls per second
+CAMPAIGN_MAX_CONCURRENT = int(os.getenv("CAMPAIGN_MAX_CONCURRENT", "10"))
+CAMPAIGN_CPS = float(os.getenv("CAMPAIGN_CPS", "1"))
+# Seconds an initiated call may ring before its media stream connects
+CAMPAIGN_ANSWER_TIMEOUT = float(os.getenv("CAMPAIGN_ANSWER_TIMEOUT", "60"))
+# Timezone of schedule windows that don't name one
+CAMPAIGN_TIMEZONE = os.getenv("CAMPAIGN_TIMEZONE", "Asia/Kolkata")
+
+# pending -> dialing -> ringing -> connected -> completed, or failed / no_answer / cancelled
+CALL_OUTCOMES = ("pending", "dialing", "ringing", "connected", "completed", "failed", "no_answer", "cancelled")
+FINISHED_OUTCOMES = ("completed", "failed", "no_answer", "cancelled")
+# Calls holding one of the campaign's concurrency slots
+ACTIVE_OUTCOMES = ("dialing", "ringing", "connected")
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def normalize_phone(phone):
+    """E.164 form of a patient phone number, assuming India when there is no country code"""
+    phone = "".join(ch for ch in str(phone or "") if ch.isdigit() or ch == "+")
+    if phone.startswith("+"):
+        return phone
+    if phone.startswith("91") and len(phone) == 12:
+        return "+" + phone
+    return "+91" + phone.lstrip("0")
+
+
+def build_cohort(patients, urgency=None):
+    """Campaign cohort from patient records, optionally only those with the given urgency; one entry per phone number"""
+    cohort = []
+    seen = set()
+    for patient in patients:
+        if urgency and patient.get("urgency") != urgency:
+            continue
+        if not patient.get("phone_number"):
+            continue
+        phone = normalize_phone(patient["phone_number"])
+        if phone in seen:
+            continue
+        seen.add(phone)
+        cohort.append({
+            "patient_id": patient.get("patient_id", patient.get("id")),
+            "name": patient.get("name", ""),
+            "phone_number": phone,
+        })
+    return cohort
+
+
+def _parse_clock(value):
+    """Minutes after midnight for "HH:MM" ("24:00" is end of day)"""
+    try:
+        hours, minutes = str(value).split(":")
+        total = int(hours) * 60 + int(minutes)
+    except ValueError:
+        raise ValueError(f"invalid time {value!r}, expected HH:MM")
+    if not 0 <= total <= 24 * 60 or not 0 <= int(minutes) < 60:
+        raise ValueError(f"invalid time {value!r}, expected HH:MM")
+    return total
+
+
+class CallWindow:
+    """Daily calling window, e.g. 09:00-18:00 Monday to Friday in Asia/Kolkata.
+
+    A window whose end is before its start runs past midnight; equal start
+    and end mean the whole day.
+    """
+
+    def __init__(self, start="00:00", end="24:00", days=None, tz=None):
+        self.start = _parse_clock(start)
+        self.end = _parse_clock(end)
+        if days is None:
+            self.days = frozenset(range(7))
+        else:
+            self.days = frozenset(self._parse_day(day) for day in days)
+        try:
+            self.tz = ZoneInfo(tz or CAMPAIGN_TIMEZONE)
+        except Exception:
+            raise ValueError(f"unknown timezone {tz!r}")
+
+    @staticmethod
+    def _parse_day(day):
+        if isinstance(day, int) and 0 <= day < 7:
+            return day
+        name = str(day).lower()[:3]
+        if name not in WEEKDAYS:
+            raise ValueError(f"invalid day {day!r}")
+        return WEEKDAYS.index(name)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Window from a {"start", "end", "days", "timezone"} dict"""
+        if not isinstance(spec, dict):
+            raise ValueError("a window must be an object with start, end, days and timezone")
+        return cls(spec.get("start", "00:00"), spec.get("end", "24:00"), spec.get("days"), spec.get("timezone"))
+
+    def contains(self, when=None):
+        """True if the aware datetime when (default now) falls inside the window"""
+        local = (when or datetime.now(timezone.utc)).astimezone(self.tz)
+        minute = local.hour * 60 + local.minute
+        day = local.weekday()
+        if self.start == self.end:
+            return day in self.days
+        if self.start < self.end:
+            return day in self.days and self.start <= minute < self.end
+        # Overnight: the late part belongs to today, the early part to yesterday's window
+        if minute >= self.start:
+            return day in self.days
+        return minute < self.end and (day - 1) % 7 in self.days
+
+    def to_dict(self):
+        return {
+            "start": f"{self.start // 60:02d}:{self.start % 60:02d}",
+            "end": f"{self.end // 60:02d}:{self.end % 60:02d}",
+            "days": [WEEKDAYS[day] for day in sorted(self.days)],
+            "timezone": self.tz.key,
+        }
+
+
+class Campaign:
+    """One cohort being dialed; its state is guarded by the engine's lock"""
+
+    def __init__(self, name, cohort, windows=(), max_concurrent=None, cps=None, start_at=None, url=None):
+        if not cohort:
+            raise ValueError("campaign cohort is empty")
+        self.id = uuid.uuid4().hex
+        self.name = name or f"Campaign {self.id[:8]}"
+        self.windows = list(windows)
+        self.max_concurrent = int(max_concurrent or CAMPAIGN_MAX_CONCURRENT)
+        self.cps = float(cps or CAMPAIGN_CPS)
+        if self.max_concurrent < 1 or self.cps <= 0:
+            raise ValueError("max_concurrent and cps must be positive")
+        self.start_at = start_at
+        self.url = url
+        self.calls = [
+            {**entry, "outcome": "pending", "call_id": None, "call_sid": None, "error": None,
+             "dialed_at": None, "finished_at": None}
+            for entry in cohort
+        ]
+        self.pending = collections.deque(range(len(self.calls)))
+        self.counts = collections.Counter(pending=len(self.calls))
+        self.bucket = TokenBucket(self.cps)
+        self.status = "scheduled"
+        self.paused = False
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return sum(self.counts[outcome] for outcome in ACTIVE_OUTCOMES)
+
+    def in_window(self, when):
+        return not self.windows or any(window.contains(when) for window in self.windows)
+
+    def snapshot(self, include_calls=False):
+        total = len(self.calls)
+        finished = sum(self.counts[outcome] for outcome in FINISHED_OUTCOMES)
+        snapshot = {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "total": total,
+            "counts": {outcome: self.counts[outcome] for outcome in CALL_OUTCOMES},
+            "progress": round(finished / total, 4),
+            "max_concurrent": self.max_concurrent,
+            "cps": self.cps,
+            "windows": [window.to_dict() for window in self.windows],
+            "start_at": self.start_at.isoformat() if self.start_at else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_calls:
+            snapshot["calls"] = [dict(call) for call in self.calls]
+        return snapshot
+
+
+class CampaignEngine:
+    """Runs campaigns on a scheduler thread that feeds a DialQueue.
+
+    Each pass dials pending patients of every running campaign while the
+    campaign is inside one of its windows, under its max_concurrent calls
+    and its own calls-per-second bucket, and while capacity() - the number
+    of media bridges that can still be opened - exceeds the calls already
+    ringing. The media bridge reports call_connected(call_sid) and
+    call_ended(call_sid); calls that don't connect within answer_timeout
+    count as no_answer.
+    """
+
+    def __init__(self, dial_queue, capacity=None, tick=None, answer_timeout=None):
+        self.dial_queue = dial_queue
+        self.capacity = capacity
+        self.tick = tick or CAMPAIGN_TICK
+        self.answer_timeout = answer_timeout or CAMPAIGN_ANSWER_TIMEOUT
+        self.campaigns = collections.OrderedDict()
+        self._by_call_id = {}  # dial queue call ID -> (campaign, call)
+        self._live = {}  # call SID -> (campaign, call) for ringing and connected calls
+        self._answer_deadlines = {}  # call SID -> monotonic time it counts as no_answer
+        self._unmatched = {}  # call SID -> (stream event, monotonic time) seen before the dial queue reported it
+        self._unanswered = 0  # dialing + ringing calls across campaigns
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Start the scheduler thread"""
+        with self._condition:
+            if self._thread:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="campaign-scheduler", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, wait=True):
+        """Stop the scheduler; calls already queued are left to the dial queue"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread, self._thread = self._thread, None
+        if wait and thread:
+            thread.join()
+
+    def create(self, name, cohort, windows=None, max_concurrent=None, cps=None, start_at=None, url=None):
+        """Create and schedule a campaign; windows are CallWindow objects or their dict specs"""
+        windows = [window if isinstance(window, CallWindow) else CallWindow.from_spec(window)
+                   for window in windows or ()]
+        if isinstance(start_at, str):
+            try:
+                start_at = datetime.fromisoformat(start_at)
+            except ValueError:
+                raise ValueError(f"invalid start_at {start_at!r}, expected an ISO 8601 datetime")
+        if start_at is not None and start_at.tzinfo is None:
+            start_at = start_at.replace(tzinfo=ZoneInfo(CAMPAIGN_TIMEZONE))
+        campaign = Campaign(name, cohort, windows, max_concurrent, cps, start_at, url)
+        with self._condition:
+            self.campaigns[campaign.id] = campaign
+            self._condition.notify_all()
+        logger.info(f"📋 Campaign {campaign.id} '{campaign.name}' created with {len(campaign.calls)} patients")
+        if not self._thread:
+            self.start()
+        return campaign.snapshot()
+
+    def get(self, campaign_id, include_calls=False):
+        """Snapshot of a campaign, or None for an unknown ID"""
+        with self._condition:
+            campaign = self.campaigns.get(campaign_id)
+            return campaign.snapshot(include_calls) if campaign else None
+
+    def list(self):
+        """Snapshots of all campaigns, oldest first"""
+        with self._condition:
+            return [campaign.snapshot() for campaign in self.campaigns.values()]
+
+    def pause(self, campaign_id):
+        """Stop dialing new patients; calls in progress carry on"""
+        return self._set_paused(campaign_id, True)
+
+    def resume(self, campaign_id):
+        """Resume dialing a paused campaign"""
+        return self._set_paused(campaign_id, False)
+
+    def cancel(self, campaign_id):
+        """Cancel the patients not yet dialed and any calls still waiting in the dial queue"""
+        with self._condition:
+            campaign = self.campaigns.get(campaign_id)
+            if campaign is None:
+                return None
+            if campaign.status not in ("completed", "cancelled"):
+                while campaign.pending:
+                    self._set_outcome(campaign, campaign.calls[campaign.pending.popleft()], "cancelled")
+                campaign.status = "cancelled"
+                campaign.finished_at = _now()
+                logger.info(f"Campaign {campaign.id} cancelled")
+            queued = [call["call_id"] for call in campaign.calls if call["outcome"] == "dialing"]
+        # Outside the lock: a cancelled job notifies _dial_update, which takes it again
+        for call_id in queued:
+            self.dial_queue.cancel(call_id)
+        return self.get(campaign_id)
+
+    def call_connected(self, call_sid):
+        """The media stream for call_sid has started"""
+        with self._condition:
+            entry = self._live.get(call_sid)
+            if entry is None:
+                self._unmatched[call_sid] = ("connected", time.monotonic())
+                return
+            if entry[1]["outcome"] != "ringing":
+                return
+            self._answer_deadlines.pop(call_sid, None)
+            self._set_outcome(*entry, "connected")
+
+    def call_ended(self, call_sid):
+        """The media stream for call_sid has closed"""
+        with self._condition:
+            entry = self._live.pop(call_sid, None)
+            if entry is None:
+                self._unmatched[call_sid] = ("ended", time.monotonic())
+                return
+            self._answer_deadlines.pop(call_sid, None)
+            self._set_outcome(*entry, "completed")
+            self._condition.notify_all()
+
+    def _set_paused(self, campaign_id, paused):
+        with self._condition:
+            campaign = self.campaigns.get(campaign_id)
+            if campaign is None:
+                return None
+            campaign.paused = paused
+            self._condition.notify_all()
+            return campaign.snapshot()
+
+    def _set_outcome(self, campaign, call, outcome):
+        previous = call["outcome"]
+        if previous in ("dialing", "ringing"):
+            self._unanswered -= 1
+        if outcome in ("dialing", "ringing"):
+            self._unanswered += 1
+        campaign.counts[previous] -= 1
+        campaign.counts[outcome] += 1
+        call["outcome"] = outcome
+        if outcome in FINISHED_OUTCOMES:
+            call["finished_at"] = _now()
+            if call["call_id"] is not None:
+                self._by_call_id.pop(call["call_id"], None)
+
+    def _dial_update(self, job):
+        # Runs on a dial worker thread for each status change of a campaign call
+        with self._condition:
+            found = self._by_call_id.get(job["id"])
+            if found is None:
+                return
+            campaign, call = found
+            if job["status"] == "initiated" and call["outcome"] == "dialing":
+                call["call_sid"] = job["call_sid"]
+                self._set_outcome(campaign, call, "ringing")
+                self._live[job["call_sid"]] = (campaign, call)
+                self._answer_deadlines[job["call_sid"]] = time.monotonic() + self.answer_timeout
+                # A quick answer can open the media stream before the REST response reaches the worker
+                early = self._unmatched.pop(job["call_sid"], None)
+                if early:
+                    self._answer_deadlines.pop(job["call_sid"])
+                    if early[0] == "connected":
+                        self._set_outcome(campaign, call, "connected")
+                    else:
+                        del self._live[job["call_sid"]]
+                        self._set_outcome(campaign, call, "completed")
+            elif job["status"] in ("failed", "cancelled"):
+                call["error"] = job["error"]
+                self._set_outcome(campaign, call, job["status"])
+                self._condition.notify_all()
+
+    def _run(self):
+        with self._condition:
+            while not self._stopping:
+                try:
+                    delay = self._schedule()
+                except Exception as e:
+                    logger.error(f"Error in campaign scheduler: {e}")
+                    delay = self.tick
+                if self._stopping:
+                    break
+                self._condition.wait(delay)
+
+    def _schedule(self):
+        """One scheduler pass under the lock; returns seconds until the next one is needed"""
+        now = datetime.now(timezone.utc)
+        monotonic = time.monotonic()
+        delay = self.tick
+
+        for call_sid, deadline in list(self._answer_deadlines.items()):
+            if monotonic >= deadline:
+                del self._answer_deadlines[call_sid]
+                self._set_outcome(*self._live.pop(call_sid), "no_answer")
+        # Streams of calls that aren't campaign calls (e.g. /register-patient) are never matched
+        for call_sid, (_, seen) in list(self._unmatched.items()):
+            if monotonic - seen >= self.answer_timeout:
+                del self._unmatched[call_sid]
+
+        free = None
+        if self.capacity is not None:
+            free = self.capacity() - self._unanswered
+
+        for campaign in self.campaigns.values():
+            if campaign.status in ("completed", "cancelled"):
+                continue
+            if not campaign.pending:
+                if not campaign.active:
+                    campaign.status = "completed"
+                    campaign.finished_at = _now()
+                    logger.info(f"✅ Campaign {campaign.id} completed: {campaign.snapshot()['counts']}")
+                continue
+            if campaign.paused:
+                campaign.status = "paused"
+                continue
+            if campaign.start_at and now < campaign.start_at:
+                campaign.status = "scheduled"
+                continue
+            if not campaign.in_window(now):
+                campaign.status = "outside_window"
+                continue
+            if campaign.status != "running":
+                campaign.status = "running"
+                campaign.started_at = campaign.started_at or _now()
+
+            while campaign.pending and campaign.active < campaign.max_concurrent and (free is None or free > 0):
+                wait = campaign.bucket.try_acquire()
+                if wait:
+                    delay = min(delay, wait)
+                    break
+                self._dial(campaign, campaign.calls[campaign.pending.popleft()])
+                if free is not None:
+                    free -= 1
+        return delay
+
+    def _dial(self, campaign, call):
+        call["dialed_at"] = _now()
+        self._set_outcome(campaign, call, "dialing")
+        call_id = self.dial_queue.submit(
+            call["phone_number"], url=campaign.url, callback=self._dial_update,
+            patient_id=call["patient_id"], patient_name=call["name"], campaign_id=campaign.id,
+        )
+        call["call_id"] = call_id
+        self._by_call_id[call_id] = (campaign, call)
+        # Without Twilio the call fails inside submit(), before it is registered above
+        job = self.dial_queue.get(call_id)
+        if job is not None and job["status"] == "failed":
+            self._dial_update(job)
@@ -4,6 +4,12 @@ Cardiology UFE Questionnaire Conversation Flow
 Structured conversation for MedAgg Healthcare Voice Agent
 """
 
+import random
+import sys
+import types
+
+from emergency_keywords import CARDIAC_EMERGENCY_KEYWORDS, CARDIAC_EMERGENCY_MATCHER
+
 # Conversation Flow Configuration
 CARDIO_CONVERSATION_FLOW = {
     "welcome": {
@@ -154,16 +160,144 @@ RESPONSE_PATTERNS = {
     ]
 }
 
-# Emergency keywords that should trigger immediate action
-EMERGENCY_KEYWORDS = [
-    "severe chest pain", "crushing pain", "heart attack", "can't breathe",
-    "emergency", "urgent", "immediate", "severe", "intense pain"
-]
+# Emergency keywords that should trigger immediate action, in every supported language
+EMERGENCY_KEYWORDS = list(CARDIAC_EMERGENCY_MATCHER.keywords)
+
+# Said when there is no pattern for an answer
+DEFAULT_RESPONSE = "Thank you for that information. Let me continue with the next question."
+
+# State id for "no state": a follow-up topic handled within the current step
+NO_STATE = -1
+
+
+class CompiledConversationFlow:
+    """Immutable, integer-indexed form of a conversation flow.
+
+    States are numbered in declaration order, with a terminal "end" state
+    last. Every per-turn lookup (message, questions, next state, follow-up,
+    response pattern) is a tuple index on precomputed data, so dispatch
+    allocates nothing. A next_step naming no state falls through to the
+    following state; a follow_up naming no state is a topic to explore
+    within the current step and maps to NO_STATE.
+    """
+
+    __slots__ = (
+        "state_names", "state_ids", "start", "end", "messages", "questions",
+        "next_states", "question_index", "response_keys", "response_ids", "responses",
+    )
+
+    def __init__(self, flow, response_patterns, start="welcome"):
+        names = tuple(flow) + ("end",)
+        ids = {name: state for state, name in enumerate(names)}
+        end = ids["end"]
+
+        messages, questions, next_states, question_index = [], [], [], {}
+        for state, name in enumerate(names[:-1]):
+            step = flow[name]
+            message = step.get("message")
+            messages.append(sys.intern(message) if message else None)
+            compiled = []
+            for position, question in enumerate(step.get("questions", [])):
+                follow_up = question.get("follow_up", "")
+                compiled.append((
+                    sys.intern(question["id"]),
+                    sys.intern(question["question"]),
+                    sys.intern(follow_up),
+                    ids.get(follow_up, NO_STATE),
+                ))
+                question_index[question["id"]] = (state, position)
+            questions.append(tuple(compiled))
+            next_states.append(ids.get(step.get("next_step"), state + 1))
+        messages.append(None)
+        questions.append(())
+        next_states.append(end)
+
+        response_keys = tuple(response_patterns)
+        set_attribute = super().__setattr__
+        set_attribute("state_names", names)
+        set_attribute("state_ids", types.MappingProxyType(ids))
+        set_attribute("start", ids[start])
+        set_attribute("end", end)
+        set_attribute("messages", tuple(messages))
+        set_attribute("questions", tuple(questions))
+        set_attribute("next_states", tuple(next_states))
+        set_attribute("question_index", types.MappingProxyType(question_index))
+        set_attribute("response_keys", response_keys)
+        set_attribute("response_ids", types.MappingProxyType(
+            {key: response_id for response_id, key in enumerate(response_keys)}
+        ))
+        set_attribute("responses", tuple(
+            tuple(sys.intern(pattern) for pattern in response_patterns[key]) for key in response_keys
+        ))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def state_id(self, name):
+        """Integer id of a state name"""
+        return self.state_ids[name]
+
+    def next_state(self, state):
+        """State that follows state once its questions are answered"""
+        return self.next_states[state]
+
+    def follow_up(self, state, position):
+        """State a question's answer leads to, or NO_STATE for an in-step follow-up"""
+        return self.questions[state][position][3]
+
+    def response_id(self, key):
+        """Integer id of a response pattern key, or NO_STATE if there is none"""
+        return self.response_ids.get(key, NO_STATE)
+
+    def response(self, response_id):
+        """A random phrasing for a response pattern id"""
+        if response_id < 0:
+            return DEFAULT_RESPONSE
+        return random.choice(self.responses[response_id])
+
+    def think_prompt(self, preamble="", emergency_function="handle_emergency"):
+        """Deepgram think prompt that walks the agent through this flow, step by step"""
+        lines = [preamble] if preamble else []
+        lines.append("Follow this conversation flow one step at a time; ask at most two questions per turn and wait for the answers.")
+
+        order = []
+        state = self.start
+        while state != self.end and state not in order:
+            order.append(state)
+            state = self.next_states[state]
+        step_numbers = {state: number for number, state in enumerate(order, 1)}
+
+        for state in order:
+            parts = [f"{step_numbers[state]}) {self.state_names[state].replace('_', ' ').capitalize()}:"]
+            if self.messages[state]:
+                parts.append(f'say "{self.messages[state]}"')
+            for _, question, follow_up, follow_up_state in self.questions[state]:
+                if follow_up_state == NO_STATE:
+                    hint = f" (then explore {follow_up.replace('_', ' ')})" if follow_up else ""
+                elif follow_up_state in step_numbers and follow_up_state != self.next_states[state]:
+                    hint = f" (if yes, continue with step {step_numbers[follow_up_state]})"
+                else:
+                    hint = ""
+                parts.append(f'ask "{question}"{hint}')
+            lines.append(f"{parts[0]} {'; '.join(parts[1:])}")
+        english_keywords = ", ".join(CARDIAC_EMERGENCY_KEYWORDS["english"])
+        lines.append(
+            f"If the caller describes an emergency ({english_keywords}, or the same in Tamil or Hindi), "
+            f"stop the questionnaire and immediately use the {emergency_function} function."
+        )
+        return "\n".join(lines)
+
+
+CARDIO_FLOW = CompiledConversationFlow(CARDIO_CONVERSATION_FLOW, RESPONSE_PATTERNS)
 
 def get_conversation_flow():
     """Return the conversation flow configuration"""
     return CARDIO_CONVERSATION_FLOW
 
+def get_compiled_flow():
+    """Return the compiled conversation flow"""
+    return CARDIO_FLOW
+
 def get_response_patterns():
     """Return response patterns for different answers"""
     return RESPONSE_PATTERNS
@@ -174,13 +308,8 @@ def get_emergency_keywords():
 
 def is_emergency_response(text):
     """Check if the response contains emergency keywords"""
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in EMERGENCY_KEYWORDS)
+    return CARDIAC_EMERGENCY_MATCHER.matches(text)
 
 def get_appropriate_response(response_type, user_answer=""):
     """Get appropriate response based on user answer"""
-    patterns = RESPONSE_PATTERNS.get(response_type, [])
-    if patterns:
-        import random
-        return random.choice(patterns)
-    return "Thank you for that information. Let me continue with the next question."
+    return CARDIO_FLOW.response(CARDIO_FLOW.response_id(response_type))
@@ -1,36 +1,23 @@
-# Simple in-memory storage for cardiology appointments and assessments
-APPOINTMENTS_DB = {"appointments": {}, "next_id": 1}
-ASSESSMENTS_DB = {"assessments": {}, "next_id": 1}
+from datetime import datetime, timezone
 
-def assess_chest_pain(location, pain_type, duration, triggers="", radiation=""):
+from cardiology_store import get_store
+from risk_scoring import get_scorer
+
+def _now():
+    """Timestamp stored with each assessment and appointment"""
+    return datetime.now(timezone.utc).isoformat()
+
+def assess_chest_pain(location, pain_type, duration, triggers="", radiation="", patient_name="", phone_number=""):
     """Assess chest pain symptoms for cardiology evaluation"""
-    assessment_id = ASSESSMENTS_DB["next_id"]
-    ASSESSMENTS_DB["next_id"] += 1
-    
-    # Risk assessment based on symptoms
-    risk_factors = 0
-    risk_level = "low"
-    
-    # High-risk indicators
-    if "sharp" in pain_type.lower() or "stabbing" in pain_type.lower():
-        risk_factors += 2
-    if "pressure" in pain_type.lower() or "tightness" in pain_type.lower():
-        risk_factors += 1
-    if "arm" in radiation.lower() or "neck" in radiation.lower() or "jaw" in radiation.lower():
-        risk_factors += 3
-    if "activity" in triggers.lower() or "exercise" in triggers.lower():
-        risk_factors += 1
-    if "constant" in duration.lower() or "hours" in duration.lower():
-        risk_factors += 1
-    
-    if risk_factors >= 4:
-        risk_level = "high"
-    elif risk_factors >= 2:
-        risk_level = "medium"
+    # Risk assessment based on symptoms, with the same rules used for batch re-triage
+    risk_factors, risk_level = get_scorer("chest_pain").score(
+        pain_type=pain_type, radiation=radiation, triggers=triggers, duration=duration
+    )
     
     assessment = {
-        "id": assessment_id,
         "type": "chest_pain",
+        "patient_name": patient_name,
+        "phone_number": phone_number,
         "location": location,
         "pain_type": pain_type,
         "duration": duration,
@@ -38,10 +25,10 @@ def assess_chest_pain(location, pain_type, duration, triggers="", radiation=""):
         "radiation": radiation,
         "risk_level": risk_level,
         "risk_factors": risk_factors,
-        "created_at": "2024-01-01T00:00:00Z"  # Will be updated with actual timestamp
+        "created_at": _now()
     }
     
-    ASSESSMENTS_DB["assessments"][assessment_id] = assessment
+    assessment_id = get_store().add_assessment(assessment)
     
     # Generate recommendation based on risk level
     if risk_level == "high":
@@ -62,45 +49,27 @@ def assess_chest_pain(location, pain_type, duration, triggers="", radiation=""):
         "next_steps": "Schedule cardiology consultation for comprehensive evaluation"
     }
 
-def assess_breathing(severity, timing, duration="", associated_symptoms=""):
+def assess_breathing(severity, timing, duration="", associated_symptoms="", patient_name="", phone_number=""):
     """Assess breathing difficulties and shortness of breath"""
-    assessment_id = ASSESSMENTS_DB["next_id"]
-    ASSESSMENTS_DB["next_id"] += 1
-    
     # Risk assessment for breathing issues
-    risk_factors = 0
-    risk_level = "low"
-    
-    if severity.lower() == "severe":
-        risk_factors += 3
-    elif severity.lower() == "moderate":
-        risk_factors += 1
-    
-    if "rest" in timing.lower() or "lying" in timing.lower():
-        risk_factors += 2
-    if "swelling" in associated_symptoms.lower() or "edema" in associated_symptoms.lower():
-        risk_factors += 2
-    if "dizziness" in associated_symptoms.lower() or "fainting" in associated_symptoms.lower():
-        risk_factors += 1
-    
-    if risk_factors >= 4:
-        risk_level = "high"
-    elif risk_factors >= 2:
-        risk_level = "medium"
+    risk_factors, risk_level = get_scorer("breathing").score(
+        severity=severity, timing=timing, associated_symptoms=associated_symptoms
+    )
     
     assessment = {
-        "id": assessment_id,
         "type": "breathing",
+        "patient_name": patient_name,
+        "phone_number": phone_number,
         "severity": severity,
         "timing": timing,
         "duration": duration,
         "associated_symptoms": associated_symptoms,
         "risk_level": risk_level,
         "risk_factors": risk_factors,
-        "created_at": "2024-01-01T00:00:00Z"
+        "created_at": _now()
     }
     
-    ASSESSMENTS_DB["assessments"][assessment_id] = assessment
+    assessment_id = get_store().add_assessment(assessment)
     
     # Generate recommendation
     if risk_level == "high":
@@ -123,9 +92,6 @@ def assess_breathing(severity, timing, duration="", associated_symptoms=""):
 
 def schedule_appointment(patient_name, phone_number, appointment_type, urgency, preferred_time=""):
     """Schedule a cardiology appointment"""
-    appointment_id = APPOINTMENTS_DB["next_id"]
-    APPOINTMENTS_DB["next_id"] += 1
-    
     # Determine appointment details based on urgency
     if urgency.lower() == "emergency":
         appointment_time = "Immediate - Emergency Department"
@@ -144,7 +110,7 @@ def schedule_appointment(patient_name, phone_number, appointment_type, urgency,
         appointment_time = f"{preferred_time} - {appointment_time}"
     
     appointment = {
-        "id": appointment_id,
+        "type": "appointment",
         "patient_name": patient_name,
         "phone_number": phone_number,
         "appointment_type": appointment_type,
@@ -153,10 +119,10 @@ def schedule_appointment(patient_name, phone_number, appointment_type, urgency,
         "scheduled_time": appointment_time,
         "duration": duration,
         "status": "scheduled",
-        "created_at": "2024-01-01T00:00:00Z"
+        "created_at": _now()
     }
     
-    APPOINTMENTS_DB["appointments"][appointment_id] = appointment
+    appointment_id = get_store().add_appointment(appointment)
     
     return {
         "appointment_id": appointment_id,
@@ -167,7 +133,7 @@ def schedule_appointment(patient_name, phone_number, appointment_type, urgency,
 
 def check_appointment(appointment_id):
     """Check existing appointment status"""
-    appointment = APPOINTMENTS_DB["appointments"].get(int(appointment_id))
+    appointment = get_store().get_appointment(int(appointment_id))
     if appointment:
         return {
             "found": True,
@@ -181,30 +147,27 @@ def check_appointment(appointment_id):
         "message": "Please check your appointment ID and try again"
     }
 
-def handle_emergency(symptoms, severity, patient_location=""):
+def handle_emergency(symptoms, severity, patient_location="", patient_name="", phone_number=""):
     """Handle emergency situations with immediate response"""
-    emergency_id = ASSESSMENTS_DB["next_id"]
-    ASSESSMENTS_DB["next_id"] += 1
-    
     emergency = {
-        "id": emergency_id,
         "type": "emergency",
+        "patient_name": patient_name,
+        "phone_number": phone_number,
         "symptoms": symptoms,
         "severity": severity,
         "location": patient_location,
         "action_required": "immediate_medical_attention",
-        "created_at": "2024-01-01T00:00:00Z"
+        "created_at": _now()
     }
     
-    ASSESSMENTS_DB["assessments"][emergency_id] = emergency
+    emergency_id = get_store().add_assessment(emergency)
     
     # Generate emergency response
-    if severity.lower() == "critical" or "heart attack" in symptoms.lower():
+    _, priority = get_scorer("emergency").score(severity=severity, symptoms=symptoms)
+    if priority == "critical":
         emergency_message = f"🚨 CRITICAL EMERGENCY ALERT 🚨\n\nPatient: {patient_location or 'Location not provided'}\nSymptoms: {symptoms}\nSeverity: {severity}\n\nIMMEDIATE ACTION REQUIRED:\n1. Call 108 (Emergency Services) immediately\n2. If patient is conscious, have them sit down and rest\n3. Do NOT give any medication unless prescribed\n4. Stay with the patient until emergency services arrive\n\nThis is a medical emergency requiring immediate professional intervention."
-        priority = "critical"
     else:
         emergency_message = f"🚨 EMERGENCY ALERT 🚨\n\nPatient: {patient_location or 'Location not provided'}\nSymptoms: {symptoms}\nSeverity: {severity}\n\nIMMEDIATE ACTION REQUIRED:\n1. Call 108 (Emergency Services) immediately\n2. Go to the nearest hospital emergency room\n3. Do not delay seeking medical attention\n\nPlease seek immediate medical care for these symptoms."
-        priority = "urgent"
     
     return {
         "emergency_id": emergency_id,
@@ -221,17 +184,10 @@ def handle_emergency(symptoms, severity, patient_location=""):
 
 def get_patient_history(patient_name, phone_number):
     """Get patient's medical history and previous assessments"""
-    # Find all assessments for this patient
-    patient_assessments = []
-    for assessment in ASSESSMENTS_DB["assessments"].values():
-        # In a real system, you'd match by patient ID or phone number
-        patient_assessments.append(assessment)
-    
-    # Find all appointments for this patient
-    patient_appointments = []
-    for appointment in APPOINTMENTS_DB["appointments"].values():
-        if appointment["patient_name"].lower() == patient_name.lower():
-            patient_appointments.append(appointment)
+    # Indexed lookups by phone number or name
+    store = get_store()
+    patient_assessments = store.find_assessments(phone_number, patient_name)
+    patient_appointments = store.find_appointments(phone_number, patient_name)
     
     return {
         "patient_name": patient_name,
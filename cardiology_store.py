@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Cardiology Storage
+Persistent storage for assessments and appointments created by the
+cardiology agent functions, indexed by patient phone number and name
+"""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+
+
+def _name_key(patient_name):
+    """Case-insensitive lookup key for a patient name"""
+    return (patient_name or "").strip().lower()
+
+
+class CardiologyStore(abc.ABC):
+    """Storage interface used by cardiology_functions.
+
+    Records are plain dicts; the store assigns the integer "id". Lookups by
+    patient match the phone number or the case-insensitive name, ignoring
+    whichever of the two is empty. A store missing any method fails when it
+    is constructed rather than during a call.
+    """
+
+    @abc.abstractmethod
+    def add_assessment(self, record):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_appointment(self, record):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_appointment(self, appointment_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find_assessments(self, phone_number="", patient_name=""):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find_appointments(self, phone_number="", patient_name=""):
+        raise NotImplementedError
+
+
+class SQLiteCardiologyStore(CardiologyStore):
+    """SQLite-backed store, shared by every worker process using the same file.
+
+    The database runs in WAL mode so several processes can read while one
+    writes; within a process a single connection is shared under a lock,
+    since agent functions run on worker threads.
+    """
+
+    _TABLES = ("assessments", "appointments")
+
+    def __init__(self, path="cardiology.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            for table in self._TABLES:
+                self._conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        type TEXT,
+                        patient_name TEXT NOT NULL DEFAULT '',
+                        patient_name_key TEXT NOT NULL DEFAULT '',
+                        phone_number TEXT NOT NULL DEFAULT '',
+                        data TEXT NOT NULL,
+                        created_at TEXT
+                    )
+                """)
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_phone ON {table} (phone_number)")
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_name ON {table} (patient_name_key)")
+
+    def add_assessment(self, record):
+        return self._insert("assessments", record)
+
+    def add_appointment(self, record):
+        return self._insert("appointments", record)
+
+    def get_appointment(self, appointment_id):
+        with self._lock:
+            row = self._conn.execute("SELECT id, data FROM appointments WHERE id = ?", (appointment_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def find_assessments(self, phone_number="", patient_name=""):
+        return self._find("assessments", phone_number, patient_name)
+
+    def find_appointments(self, phone_number="", patient_name=""):
+        return self._find("appointments", phone_number, patient_name)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, table, record):
+        data = {key: value for key, value in record.items() if key != "id"}
+        patient_name = record.get("patient_name", "")
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"INSERT INTO {table} (type, patient_name, patient_name_key, phone_number, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record.get("type"), patient_name, _name_key(patient_name),
+                 record.get("phone_number", ""), json.dumps(data), record.get("created_at")),
+            )
+        record_id = cursor.lastrowid
+        record["id"] = record_id
+        return record_id
+
+    def _find(self, table, phone_number, patient_name):
+        clauses, params = [], []
+        if phone_number:
+            clauses.append("phone_number = ?")
+            params.append(phone_number)
+        if _name_key(patient_name):
+            clauses.append("patient_name_key = ?")
+            params.append(_name_key(patient_name))
+        if not clauses:
+            return []
+
+        # Each clause is served by its own index; SQLite unions them for the OR
+        query = f"SELECT id, data FROM {table} WHERE {' OR '.join(clauses)} ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row):
+        return {"id": row["id"], **json.loads(row["data"])}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store, opening CARDIOLOGY_DB_PATH (default cardiology.db) on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteCardiologyStore(os.getenv("CARDIOLOGY_DB_PATH", "cardiology.db"))
+    return _store
+
+
+def set_store(store):
+    """Replace the process-wide store, e.g. with another backend or an in-memory database"""
+    global _store
+    _store = store
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Deepgram Agent Connection Pool
+Keeps a few Deepgram Agent websockets connected ahead of time so TLS and the
+websocket handshake are off the call-setup critical path
+"""
+
+import asyncio
+import collections
+import contextlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AgentSessionPool:
+    """Bounded pool of pre-connected Deepgram Agent websockets.
+
+    connect is a zero-argument callable returning an awaitable websocket
+    (e.g. sts_connect). Idle sessions are closed after idle_timeout seconds so
+    a connection is never held open long before it is used, and are pinged
+    every health_interval seconds so a dead socket is never handed out.
+    The pool is only filled while there is demand: warm() (called when a
+    call is about to connect) and acquire() refill it, and the background
+    loop tops it up only until demand_window seconds after the last of
+    those, so an idle worker holds no Deepgram connections.
+    Sessions are not configured in advance: sending the settings starts the
+    agent and its greeting, which must wait until the caller is connected.
+    """
+
+    def __init__(self, connect, size=2, idle_timeout=10.0, health_interval=5.0, ping_timeout=2.0,
+                 demand_window=60.0):
+        self.connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.demand_window = demand_window
+        self._demand_at = None  # monotonic time of the last warm() or acquire()
+        self._idle = collections.deque()  # (websocket, connected_at)
+        self._connecting = 0
+        self._maintain_task = None
+        self._closing = False
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.failed_health_checks = 0
+
+    def start(self):
+        """Start background health checks and on-demand refill on the running loop"""
+        if self._maintain_task is None and self.size > 0:
+            self._maintain_task = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        """Stop maintenance and close every idle session"""
+        self._closing = True
+        if self._maintain_task:
+            self._maintain_task.cancel()
+            self._maintain_task = None
+        while self._idle:
+            websocket, _ = self._idle.popleft()
+            await self._discard(websocket)
+
+    def warm(self):
+        """A call is coming: start connecting sessions until the pool is full, without waiting for them"""
+        self._demand_at = time.monotonic()
+        self._refill()
+
+    async def acquire(self):
+        """Return a connected session, from the pool when one is warm"""
+        now = time.monotonic()
+        while self._idle:
+            websocket, connected_at = self._idle.popleft()
+            if websocket.open and now - connected_at < self.idle_timeout:
+                self.hits += 1
+                self.warm()
+                return websocket
+            self.expired += 1
+            asyncio.create_task(self._discard(websocket))
+
+        self.misses += 1
+        self.warm()
+        return await self.connect()
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """Acquire a session for one call and close it when the call ends"""
+        websocket = await self.acquire()
+        try:
+            yield websocket
+        finally:
+            await self._discard(websocket)
+
+    def stats(self):
+        """Pool occupancy and hit counters"""
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connecting": self._connecting,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "failed_health_checks": self.failed_health_checks,
+        }
+
+    def _refill(self):
+        if self._closing:
+            return
+        missing = self.size - len(self._idle) - self._connecting
+        for _ in range(max(0, missing)):
+            self._connecting += 1
+            asyncio.create_task(self._add_session())
+
+    async def _add_session(self):
+        try:
+            websocket = await self.connect()
+        except Exception as e:
+            logger.warning(f"Could not pre-connect Deepgram Agent session: {e}")
+            return
+        finally:
+            self._connecting -= 1
+
+        if self._closing or len(self._idle) >= self.size:
+            await self._discard(websocket)
+            return
+        self._idle.append((websocket, time.monotonic()))
+
+    async def _discard(self, websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    async def _check_health(self):
+        now = time.monotonic()
+        for _ in range(len(self._idle)):
+            if not self._idle:
+                break  # sessions were acquired while we were pinging
+            websocket, connected_at = self._idle.popleft()
+            if not websocket.open or now - connected_at >= self.idle_timeout:
+                self.expired += 1
+                await self._discard(websocket)
+                continue
+            try:
+                pong = await websocket.ping()
+                await asyncio.wait_for(pong, self.ping_timeout)
+            except Exception:
+                self.failed_health_checks += 1
+                await self._discard(websocket)
+                continue
+            self._idle.append((websocket, connected_at))
+
+    async def _maintain(self):
+        while True:
+            try:
+                await self._check_health()
+                if self._demand_at is not None and time.monotonic() - self._demand_at < self.demand_window:
+                    self._refill()
+            except Exception as e:
+                logger.error(f"Error maintaining Deepgram Agent pool: {e}")
+            await asyncio.sleep(self.health_interval)
@@ -18,6 +18,7 @@ import requests
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
 import urllib.parse
+from emergency_keywords import EmergencyScanner, GENERAL_EMERGENCY_MATCHER
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -79,9 +80,8 @@ def get_ai_response(user_input, language="english"):
     """Get AI response based on user input and language"""
     user_input_lower = user_input.lower()
     
-    # Emergency keywords
-    emergency_keywords = ['emergency', 'urgent', 'pain', 'bleeding', 'unconscious', 'chest pain', 'heart attack', 'stroke']
-    if any(keyword in user_input_lower for keyword in emergency_keywords):
+    # Emergency keywords (English, Tamil and Hindi)
+    if GENERAL_EMERGENCY_MATCHER.matches(user_input):
         return MEDICAL_RESPONSES[language]["emergency"]
     
     # Common medical concerns
@@ -164,6 +164,7 @@ def stream(ws):
                 
                 async def receive_transcription():
                     """Receive transcription from Deepgram and respond"""
+                    emergency_scanner = EmergencyScanner(GENERAL_EMERGENCY_MATCHER)
                     async for response in deepgram_ws:
                         try:
                             result = json.loads(response)
@@ -172,8 +173,19 @@ def stream(ws):
                             transcript = result.get('channel', {}).get('alternatives', [{}])[0].get('transcript', '')
                             is_final = result.get('is_final', False)
                             
+                            # Escalate as soon as an interim result mentions an emergency
+                            keyword = emergency_scanner.feed(transcript)
+                            if keyword:
+                                logger.warning(f"🚨 Emergency keyword '{keyword}' in transcript: {transcript}")
+                                await ws.send(json.dumps({
+                                    'event': 'say',
+                                    'text': MEDICAL_RESPONSES[language]["emergency"]
+                                }))
+                            
                             if transcript and is_final:
                                 logger.info(f"🎯 Transcript: {transcript}")
+                                escalated = emergency_scanner.escalated
+                                emergency_scanner.reset()
                                 
                                 # Get AI response
                                 ai_response = get_ai_response(transcript, language)
@@ -193,11 +205,12 @@ def stream(ws):
                                         'timestamp': datetime.now().isoformat()
                                     })
                                 
-                                # Send AI response back to Twilio
-                                await ws.send(json.dumps({
-                                    'event': 'say',
-                                    'text': ai_response
-                                }))
+                                # Send AI response back to Twilio, unless the emergency message already went out
+                                if not (escalated and ai_response == MEDICAL_RESPONSES[language]["emergency"]):
+                                    await ws.send(json.dumps({
+                                        'event': 'say',
+                                        'text': ai_response
+                                    }))
                                 
                                 # Check if conversation should end
                                 if any(word in transcript.lower() for word in ['goodbye', 'thank you', 'bye', 'end', 'stop']):
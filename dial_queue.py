@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Outbound Dial Queue
+Places Twilio calls on background workers with retries, exponential
+backoff and per-account calls-per-second limits, tracked by call ID
+"""
+
+import collections
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Worker threads placing calls
+DIAL_WORKERS = int(os.getenv("DIAL_WORKERS", "4"))
+# Twilio's default outbound limit is 1 call per second per account
+TWILIO_CPS = float(os.getenv("TWILIO_CPS", "1"))
+# Attempts per call before giving up, and the first retry delay in seconds (doubled each time)
+DIAL_MAX_ATTEMPTS = int(os.getenv("DIAL_MAX_ATTEMPTS", "3"))
+DIAL_RETRY_BACKOFF = float(os.getenv("DIAL_RETRY_BACKOFF", "2"))
+
+# Finished calls kept for status polling
+DIAL_HISTORY = 10000
+
+FINAL_STATUSES = ("initiated", "failed", "cancelled")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class DialerUnavailable(RuntimeError):
+    """No call can be placed at all (e.g. Twilio is not configured); never retried"""
+
+
+def is_retryable(error):
+    """True unless Twilio rejected the request itself (4xx other than 429 Too Many Requests) or can't be reached"""
+    if isinstance(error, DialerUnavailable):
+        return False
+    status = getattr(error, "status", None)
+    if isinstance(status, int) and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+def twilio_call_placer(client, from_number, url):
+    """place_call function for DialQueue that dials job["to"] with the Twilio REST client.
+
+    Without a client the function is marked unavailable, and DialQueue fails
+    calls at submit() instead of queueing them.
+    """
+    def place_call(job):
+        if client is None:
+            raise DialerUnavailable("Twilio client not initialized")
+        if job["to"].startswith("+91") and job["attempts"] == 1:
+            logger.warning("⚠️ Indian number detected. Trial accounts may need verification.")
+        try:
+            call = client.calls.create(url=job.get("url") or url, to=job["to"], from_=from_number)
+        except Exception as e:
+            error_msg = str(e)
+            if "401" in error_msg or "Authenticate" in error_msg:
+                logger.error("🔑 Authentication failed. Check Twilio credentials.")
+            elif "unverified" in error_msg.lower():
+                logger.error("📱 Phone number needs verification for trial accounts.")
+            elif "not a valid phone number" in error_msg.lower():
+                logger.error("📱 Invalid phone number format.")
+            raise
+        return call.sid
+    place_call.available = client is not None
+    return place_call
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, up to burst saved up"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take a token, returning how many seconds to wait before using it"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def try_acquire(self):
+        """Take a token only if one is available now; returns 0.0, or the seconds until one will be"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DialQueue:
+    """Queue of outbound calls placed by background worker threads.
+
+    place_call(job) dials job["to"] and returns the call SID, raising on
+    failure. submit() returns a call ID immediately; the job then moves
+    through queued -> dialing -> initiated, or retrying (with exponential
+    backoff) and finally failed. Calls are paced per Twilio account by a
+    token bucket. get() polls a call, wait() blocks until its status
+    changes, and subscribe() registers a callback run on every change
+    (unsubscribe() removes it).
+    """
+
+    def __init__(self, place_call, workers=None, cps=None, max_attempts=None, backoff=None,
+                 max_backoff=60.0, account="default"):
+        self.place_call = place_call
+        self.workers = workers or DIAL_WORKERS
+        self.cps = cps or TWILIO_CPS
+        self.max_attempts = max_attempts or DIAL_MAX_ATTEMPTS
+        self.backoff = backoff if backoff is not None else DIAL_RETRY_BACKOFF
+        self.max_backoff = max_backoff
+        self.account = account
+        self.jobs = collections.OrderedDict()
+        self._ready = []  # heap of (ready_at, sequence, call_id)
+        self._sequence = itertools.count()
+        self._buckets = {}
+        self._listeners = collections.defaultdict(list)
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self.counts = collections.Counter()
+
+    def start(self):
+        """Start the worker threads"""
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"dial-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, wait=True):
+        """Stop the workers; queued calls stay queued"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def submit(self, to, url=None, account=None, callback=None, **metadata):
+        """Queue a call to the number to and return its call ID; callback is subscribed before it can be placed.
+
+        If place_call is marked unavailable the call is recorded as failed
+        straight away rather than queued.
+        """
+        call_id = uuid.uuid4().hex
+        job = {
+            "id": call_id,
+            "to": to,
+            "url": url,
+            "account": account or self.account,
+            "status": "queued",
+            "attempts": 0,
+            "call_sid": None,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+            **metadata,
+        }
+        unavailable = not getattr(self.place_call, "available", True)
+        with self._condition:
+            self.jobs[call_id] = job
+            if callback is not None:
+                self._listeners[call_id].append(callback)
+            self._evict()
+            self.counts["submitted"] += 1
+            if unavailable:
+                job["error"] = "Twilio client not initialized"
+                self._set_status(job, "failed")
+                self.counts["failed"] += 1
+            else:
+                heapq.heappush(self._ready, (time.monotonic(), next(self._sequence), call_id))
+                self._condition.notify()
+        if unavailable:
+            logger.error(f"❌ Call {call_id} to {to} not placed: {job['error']}")
+            self._notify(job)
+            return call_id
+        if not self._threads:
+            self.start()
+        return call_id
+
+    def get(self, call_id):
+        """Snapshot of a call's status, or None for an unknown ID"""
+        with self._condition:
+            job = self.jobs.get(call_id)
+            return dict(job) if job else None
+
+    def wait(self, call_id, timeout=None, status=None):
+        """Block until the call's status differs from status (default: its current status) or reaches a final one"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            job = self.jobs.get(call_id)
+            if job is None:
+                return None
+            status = status or job["status"]
+            while job["status"] == status and job["status"] not in FINAL_STATUSES:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return dict(job)
+
+    def subscribe(self, call_id, callback):
+        """Call callback(job snapshot) from a worker thread on each status change of the call"""
+        with self._condition:
+            self._listeners[call_id].append(callback)
+
+    def unsubscribe(self, call_id, callback):
+        """Stop calling a callback registered with subscribe()"""
+        with self._condition:
+            listeners = self._listeners.get(call_id)
+            if listeners and callback in listeners:
+                listeners.remove(callback)
+                if not listeners:
+                    del self._listeners[call_id]
+
+    def cancel(self, call_id):
+        """Cancel a call that has not been placed yet; returns True if it was cancelled"""
+        with self._condition:
+            job = self.jobs.get(call_id)
+            if job is None or job["status"] not in ("queued", "retrying"):
+                return False
+            self._set_status(job, "cancelled")
+        self._notify(job)
+        return True
+
+    def pending(self):
+        """Calls waiting to be placed, including retries"""
+        with self._condition:
+            return len(self._ready)
+
+    def stats(self):
+        """Queue depth and outcome counters"""
+        with self._condition:
+            return {"pending": len(self._ready), "tracked": len(self.jobs), "workers": len(self._threads), **self.counts}
+
+    def _bucket(self, account):
+        # Workers race to dial an account's first calls; they must share one bucket
+        with self._condition:
+            bucket = self._buckets.get(account)
+            if bucket is None:
+                bucket = self._buckets[account] = TokenBucket(self.cps)
+            return bucket
+
+    def _next_job(self):
+        with self._condition:
+            while not self._stopping:
+                if self._ready:
+                    ready_at, _, call_id = self._ready[0]
+                    delay = ready_at - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._ready)
+                        job = self.jobs.get(call_id)
+                        if job is None or job["status"] not in ("queued", "retrying"):
+                            continue
+                        self._set_status(job, "dialing")
+                        job["attempts"] += 1
+                        return job
+                    self._condition.wait(delay)
+                else:
+                    self._condition.wait()
+            return None
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._notify(job)
+            self._bucket(job["account"]).acquire()
+            try:
+                call_sid = self.place_call(job)
+            except Exception as e:
+                self._failed(job, e)
+            else:
+                with self._condition:
+                    job["call_sid"] = call_sid
+                    job["error"] = None
+                    self._set_status(job, "initiated")
+                    self.counts["initiated"] += 1
+                logger.info(f"📞 Call {job['id']} to {job['to']} initiated: {call_sid}")
+            self._notify(job)
+
+    def _failed(self, job, error):
+        retry = is_retryable(error) and job["attempts"] < self.max_attempts
+        with self._condition:
+            job["error"] = str(error)
+            if retry:
+                delay = min(self.max_backoff, self.backoff * 2 ** (job["attempts"] - 1))
+                self._set_status(job, "retrying")
+                heapq.heappush(self._ready, (time.monotonic() + delay, next(self._sequence), job["id"]))
+                self.counts["retries"] += 1
+            else:
+                self._set_status(job, "failed")
+                self.counts["failed"] += 1
+        if retry:
+            logger.warning(f"Call {job['id']} to {job['to']} failed (attempt {job['attempts']}), retrying in {delay:.1f}s: {error}")
+        else:
+            logger.error(f"❌ Call {job['id']} to {job['to']} failed after {job['attempts']} attempt(s): {error}")
+
+    def _set_status(self, job, status):
+        job["status"] = status
+        job["updated_at"] = _now()
+        self._condition.notify_all()
+
+    def _notify(self, job):
+        with self._condition:
+            listeners = list(self._listeners.get(job["id"], ()))
+            snapshot = dict(job)
+            if job["status"] in FINAL_STATUSES:
+                self._listeners.pop(job["id"], None)
+        for callback in listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Error in dial status callback for {job['id']}: {e}")
+
+    def _evict(self):
+        # Forget the oldest finished calls once the history is full
+        if len(self.jobs) <= DIAL_HISTORY:
+            return
+        for call_id in list(self.jobs):
+            if len(self.jobs) <= DIAL_HISTORY:
+                break
+            if self.jobs[call_id]["status"] in FINAL_STATUSES:
+                del self.jobs[call_id]
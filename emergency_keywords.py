@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Emergency Keyword Matching
+Compiled multi-language keyword matchers shared by every agent, with an
+incremental scanner for streaming interim transcripts
+"""
+
+import os
+import re
+import unicodedata
+
+# Red-flag phrases for the cardiology assessment flow
+CARDIAC_EMERGENCY_KEYWORDS = {
+    "english": [
+        "severe chest pain", "crushing pain", "heart attack", "can't breathe",
+        "emergency", "urgent", "immediate", "severe", "intense pain"
+    ],
+    "tamil": [
+        "கடுமையான நெஞ்சு வலி", "நெஞ்சை அழுத்தும் வலி", "மாரடைப்பு", "மூச்சு விட முடியவில்லை",
+        "அவசரம்", "அவசர", "உடனடியாக", "கடுமையான", "தீவிர வலி"
+    ],
+    "hindi": [
+        "सीने में तेज दर्द", "सीने में तेज़ दर्द", "दबाव वाला दर्द", "दिल का दौरा", "सांस नहीं", "साँस नहीं",
+        "आपातकाल", "आपात", "तुरंत", "गंभीर", "बहुत तेज दर्द", "बहुत तेज़ दर्द"
+    ]
+}
+
+# Broader triage terms used by the general voice agents' canned responses
+GENERAL_EMERGENCY_KEYWORDS = {
+    "english": [
+        "emergency", "urgent", "pain", "bleeding", "unconscious", "chest pain", "heart attack", "stroke"
+    ],
+    "tamil": [
+        "அவசரம்", "அவசர", "வலி", "இரத்தப்போக்கு", "ரத்தம் வருகிறது", "மயக்கம்", "நெஞ்சு வலி",
+        "மாரடைப்பு", "பக்கவாதம்"
+    ],
+    "hindi": [
+        "आपातकाल", "आपात", "दर्द", "खून बह", "बेहोश", "सीने में दर्द", "दिल का दौरा", "लकवा"
+    ]
+}
+
+
+def normalize_transcript(text):
+    """Fold case and Unicode form so transcripts and keywords compare equal"""
+    return unicodedata.normalize("NFC", text).replace("’", "'").casefold()
+
+
+class KeywordMatcher:
+    """Finds any of a fixed set of phrases in one pass over the text.
+
+    All keywords are compiled into a single alternation, longest first, so a
+    transcript is scanned once no matter how many terms or languages are
+    loaded. Matching is by substring, like the `keyword in text` checks it
+    replaces.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(normalize_transcript(keyword) for keyword in keywords if keyword))
+        self.max_length = max((len(keyword) for keyword in self.keywords), default=0)
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(keyword) for keyword in ordered)) if ordered else None
+
+    def search(self, normalized_text, pos=0):
+        """Return the first keyword in already-normalized text at or after pos, or None"""
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(normalized_text, pos)
+        return match.group(0) if match else None
+
+    def find(self, text):
+        """Return the first keyword found in text, or None"""
+        return self.search(normalize_transcript(text))
+
+    def matches(self, text):
+        """True if text contains any keyword"""
+        return self.find(text) is not None
+
+
+class EmergencyScanner:
+    """Scans the interim transcripts of one utterance as they stream in.
+
+    Deepgram resends the whole utterance with every interim result, usually
+    extending the previous one. Only the part after the unchanged prefix
+    (plus enough overlap for a keyword straddling it) is rescanned, and the
+    scanner fires once per utterance. Call reset() after the final
+    transcript to start the next utterance.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.reset()
+
+    def reset(self):
+        """Forget the current utterance"""
+        self._text = ""
+        self.keyword = None
+
+    def feed(self, transcript):
+        """Scan the latest transcript; return the keyword the first time one is found, else None"""
+        if self.keyword is not None or not transcript:
+            return None
+        text = normalize_transcript(transcript)
+
+        # Everything in the unchanged prefix was already scanned without a match
+        unchanged = len(os.path.commonprefix((self._text, text)))
+        start = max(0, unchanged - self.matcher.max_length + 1)
+        self._text = text
+
+        keyword = self.matcher.search(text, start)
+        if keyword is not None:
+            self.keyword = keyword
+        return keyword
+
+    @property
+    def escalated(self):
+        """True once the current utterance has matched a keyword"""
+        return self.keyword is not None
+
+
+def _flatten(keywords_by_language):
+    return [keyword for keywords in keywords_by_language.values() for keyword in keywords]
+
+
+CARDIAC_EMERGENCY_MATCHER = KeywordMatcher(_flatten(CARDIAC_EMERGENCY_KEYWORDS))
+GENERAL_EMERGENCY_MATCHER = KeywordMatcher(_flatten(GENERAL_EMERGENCY_KEYWORDS))
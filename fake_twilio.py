@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Local Twilio Fake
+In-process stand-in for twilio.rest.Client's calls API, for exercising the
+dial queue and call campaigns without placing real calls
+"""
+
+import collections
+import random
+import threading
+import time
+import uuid
+
+from twilio.base.exceptions import TwilioRestException
+
+
+class FakeCall:
+    """What calls.create() returns: the fields the voice agent reads"""
+
+    def __init__(self, sid, to, from_, url):
+        self.sid = sid
+        self.to = to
+        self.from_ = from_
+        self.url = url
+        self.status = "queued"
+
+
+class FakeCallList:
+    """client.calls: create() answers the way the Twilio REST API does"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, to, from_, url=None, **kwargs):
+        return self._client._create(to, from_, url)
+
+
+class FakeTwilioClient:
+    """Fake Twilio REST client with account limits and simulated callees.
+
+    calls.create() takes latency seconds and raises TwilioRestException
+    like the real API: 429 beyond cps calls per second, 400 for numbers
+    that are not E.164, and 500 for a failure_rate share of requests.
+    Each placed call rings for ring_time seconds; answer_rate of them are
+    answered and on_connect(call_sid) is called, then on_end(call_sid)
+    after talk_time seconds - the events the media bridge would report.
+    """
+
+    def __init__(self, cps=1.0, latency=0.0, failure_rate=0.0, answer_rate=1.0, ring_time=0.0, talk_time=0.0,
+                 on_connect=None, on_end=None, seed=None):
+        self.cps = cps
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.answer_rate = answer_rate
+        self.ring_time = ring_time
+        self.talk_time = talk_time
+        self.on_connect = on_connect
+        self.on_end = on_end
+        self.calls = FakeCallList(self)
+        self.placed = []
+        self.rejected = collections.Counter()
+        self.in_progress = 0
+        self.max_in_progress = 0
+        self._random = random.Random(seed)
+        self._recent = collections.deque()  # monotonic times of calls accepted in the last second
+        self._lock = threading.Lock()
+
+    def _create(self, to, from_, url):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if not (to.startswith("+") and to[1:].isdigit() and 8 <= len(to) <= 16):
+                self.rejected[400] += 1
+                raise TwilioRestException(400, "/Calls.json", msg=f"The 'To' number {to} is not a valid phone number.",
+                                          code=21211, method="POST")
+            if len(self._recent) >= self.cps:
+                self.rejected[429] += 1
+                raise TwilioRestException(429, "/Calls.json", msg="Too Many Requests", code=20429, method="POST")
+            if self._random.random() < self.failure_rate:
+                self.rejected[500] += 1
+                raise TwilioRestException(500, "/Calls.json", msg="Internal Server Error", method="POST")
+            self._recent.append(now)
+            answered = self._random.random() < self.answer_rate
+            call = FakeCall(f"CA{uuid.uuid4().hex}", to, from_, url)
+            self.placed.append(call)
+        self._after(self.ring_time, self._ring_done, call, answered)
+        return call
+
+    def _after(self, delay, function, *args):
+        timer = threading.Timer(delay, function, args)
+        timer.daemon = True
+        timer.start()
+
+    def _ring_done(self, call, answered):
+        if not answered:
+            call.status = "no-answer"
+            return
+        with self._lock:
+            call.status = "in-progress"
+            self.in_progress += 1
+            self.max_in_progress = max(self.max_in_progress, self.in_progress)
+        if self.on_connect:
+            self.on_connect(call.sid)
+        self._after(self.talk_time, self._hang_up, call)
+
+    def _hang_up(self, call):
+        with self._lock:
+            call.status = "completed"
+            self.in_progress -= 1
+        if self.on_end:
+            self.on_end(call.sid)
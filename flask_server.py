@@ -9,8 +9,10 @@ import os
 import uuid
 import logging
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string
 from twilio.rest import Client
+from dial_queue import DialQueue, twilio_call_placer
+from static_response import StaticResponse
 from twilio.twiml.voice_response import VoiceResponse, Connect, Stream
 from dotenv import load_dotenv
 
@@ -39,14 +41,22 @@ except Exception as e:
     logger.error(f"❌ Twilio initialization failed: {e}")
     twilio_client = None
 
+# Outbound calls are placed by dial workers, paced to the account's Twilio CPS limit
+dial_queue = DialQueue(
+    twilio_call_placer(twilio_client, TWILIO_PHONE_NUMBER, f"{PUBLIC_URL}/twiml-placeholder"),
+    account=TWILIO_ACCOUNT_SID,
+)
+
+# Longest long-poll allowed on /calls/<call_id>?wait=N
+MAX_CALL_STATUS_WAIT = 25
+
 # Storage (in-memory for demonstration)
 patients = []
 appointments = {}
 active_calls = {}
 
-# --- Flask Routes ---
-@app.route('/')
-def home():
+# --- Pages ---
+def render_home_page():
     """Main page"""
     return render_template_string('''
     <!DOCTYPE html>
@@ -122,14 +132,7 @@ def home():
     </html>
     ''', public_url=PUBLIC_URL)
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Healthcheck endpoint for Railway"""
-    logger.info("Healthcheck requested.")
-    return jsonify({"status": "healthy", "message": "HTTP server is running"}), 200
-
-@app.route('/test')
-def test_page():
+def render_test_page():
     """Test page for patient registration"""
     return render_template_string('''
     <!DOCTYPE html>
@@ -197,7 +200,7 @@ def test_page():
                             <div class="result success">
                                 <h3>✅ Registration Successful!</h3>
                                 <p><strong>Patient ID:</strong> ${result.patient_id}</p>
-                                <p><strong>Call Status:</strong> ${result.call_initiated ? 'Initiated' : 'Failed'}</p>
+                                <p><strong>Call Status:</strong> ${result.call_status} (call ID ${result.call_id})</p>
                                 <p><strong>Voice Agent:</strong> Cardiology AI with Deepgram Agent API</p>
                                 <p>You will receive a call with comprehensive cardiology evaluation and appointment booking!</p>
                             </div>
@@ -224,6 +227,33 @@ def test_page():
     </html>
     ''', public_url=PUBLIC_URL)
 
+def static_response(page):
+    """Flask response for a StaticResponse, honouring If-None-Match and Accept-Encoding"""
+    status, headers, body = page.select(request.headers)
+    return Response(body, status=status, headers=headers)
+
+# The pages only depend on PUBLIC_URL: render them once, serve them from memory
+with app.app_context():
+    HOME_PAGE = StaticResponse(render_home_page(), 'text/html')
+    TEST_PAGE = StaticResponse(render_test_page(), 'text/html')
+
+# --- Flask Routes ---
+@app.route('/')
+def home():
+    """Main page"""
+    return static_response(HOME_PAGE)
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Healthcheck endpoint for Railway"""
+    logger.info("Healthcheck requested.")
+    return jsonify({"status": "healthy", "message": "HTTP server is running"}), 200
+
+@app.route('/test')
+def test_page():
+    """Test page for patient registration"""
+    return static_response(TEST_PAGE)
+
 @app.route('/register-patient', methods=['POST'])
 def register_patient():
     """Register a new patient and initiate call"""
@@ -246,14 +276,21 @@ def register_patient():
         
         patients.append(patient)
         
-        # Make Twilio call
-        call_success = make_twilio_call(patient)
+        # Queue the Twilio call; dial workers place it without holding up the response
+        call_id = dial_queue.submit(phone, patient_id=patient['id'], patient_name=patient['name'])
+        patient['call_id'] = call_id
+        # Queued, or already failed when Twilio isn't configured
+        call = dial_queue.get(call_id)
         
         response = {
             'success': True,
             'patient_id': patient['id'],
             'message': 'Patient registered successfully',
-            'call_initiated': call_success,
+            'call_initiated': call['status'] != 'failed',
+            'call_id': call_id,
+            'call_status': call['status'],
+            'call_error': call['error'],
+            'call_status_url': f"{PUBLIC_URL}/calls/{call_id}",
             'voice_agent': 'Cardiology AI with Deepgram Agent API',
             'public_url': PUBLIC_URL
         }
@@ -273,45 +310,14 @@ def get_appointments():
         'active_calls': len(active_calls)
     })
 
-def make_twilio_call(patient):
-    """Make Twilio call"""
-    try:
-        # Twilio will use the TwiML Bin configured in the console
-        # The TwiML Bin will point to the WebSocket server
-        
-        logger.info(f"📞 Making call to {patient['phone_number']} for {patient['name']}")
-        logger.info(f"🔑 Using Twilio Account: {TWILIO_ACCOUNT_SID}")
-        
-        # Check if phone number is verified for trial accounts
-        if patient['phone_number'].startswith('+91'):
-            logger.warning("⚠️ Indian number detected. Trial accounts may need verification.")
-        
-        # Use Twilio client to make the call
-        # The URL here is for the TwiML Bin, not directly to our app
-        # We are just initiating the call, Twilio will fetch TwiML from the Bin
-        call = twilio_client.calls.create(
-            url=f"{PUBLIC_URL}/twiml-placeholder", # This URL is a placeholder, Twilio will use the TwiML Bin URL
-            to=patient['phone_number'],
-            from_=TWILIO_PHONE_NUMBER
-        )
-        
-        logger.info(f"✅ Call initiated successfully!")
-        logger.info(f"📋 Call SID: {call.sid}")
-        
-        return True
-            
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"❌ Error making call: {error_msg}")
-        
-        if "401" in error_msg or "Authenticate" in error_msg:
-            logger.error("🔑 Authentication failed. Check Twilio credentials.")
-        elif "unverified" in error_msg.lower():
-            logger.error("📱 Phone number needs verification for trial accounts.")
-        elif "not a valid phone number" in error_msg.lower():
-            logger.error(" Invalid phone number format.")
-        
-        return False
+@app.route('/calls/<call_id>')
+def get_call_status(call_id):
+    """Dial status of a queued call; ?wait=N long-polls up to N seconds for a change"""
+    wait = min(request.args.get('wait', 0, type=float), MAX_CALL_STATUS_WAIT)
+    job = dial_queue.wait(call_id, wait) if wait > 0 else dial_queue.get(call_id)
+    if job is None:
+        return jsonify({'error': f'Unknown call {call_id}'}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
     logger.info("MedAgg Healthcare Voice Agent - Flask HTTP Server Starting...")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Function Call Executor
+Runs Deepgram Agent function calls off the event loop with timeouts and
+per-function latency metrics
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from call_metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Agent functions are usually sub-millisecond lookups, so start the buckets low
+FUNCTION_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def create_function_call_response(func_id, func_name, result):
+    """Create function call response"""
+    return {
+        "type": "FunctionCallResponse",
+        "id": func_id,
+        "name": func_name,
+        "content": json.dumps(result)
+    }
+
+
+class FunctionExecutor:
+    """Executes agent functions without blocking the audio relay.
+
+    Coroutine functions are awaited directly; plain functions run in a
+    bounded thread pool so a slow call (e.g. a database write) only delays
+    its own response. Every call is limited by a per-function timeout; a
+    timed-out thread keeps its worker until it returns, which is why the
+    pool is bounded.
+    """
+
+    def __init__(self, function_map, max_workers=8, default_timeout=10.0, timeouts=None):
+        self.function_map = function_map
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-function")
+        self.latency = {}
+        self.timeout_count = {}
+        self.error_count = {}
+
+    async def call(self, func_name, arguments):
+        """Run one function and return its result, or an error dict on failure"""
+        func = self.function_map.get(func_name)
+        if func is None:
+            result = {"error": f"Unknown function: {func_name}"}
+            logger.error(result)
+            return result
+
+        timeout = self.timeouts.get(func_name, self.default_timeout)
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(func):
+                pending = func(**arguments)
+            else:
+                loop = asyncio.get_running_loop()
+                pending = loop.run_in_executor(self._executor, functools.partial(func, **arguments))
+            result = await asyncio.wait_for(pending, timeout)
+            logger.info(f"Function call result for {func_name}: {result}")
+        except asyncio.TimeoutError:
+            self.timeout_count[func_name] = self.timeout_count.get(func_name, 0) + 1
+            logger.error(f"Function {func_name} timed out after {timeout}s")
+            result = {"error": f"Function '{func_name}' timed out after {timeout} seconds"}
+        except Exception as e:
+            self.error_count[func_name] = self.error_count.get(func_name, 0) + 1
+            logger.error(f"Error executing function {func_name} with args {arguments}: {e}")
+            result = {"error": f"Function '{func_name}' failed with: {str(e)}"}
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            histogram = self.latency.get(func_name)
+            if histogram is None:
+                histogram = self.latency[func_name] = LatencyHistogram(FUNCTION_LATENCY_BUCKETS_MS)
+            histogram.observe(elapsed_ms)
+        return result
+
+    async def handle_request(self, decoded, sts_ws):
+        """Run every function in a FunctionCallRequest concurrently and send each response"""
+        functions = decoded.get("functions", [])
+        await asyncio.gather(*(self._respond(function_call, sts_ws) for function_call in functions))
+
+    async def _respond(self, function_call, sts_ws):
+        func_id = function_call.get("id", "unknown")
+        func_name = function_call.get("name", "unknown")
+        try:
+            arguments = json.loads(function_call.get("arguments") or "{}")
+            logger.info(f"Function call: {func_name} (ID: {func_id}), arguments: {arguments}")
+            result = await self.call(func_name, arguments)
+        except Exception as e:
+            logger.error(f"Error handling function call {func_name}: {e}")
+            result = {"error": f"Function call failed with: {str(e)}"}
+
+        function_result = create_function_call_response(func_id, func_name, result)
+        await sts_ws.send(json.dumps(function_result))
+        logger.info(f"Sent function result: {function_result}")
+
+    def stats(self):
+        """Per-function latency, timeout and error counters"""
+        return {
+            name: {
+                "latency": histogram.snapshot(),
+                "timeouts": self.timeout_count.get(name, 0),
+                "errors": self.error_count.get(name, 0),
+            }
+            for name, histogram in self.latency.items()
+        }
+
+    def shutdown(self):
+        """Stop accepting work and release the worker threads"""
+        self._executor.shutdown(wait=False)
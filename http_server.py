@@ -12,8 +12,10 @@ from datetime import datetime
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
 from dotenv import load_dotenv
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 import urllib.parse
+from threaded_http import BoundedThreadingHTTPServer
+from static_response import StaticResponse, send_static
 
 load_dotenv()
 
@@ -43,15 +45,9 @@ class WebHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
             if self.path == '/':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(self.get_home_page().encode())
+                send_static(self, HOME_PAGE)
             elif self.path == '/test':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(self.get_test_page().encode())
+                send_static(self, TEST_PAGE)
             elif self.path == '/appointments':
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
@@ -73,11 +69,7 @@ class WebHandler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
             if self.path == '/twiml':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/xml')
-                self.end_headers()
-                twiml = self.get_twiml()
-                self.wfile.write(twiml.encode())
+                send_static(self, TWIML)
             elif self.path == '/register-patient':
                 content_length = int(self.headers['Content-Length'])
                 post_data = self.rfile.read(content_length)
@@ -123,7 +115,8 @@ class WebHandler(BaseHTTPRequestHandler):
             self.send_response(500)
             self.end_headers()
     
-    def get_home_page(self):
+    @staticmethod
+    def get_home_page():
         return f'''
         <!DOCTYPE html>
         <html>
@@ -188,7 +181,8 @@ class WebHandler(BaseHTTPRequestHandler):
         </html>
         '''
     
-    def get_test_page(self):
+    @staticmethod
+    def get_test_page():
         return f'''
         <!DOCTYPE html>
         <html>
@@ -282,7 +276,8 @@ class WebHandler(BaseHTTPRequestHandler):
         </html>
         '''
     
-    def get_twiml(self):
+    @staticmethod
+    def get_twiml():
         try:
             logger.info("Creating TwiML for Deepgram Agent Voice Agent")
             
@@ -305,6 +300,11 @@ class WebHandler(BaseHTTPRequestHandler):
             response.hangup()
             return str(response)
 
+# Pages and TwiML only depend on PUBLIC_URL: render them once, serve them from memory
+HOME_PAGE = StaticResponse(WebHandler.get_home_page(), 'text/html')
+TEST_PAGE = StaticResponse(WebHandler.get_test_page(), 'text/html')
+TWIML = StaticResponse(WebHandler.get_twiml(), 'text/xml')
+
 def make_twilio_call(patient):
     """Make Twilio call"""
     try:
@@ -357,8 +357,8 @@ def main():
     logger.info("=" * 50)
     
     try:
-        server = HTTPServer(('0.0.0.0', 5001), WebHandler)
-        logger.info("HTTP server started on port 5001")
+        server = BoundedThreadingHTTPServer(('0.0.0.0', 5001), WebHandler)
+        logger.info(f"HTTP server started on port 5001 with {server.workers} workers")
         server.serve_forever()
     except Exception as e:
         logger.error(f"Error starting HTTP server: {e}")
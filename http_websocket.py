@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - HTTP and WebSocket on One Port
+Serves plain HTTP routes and WebSocket upgrades from a single asyncio server
+"""
+
+import asyncio
+import functools
+import http
+import logging
+import signal
+
+import websockets
+from websockets.exceptions import InvalidMessage
+from websockets.legacy.http import read_headers, read_line
+from websockets.legacy.server import WebSocketServerProtocol
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted on an HTTP route
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class HTTPWebSocketProtocol(WebSocketServerProtocol):
+    """WebSocket server protocol that also answers ordinary HTTP requests.
+
+    websockets only parses HTTP/1.1 GET requests without a body; this
+    reads any method and its Content-Length body, over HTTP/1.1 or 1.0 (as
+    sent by many health checks). HTTP/1.1 GET requests on a WebSocket path
+    go through the normal handshake, everything else is answered by
+    http_handler(method, path, headers, body), a coroutine returning
+    (HTTPStatus, headers, body). HEAD is handled as GET and answered with
+    the headers only. The connection is closed after each HTTP response.
+    """
+
+    def __init__(self, *args, http_handler, is_websocket_path, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_handler = http_handler
+        self.is_websocket_path = is_websocket_path
+        self.method = None
+        self.http_version = None
+        self.request_body = b""
+
+    async def read_http_request(self):
+        try:
+            request_line = await read_line(self.reader)
+            method, raw_path, version = request_line.split(b" ", 2)
+            if version not in (b"HTTP/1.1", b"HTTP/1.0"):
+                raise ValueError(f"unsupported HTTP version: {version!r}")
+            headers = await read_headers(self.reader)
+            length = int(headers.get("Content-Length", "0") or "0")
+            if length < 0 or length > MAX_BODY_SIZE:
+                raise ValueError(f"request body of {length} bytes is not accepted")
+            body = await self.reader.readexactly(length) if length else b""
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            raise InvalidMessage("did not receive a valid HTTP request") from exc
+
+        self.method = method.decode("ascii", "surrogateescape")
+        self.http_version = version.decode("ascii")
+        self.request_body = body
+        self.path = raw_path.decode("ascii", "surrogateescape")
+        self.request_headers = headers
+        return self.path, headers
+
+    async def process_request(self, path, request_headers):
+        if self.method == "GET" and self.is_websocket_path(path):
+            if self.http_version != "HTTP/1.1":
+                return http.HTTPStatus.BAD_REQUEST, [("Content-Type", "text/plain")], b"WebSocket upgrades need HTTP/1.1\n"
+            return None
+        method = "GET" if self.method == "HEAD" else self.method
+        try:
+            return await self.http_handler(method, path, request_headers, self.request_body)
+        except Exception as e:
+            logger.error(f"Error handling {self.method} {path}: {e}")
+            return http.HTTPStatus.INTERNAL_SERVER_ERROR, [("Content-Type", "text/plain")], b"Internal Server Error\n"
+
+    def write_http_response(self, status, headers, body=None):
+        # Content-Length was already set from the body, so a HEAD response still reports it
+        if self.method == "HEAD":
+            body = None
+        super().write_http_response(status, headers, body)
+
+
+def serve_http_and_websocket(ws_handler, http_handler, host, port, is_websocket_path, **kwargs):
+    """websockets.serve() for a server that also handles HTTP routes on the same port"""
+    # websockets logs every HTTP response as a failed handshake; our handlers do their own logging
+    logging.getLogger("websockets.server").setLevel(logging.WARNING)
+    protocol = functools.partial(HTTPWebSocketProtocol, http_handler=http_handler, is_websocket_path=is_websocket_path)
+    return websockets.serve(ws_handler, host, port, create_protocol=protocol, **kwargs)
+
+
+def stop_on_signals(loop, signals=(signal.SIGINT, signal.SIGTERM)):
+    """Return a future that resolves when one of signals arrives"""
+    stop = loop.create_future()
+    for sig in signals:
+        try:
+            loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+    return stop
@@ -15,6 +15,9 @@ import logging
 from datetime import datetime
 from dotenv import load_dotenv
 from cardiology_functions import FUNCTION_MAP
+from agent_config import AgentConfigRegistry
+from patient_registry import PatientRegistry, DEFAULT_PAGE_SIZE
+import urllib.parse
 
 load_dotenv()
 
@@ -29,8 +32,8 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "bbf7abc794d8f0eb9538350b501d
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "+17752586467")
 PUBLIC_URL = os.getenv("PUBLIC_URL", "https://voice-95g5.onrender.com")
 
-# Storage
-patients = []
+# Storage; registrations are kept up to PATIENT_REGISTRY_SIZE / PATIENT_REGISTRY_TTL
+patients = PatientRegistry()
 appointments = {}
 active_calls = {}
 
@@ -46,10 +49,8 @@ def sts_connect():
     )
     return sts_ws
 
-def load_config():
-    """Load Deepgram Agent configuration for cardiology"""
-    with open("config.json", "r") as f:
-        return json.load(f)
+# Deepgram Agent settings, validated and serialized once and reloaded when the file changes
+agent_config = AgentConfigRegistry("config.json")
 
 async def twilio_handler(twilio_ws):
     """Main handler for Twilio WebSocket connection - Based on official documentation"""
@@ -58,8 +59,7 @@ async def twilio_handler(twilio_ws):
 
     async with sts_connect() as sts_ws:
         # Send configuration to Deepgram Agent
-        config_message = load_config()
-        await sts_ws.send(json.dumps(config_message))
+        await sts_ws.send(agent_config.message())
 
         # Start all async tasks
         await asyncio.wait(
@@ -160,7 +160,8 @@ async def router(websocket, path):
 # HTTP Handler
 async def http_handler(request):
     """Handle HTTP requests"""
-    path = request.path
+    url = urllib.parse.urlsplit(request.path)
+    path = url.path
     method = request.method
     
     logger.info(f"HTTP {method} request to {path}")
@@ -174,7 +175,7 @@ async def http_handler(request):
     elif path == "/register-patient" and method == "POST":
         return await register_patient(request)
     elif path == "/appointments":
-        return await get_appointments()
+        return await get_appointments(url.query)
     else:
         return await not_found()
 
@@ -406,7 +407,7 @@ async def register_patient(request):
             'created_at': datetime.now().isoformat()
         }
         
-        patients.append(patient)
+        patients.add(patient)
         
         # Make Twilio call
         call_success = await make_twilio_call(patient)
@@ -434,11 +435,24 @@ async def register_patient(request):
             'body': json.dumps({'success': False, 'error': str(e)})
         }
 
-async def get_appointments():
-    """Get all appointments"""
+async def get_appointments(query=""):
+    """One page of registered patients; ?after=<next_cursor>&limit=N walks the rest"""
+    params = urllib.parse.parse_qs(query)
+    try:
+        limit = int(params.get('limit', [DEFAULT_PAGE_SIZE])[0])
+        after = int(params['after'][0]) if 'after' in params else None
+    except ValueError:
+        return {
+            'status': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'after and limit must be integers'})
+        }
+    page, next_cursor = patients.page(after, limit)
     response = {
         'appointments': appointments,
-        'patients': patients,
+        'patients': page,
+        'next_cursor': next_cursor,
+        'total_patients': len(patients),
         'active_calls': len(active_calls)
     }
     
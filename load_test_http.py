@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Load test: /twiml latency while patient registrations are in flight
+Starts one of the HTTP servers locally, replaces the Twilio REST call with a
+fixed delay, and measures /twiml latency with and without concurrent
+/register-patient requests
+
+Usage:
+    python load_test_http.py [--server http_server|web_server|app] [--serial]
+                             [--twilio-latency S] [--registrations N]
+                             [--twiml-clients N] [--duration S]
+
+--serial runs the stdlib servers on plain HTTPServer for comparison. No
+real calls are placed: make_twilio_call, or the dial queue's placer, is
+swapped for a sleep.
+"""
+
+import argparse
+import asyncio
+import http.client
+import importlib
+import json
+import logging
+import socket
+import threading
+import time
+from http.server import HTTPServer
+
+from threaded_http import BoundedThreadingHTTPServer
+
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, port, serial, twilio_latency):
+    """Import the server module, fake its Twilio call and serve it on port in a background thread"""
+    module = importlib.import_module(name)
+
+    def make_twilio_call(patient):
+        time.sleep(twilio_latency)
+        return True
+
+    def place_call(job):
+        time.sleep(twilio_latency)
+        return f"CA{job['id']}"
+
+    if hasattr(module, "dial_queue"):
+        module.dial_queue.place_call = place_call
+    else:
+        module.make_twilio_call = make_twilio_call
+    # Keep per-request logging out of the results
+    logging.getLogger(name).setLevel(logging.WARNING)
+    if hasattr(module, "WebHandler"):
+        module.WebHandler.log_message = lambda self, format, *args: None
+
+    if name == "app":
+        module.PORT = port
+        thread = threading.Thread(target=asyncio.run, args=(module.serve(),), daemon=True)
+    else:
+        server_class = HTTPServer if serial else BoundedThreadingHTTPServer
+        server = server_class(("127.0.0.1", port), module.WebHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{name} did not start on port {port}")
+
+
+def request(port, method, path, body=None, timeout=30):
+    """Send one request on a fresh connection; returns (status, seconds), status None on a connection error"""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    except OSError:
+        return None, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of seconds, in ms"""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+def measure_twiml(port, clients, duration):
+    """Hit /twiml from several clients for duration seconds; returns (latencies in seconds, failures)"""
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < deadline:
+            status, elapsed = request(port, "POST", "/twiml", body=b"")
+            with lock:
+                (latencies if status == 200 else failures).append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures)
+
+
+def register_loop(port, stop_event, completed):
+    """Keep one registration in flight until stop_event is set"""
+    body = json.dumps({"name": "Load Test", "phone_number": "9876543210", "urgency": "low"}).encode()
+    while not stop_event.is_set():
+        status, _ = request(port, "POST", "/register-patient", body=body)
+        if status == 200:
+            completed.append(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /twiml latency under concurrent registrations")
+    parser.add_argument("--server", default="http_server", choices=("http_server", "web_server", "app"))
+    parser.add_argument("--serial", action="store_true", help="use plain HTTPServer (stdlib servers only)")
+    parser.add_argument("--twilio-latency", type=float, default=1.0, help="seconds each fake Twilio call takes")
+    parser.add_argument("--registrations", type=int, default=8, help="registrations kept in flight")
+    parser.add_argument("--twiml-clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    start_server(args.server, port, args.serial, args.twilio_latency)
+    mode = "plain HTTPServer" if args.serial and args.server != "app" else "concurrent"
+    print(f"/twiml load test: {args.server} ({mode}), {args.twiml_clients} /twiml clients, {args.duration:.0f} s per phase")
+
+    idle, idle_failures = measure_twiml(port, args.twiml_clients, args.duration)
+
+    stop_event = threading.Event()
+    completed = []
+    registrars = [threading.Thread(target=register_loop, args=(port, stop_event, completed), daemon=True)
+                  for _ in range(args.registrations)]
+    for thread in registrars:
+        thread.start()
+    time.sleep(min(0.5, args.twilio_latency))
+    loaded, loaded_failures = measure_twiml(port, args.twiml_clients, args.duration)
+    stop_event.set()
+
+    print(f"  {'phase':<34} {'ok':>6} {'failed':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for label, latencies, failures in (("idle", idle, idle_failures),
+                                       (f"{args.registrations} registrations in flight", loaded, loaded_failures)):
+        print(f"  {label:<34} {len(latencies):>6} {failures:>6} "
+              f"{percentile(latencies, 0.5):>9.1f} {percentile(latencies, 0.99):>9.1f}")
+    print(f"  registrations completed: {len(completed)} (fake Twilio latency {args.twilio_latency:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,18 @@ Advanced cardiology AI with nova-3-medical and aura-2-vesta-en models
 """
 
 import asyncio
-import base64
 import json
 import os
 import logging
 import websockets
 from dotenv import load_dotenv
 from cardiology_functions import FUNCTION_MAP
+from audio_buffer import AudioFrameQueue, AudioRingBuffer, framing_factory, ring_capacity_for
+from call_metrics import LatencyHistogram, TurnLatencyTracker
+from agent_config import AgentConfigRegistry
+from deepgram_pool import AgentSessionPool
+from function_executor import FunctionExecutor
+from twilio_media import MediaEnvelope, OutboundAudioCoalescer, parse_twilio_message
 
 load_dotenv()
 
@@ -22,6 +27,34 @@ logger = logging.getLogger(__name__)
 # Configuration
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 PUBLIC_URL = os.getenv("PUBLIC_URL", "https://web-production-39bb.up.railway.app")
+# Inbound framing: "adaptive" or a fixed frame duration of 20, 40 or 100 ms
+MEDIA_FRAMING = os.getenv("MEDIA_FRAMING", "adaptive")
+# A bad MEDIA_FRAMING fails here at startup instead of on every call
+new_framing = framing_factory(MEDIA_FRAMING)
+# Bounded inbound audio queue: drop_oldest, coalesce or backpressure when Deepgram stalls
+AUDIO_QUEUE_SIZE = int(os.getenv("AUDIO_QUEUE_SIZE", "50"))
+AUDIO_QUEUE_POLICY = os.getenv("AUDIO_QUEUE_POLICY", "drop_oldest")
+# Coalesce agent TTS chunks into Twilio frames of at least this many bytes (0 = send as received)
+TTS_COALESCE_BYTES = int(os.getenv("TTS_COALESCE_BYTES", "0"))
+# Pre-connected Deepgram Agent sessions kept warm for incoming calls (0 disables the pool)
+DEEPGRAM_POOL_SIZE = int(os.getenv("DEEPGRAM_POOL_SIZE", "2"))
+DEEPGRAM_POOL_IDLE_TIMEOUT = float(os.getenv("DEEPGRAM_POOL_IDLE_TIMEOUT", "10"))
+
+# Created on the server's event loop by start_websocket_server
+agent_pool = None
+
+# Deepgram Agent settings, validated and serialized once; config.<tenant>.json holds tenant variants
+AGENT_CONFIG = AgentConfigRegistry("config.json")
+
+# Agent functions run off the event loop; sync functions share a bounded thread pool
+FUNCTION_EXECUTOR = FunctionExecutor(
+    FUNCTION_MAP,
+    max_workers=int(os.getenv("FUNCTION_WORKERS", "8")),
+    default_timeout=float(os.getenv("FUNCTION_TIMEOUT", "10")),
+)
+
+# End-of-speech to first agent audio, aggregated over every call in this process
+SPEECH_TO_AGENT_LATENCY = LatencyHistogram()
 
 # --- Deepgram Agent API Connection and Handlers ---
 def sts_connect():
@@ -34,18 +67,6 @@ def sts_connect():
         subprotocols=["token", DEEPGRAM_API_KEY]
     )
 
-def load_config():
-    """Load Deepgram Agent configuration for cardiology"""
-    try:
-        with open("config.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("config.json not found. Ensure it's in the same directory.")
-        raise
-    except json.JSONDecodeError:
-        logger.error("Error decoding config.json. Check file format.")
-        raise
-
 async def handle_barge_in(decoded, twilio_ws, streamsid):
     """Handle user speaking interruption"""
     if decoded["type"] == "UserStartedSpeaking":
@@ -56,56 +77,12 @@ async def handle_barge_in(decoded, twilio_ws, streamsid):
         await twilio_ws.send(json.dumps(clear_message))
         logger.info(f"Sent clear message for stream {streamsid} (barge-in)")
 
-def execute_function_call(func_name, arguments):
-    """Execute function call"""
-    if func_name in FUNCTION_MAP:
-        try:
-            result = FUNCTION_MAP[func_name](**arguments)
-            logger.info(f"Function call result for {func_name}: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error executing function {func_name} with args {arguments}: {e}")
-            return {"error": f"Function '{func_name}' failed with: {str(e)}"}
-    else:
-        result = {"error": f"Unknown function: {func_name}"}
-        logger.error(result)
-        return result
-
-def create_function_call_response(func_id, func_name, result):
-    """Create function call response"""
-    return {
-        "type": "FunctionCallResponse",
-        "id": func_id,
-        "name": func_name,
-        "content": json.dumps(result)
-    }
-
 async def handle_function_call_request(decoded, sts_ws):
     """Handle function call requests from Deepgram Agent"""
-    try:
-        for function_call in decoded["functions"]:
-            func_name = function_call["name"]
-            func_id = function_call["id"]
-            arguments = json.loads(function_call["arguments"])
-
-            logger.info(f"Function call: {func_name} (ID: {func_id}), arguments: {arguments}")
-
-            result = execute_function_call(func_name, arguments)
-
-            function_result = create_function_call_response(func_id, func_name, result)
-            await sts_ws.send(json.dumps(function_result))
-            logger.info(f"Sent function result: {function_result}")
-
-    except Exception as e:
-        logger.error(f"Error handling function call request: {e}")
-        func_id = decoded.get("functions", [{}])[0].get("id", "unknown")
-        func_name = decoded.get("functions", [{}])[0].get("name", "unknown")
-        error_result = create_function_call_response(
-            func_id,
-            func_name,
-            {"error": f"Function call failed with: {str(e)}"}
-        )
-        await sts_ws.send(json.dumps(error_result))
+    await FUNCTION_EXECUTOR.handle_request(decoded, sts_ws)
+    # stats() snapshots every latency histogram; only pay for it when it will be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Function latency: %s", FUNCTION_EXECUTOR.stats())
 
 async def handle_text_message(decoded, twilio_ws, sts_ws, streamsid):
     """Handle text messages from Deepgram Agent"""
@@ -130,71 +107,83 @@ async def sts_sender(sts_ws, audio_queue):
     try:
         while True:
             chunk = await audio_queue.get()
+            # chunk may be a view into the call's ring buffer; websockets copies it
+            # into the transport before the first await, so it is not held while stalled
             await sts_ws.send(chunk)
     except websockets.exceptions.ConnectionClosedOK:
         logger.info("STS sender: WebSocket connection closed normally.")
     except Exception as e:
         logger.error(f"Error in sts_sender: {e}")
 
-async def sts_receiver(sts_ws, twilio_ws, streamsid_queue):
+async def sts_receiver(sts_ws, twilio_ws, streamsid_queue, latency):
     """Receive responses from Deepgram Agent"""
     logger.info("sts_receiver started")
     streamsid = await streamsid_queue.get()
+    envelope = MediaEnvelope(streamsid)
+    outbound = OutboundAudioCoalescer(TTS_COALESCE_BYTES)
 
     try:
         async for message in sts_ws:
             if isinstance(message, str):
                 logger.info(f"Deepgram Agent message: {message}")
                 decoded = json.loads(message)
+                if decoded.get("type") == "UserStartedSpeaking":
+                    outbound.clear()
+                else:
+                    # Any agent event (e.g. AgentAudioDone) ends a run of audio chunks
+                    pending = outbound.flush()
+                    if pending:
+                        await twilio_ws.send(envelope.encode(pending))
                 await handle_text_message(decoded, twilio_ws, sts_ws, streamsid)
                 continue
 
             # Audio response from Deepgram
-            raw_mulaw = message
+            latency_ms = latency.agent_audio()
+            if latency_ms is not None:
+                logger.info(f"End of speech to first agent audio: {latency_ms:.0f} ms")
 
-            media_message = {
-                "event": "media",
-                "streamSid": streamsid,
-                "media": {"payload": base64.b64encode(raw_mulaw).decode("ascii")},
-            }
-
-            await twilio_ws.send(json.dumps(media_message))
+            raw_mulaw = outbound.add(message)
+            if raw_mulaw is not None:
+                await twilio_ws.send(envelope.encode(raw_mulaw))
     except websockets.exceptions.ConnectionClosedOK:
         logger.info("STS receiver: WebSocket connection closed normally.")
     except Exception as e:
         logger.error(f"Error in sts_receiver: {e}")
 
-async def twilio_receiver(twilio_ws, audio_queue, streamsid_queue):
+async def twilio_receiver(twilio_ws, audio_queue, streamsid_queue, inbuffer, framing, latency):
     """Receive audio from Twilio"""
-    BUFFER_SIZE = 20 * 160  # 20 messages * 160 bytes/message = 0.4 seconds of audio
-    inbuffer = bytearray(b"")
-
     logger.info("twilio_receiver started")
     try:
         async for message in twilio_ws:
-            data = json.loads(message)
-            event = data.get("event")
-
-            if event == "start":
+            event, track, payload, data = parse_twilio_message(message)
+
+            if event == "media":
+                if track == "inbound":
+                    try:
+                        chunk = inbuffer.write_base64(payload)
+                    except BufferError:
+                        logger.warning("Twilio media chunk larger than the inbound buffer, dropping it")
+                    else:
+                        was_speaking = framing.speaking
+                        if framing.observe(chunk):
+                            latency.speech_ended(framing.last_speech_at)
+                        elif framing.speaking and not was_speaking:
+                            latency.speech_started()
+            elif event == "start":
                 logger.info(f"Twilio Call started: {data.get('streamSid')}")
                 streamsid = data["start"]["streamSid"]
                 streamsid_queue.put_nowait(streamsid)
             elif event == "connected":
                 logger.info("Twilio WebSocket connected.")
                 continue
-            elif event == "media":
-                media = data["media"]
-                chunk = base64.b64decode(media["payload"])
-                if media["track"] == "inbound":
-                    inbuffer.extend(chunk)
             elif event == "stop":
                 logger.info(f"Twilio Call stopped: {data.get('streamSid')}")
                 break
 
-            while len(inbuffer) >= BUFFER_SIZE:
-                chunk = inbuffer[:BUFFER_SIZE]
-                audio_queue.put_nowait(chunk)
-                inbuffer = inbuffer[BUFFER_SIZE:]
+            frame = inbuffer.pop_frame(framing.frame_size)
+            while frame is not None:
+                await audio_queue.push(frame)
+                frame = inbuffer.pop_frame(framing.frame_size)
     except websockets.exceptions.ConnectionClosedOK:
         logger.info("Twilio receiver: WebSocket connection closed normally.")
     except Exception as e:
@@ -203,28 +192,35 @@ async def twilio_receiver(twilio_ws, audio_queue, streamsid_queue):
 async def twilio_handler(websocket, path):
     """Main handler for Twilio WebSocket connection"""
     logger.info(f"Incoming WebSocket connection on path: {path}")
-    if path == "/twilio":
-        audio_queue = asyncio.Queue()
+    if path == "/twilio" or path.startswith("/twilio/"):
+        # Twilio stream URLs cannot carry query strings, so the tenant is a path segment
+        tenant = path[len("/twilio/"):] or None
+        audio_queue = AudioFrameQueue(AUDIO_QUEUE_SIZE, AUDIO_QUEUE_POLICY)
         streamsid_queue = asyncio.Queue()
+        inbuffer = AudioRingBuffer(ring_capacity_for(AUDIO_QUEUE_SIZE))
+        framing = new_framing()
+        latency = TurnLatencyTracker()
 
         try:
-            async with sts_connect() as sts_ws:
+            async with (agent_pool.session() if agent_pool else sts_connect()) as sts_ws:
                 logger.info("✅ Connected to Deepgram Agent API")
                 
-                config_message = load_config()
-                await sts_ws.send(json.dumps(config_message))
+                await sts_ws.send(AGENT_CONFIG.message(tenant))
                 logger.info("✅ Deepgram Agent config sent (nova-3-medical + aura-2-vesta-en)")
 
                 await asyncio.gather(
                     sts_sender(sts_ws, audio_queue),
-                    sts_receiver(sts_ws, websocket, streamsid_queue),
-                    twilio_receiver(websocket, audio_queue, streamsid_queue),
+                    sts_receiver(sts_ws, websocket, streamsid_queue, latency),
+                    twilio_receiver(websocket, audio_queue, streamsid_queue, inbuffer, framing, latency),
                 )
         except websockets.exceptions.ConnectionClosed as e:
             logger.info(f"Deepgram Agent connection closed: {e}")
         except Exception as e:
             logger.error(f"Error in twilio_handler: {e}")
         finally:
+            SPEECH_TO_AGENT_LATENCY.merge(latency.histogram)
+            logger.info(f"Speech-to-agent latency ({framing.name} framing): {latency.histogram.snapshot()}")
+            logger.info(f"Inbound audio queue: {audio_queue.stats()}")
             logger.info("Twilio handler finished.")
     else:
         logger.warning(f"Unhandled WebSocket path: {path}")
@@ -232,6 +228,12 @@ async def twilio_handler(websocket, path):
 
 async def start_websocket_server():
     """Starts the WebSocket server on port 5001"""
+    global agent_pool
+    if DEEPGRAM_API_KEY and DEEPGRAM_POOL_SIZE > 0:
+        agent_pool = AgentSessionPool(sts_connect, size=DEEPGRAM_POOL_SIZE, idle_timeout=DEEPGRAM_POOL_IDLE_TIMEOUT)
+        agent_pool.start()
+        logger.info(f"Deepgram Agent pool of {DEEPGRAM_POOL_SIZE} sessions, filled while calls arrive")
+
     logger.info("Starting WebSocket server on 0.0.0.0:5001")
     server = await websockets.serve(twilio_handler, "0.0.0.0", 5001)
     await server.wait_closed()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Patient Registry
+Size-bounded in-memory store of registered patients, indexed by ID and
+phone number, with TTL and least-recently-used eviction
+"""
+
+import bisect
+import collections
+import itertools
+import os
+import threading
+import time
+
+# Patients kept in memory; the least recently used are evicted beyond this
+PATIENT_REGISTRY_SIZE = int(os.getenv("PATIENT_REGISTRY_SIZE", "10000"))
+# Seconds a registration is kept (0 keeps it until evicted by size)
+PATIENT_REGISTRY_TTL = float(os.getenv("PATIENT_REGISTRY_TTL", "86400"))
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PatientRegistry:
+    """Registered patients by ID and phone number.
+
+    Each registration gets an increasing sequence number, which is also
+    the pagination cursor: page(after=cursor) lists registrations in order
+    without touching the ones before the cursor. Registrations expire ttl
+    seconds after they were added, and once more than max_size are held
+    the least recently added or looked up is dropped. The phone index
+    lists every registration held for a number, so when the newest one is
+    dropped lookups fall back to the next newest. Patient dicts are
+    stored by reference, so callers may update them in place.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or PATIENT_REGISTRY_SIZE
+        self.ttl = PATIENT_REGISTRY_TTL if ttl is None else ttl
+        self._records = {}  # seq -> (patient, expires_at)
+        self._by_id = collections.OrderedDict()  # patient ID -> seq, least recently used first
+        self._by_phone = {}  # phone number -> seqs of its registrations, oldest first
+        self._order = []  # seqs in registration order; evicted ones are skipped and compacted away
+        self._head = 0  # _order before this index has all expired
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.evicted = collections.Counter()
+
+    def add(self, patient):
+        """Register a patient dict with "id" and "phone_number"; returns it"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            previous = self._by_id.get(patient["id"])
+            if previous is not None:
+                self._drop(previous)
+            seq = next(self._sequence)
+            self._records[seq] = (patient, now + self.ttl if self.ttl else None)
+            self._by_id[patient["id"]] = seq
+            self._by_phone.setdefault(patient["phone_number"], []).append(seq)
+            self._order.append(seq)
+            while len(self._by_id) > self.max_size:
+                _, oldest = self._by_id.popitem(last=False)
+                self._drop(oldest, reason="size")
+            return patient
+
+    def get(self, patient_id):
+        """Patient with this ID, or None"""
+        with self._lock:
+            return self._lookup(self._by_id.get(patient_id))
+
+    def find_by_phone(self, phone_number):
+        """Newest patient registered with this phone number, or None"""
+        with self._lock:
+            seqs = self._by_phone.get(phone_number)
+            while seqs:
+                # An expired registration is dropped by _lookup, which also removes it from seqs
+                patient = self._lookup(seqs[-1])
+                if patient is not None:
+                    return patient
+                seqs = self._by_phone.get(phone_number)
+            return None
+
+    def remove(self, patient_id):
+        """Forget a patient; returns True if it was registered"""
+        with self._lock:
+            seq = self._by_id.get(patient_id)
+            if seq is None:
+                return False
+            self._drop(seq)
+            return True
+
+    def page(self, after=None, limit=DEFAULT_PAGE_SIZE):
+        """(patients, next_cursor) for up to limit registrations after the cursor, oldest first"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            self._expire(time.monotonic())
+            start = self._head if after is None else max(self._head, bisect.bisect_right(self._order, after))
+            patients = []
+            last = None
+            for index in range(start, len(self._order)):
+                seq = self._order[index]
+                record = self._records.get(seq)
+                if record is None:
+                    continue
+                if len(patients) == limit:
+                    return patients, last
+                patients.append(record[0])
+                last = seq
+            return patients, None
+
+    def __len__(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._records)
+
+    def __iter__(self):
+        """Snapshot of all patients, oldest registration first"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return iter([self._records[seq][0] for seq in self._order[self._head:] if seq in self._records])
+
+    def stats(self):
+        with self._lock:
+            return {"patients": len(self._records), "max_size": self.max_size, "ttl": self.ttl,
+                    "evicted": dict(self.evicted)}
+
+    def _lookup(self, seq):
+        if seq is None:
+            return None
+        patient, expires_at = self._records[seq]
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._drop(seq, reason="ttl")
+            return None
+        self._by_id.move_to_end(patient["id"])
+        return patient
+
+    def _drop(self, seq, reason=None):
+        patient, _ = self._records.pop(seq)
+        if self._by_id.get(patient["id"]) == seq:
+            del self._by_id[patient["id"]]
+        seqs = self._by_phone.get(patient["phone_number"])
+        if seqs is not None and seq in seqs:
+            seqs.remove(seq)
+            if not seqs:
+                del self._by_phone[patient["phone_number"]]
+        if reason:
+            self.evicted[reason] += 1
+
+    def _expire(self, now):
+        # Registrations expire in the order they were added, so only the front of _order is checked
+        while self._head < len(self._order):
+            seq = self._order[self._head]
+            record = self._records.get(seq)
+            if record is not None:
+                if record[1] is None or record[1] > now:
+                    break
+                self._drop(seq, reason="ttl")
+            self._head += 1
+        # Keep _order from filling up with expired entries and holes left by out-of-order removals
+        if len(self._order) - self._head > 2 * len(self._records) + 64 or self._head > len(self._order) // 2 + 64:
+            self._order = [seq for seq in self._order[self._head:] if seq in self._records]
+            self._head = 0
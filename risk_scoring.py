@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Risk Scoring
+Compiles the declarative triage rules in cardiology_rules.json into scorers
+shared by live agent calls and batch re-triage of stored assessments
+"""
+
+import json
+import logging
+import operator
+import os
+import re
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; batches are scored in pure Python without it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Triage rules; edits are picked up without a restart
+RULES_PATH = os.getenv("CARDIOLOGY_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cardiology_rules.json"))
+RULES_RELOAD_INTERVAL = 2.0
+
+# Batches at least this long are scored with numpy when it is installed
+NUMPY_MIN_ROWS = 2048
+
+# Assessment types re-triaged by rescore_assessments()
+ASSESSMENT_TYPES = ("chest_pain", "breathing")
+# Rule sets the call flow looks up; a rules file without all of them is rejected
+REQUIRED_RULE_SETS = ASSESSMENT_TYPES + ("emergency",)
+
+MATCH_TYPES = ("contains", "equals", "word")
+_TOKEN = re.compile(r"\w+")
+
+
+def _compile_rule(rule):
+    """Turn one rule into a predicate over (lowercased text, token set)"""
+    terms = [term.lower() for term in rule["terms"]]
+    match = rule["match"]
+    if match == "contains":
+        pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+        return lambda text, tokens: pattern.search(text) is not None
+    if match == "equals":
+        values = frozenset(terms)
+        return lambda text, tokens: text in values
+    words = frozenset(terms)
+    return lambda text, tokens: not words.isdisjoint(tokens)
+
+
+def _compile_field(rules):
+    """Build the evaluator for every rule on one field; lowercases and tokenizes the value once"""
+    checks = [(_compile_rule(rule), rule["points"]) for rule in rules]
+    needs_tokens = any(rule["match"] == "word" for rule in rules)
+
+    def evaluate(value):
+        text = (value or "").lower()
+        tokens = frozenset(_TOKEN.findall(text)) if needs_tokens else None
+        return sum(points for check, points in checks if check(text, tokens))
+
+    return evaluate
+
+
+def validate_rule_set(name, spec):
+    """Raise ValueError if spec is not a usable rule set"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"rule set '{name}' must be an object")
+    if not isinstance(spec.get("rules"), list) or not spec["rules"]:
+        raise ValueError(f"rule set '{name}' needs a non-empty 'rules' list")
+    for rule in spec["rules"]:
+        if not isinstance(rule, dict) or not isinstance(rule.get("field"), str):
+            raise ValueError(f"rule in '{name}' without a field: {rule!r}")
+        if rule.get("match") not in MATCH_TYPES:
+            raise ValueError(f"rule in '{name}' has match {rule.get('match')!r}, expected one of {MATCH_TYPES}")
+        if not isinstance(rule.get("terms"), list) or not all(isinstance(term, str) and term for term in rule["terms"]):
+            raise ValueError(f"rule in '{name}' needs a list of non-empty 'terms': {rule!r}")
+        if not isinstance(rule.get("points"), int):
+            raise ValueError(f"rule in '{name}' needs integer 'points': {rule!r}")
+    if not isinstance(spec.get("default_level"), str):
+        raise ValueError(f"rule set '{name}' needs a 'default_level'")
+    for level in spec.get("levels", []):
+        if not isinstance(level, dict) or not isinstance(level.get("level"), str) or not isinstance(level.get("min_score"), int):
+            raise ValueError(f"rule set '{name}' has an invalid level: {level!r}")
+    return spec
+
+
+class RiskScorer:
+    """Scores records against one compiled rule set.
+
+    Every rule looks at a single field, so a record's score is the sum of
+    independent per-field points; the level is the first of `levels` whose
+    min_score the score reaches. Batches exploit that: each column is
+    factorized into its distinct values, each distinct value is scored once
+    (and remembered across calls), and the per-row points are gathered and
+    summed, with numpy doing the sums and level thresholds when available.
+    """
+
+    def __init__(self, spec, cache_size=65536):
+        self.spec = spec
+        self.cache_size = cache_size
+        self.default_level = spec["default_level"]
+        self.levels = sorted(((level["min_score"], level["level"]) for level in spec.get("levels", [])), reverse=True)
+
+        by_field = {}
+        for rule in spec["rules"]:
+            by_field.setdefault(rule["field"], []).append(rule)
+        self.fields = tuple(by_field)
+        self._evaluators = {field: _compile_field(rules) for field, rules in by_field.items()}
+        self._points = {field: {} for field in self.fields}
+
+    def field_points(self, field, value):
+        """Points contributed by one field value"""
+        cache = self._points[field]
+        points = cache.get(value)
+        if points is None:
+            points = self._evaluators[field](value)
+            if len(cache) >= self.cache_size:
+                cache.clear()
+            cache[value] = points
+        return points
+
+    def risk_level(self, risk_factors):
+        """Map a score to its level"""
+        for min_score, level in self.levels:
+            if risk_factors >= min_score:
+                return level
+        return self.default_level
+
+    def score(self, **fields):
+        """Score one record given as keyword fields; returns (risk_factors, risk_level)"""
+        risk_factors = sum(self.field_points(field, fields.get(field, "")) for field in self.fields)
+        return risk_factors, self.risk_level(risk_factors)
+
+    def score_batch(self, columns):
+        """Score a batch given as {field: column}; returns {"risk_factors": ..., "risk_level": ...}.
+
+        Columns are equal-length lists (or numpy arrays) of strings; fields
+        the rules do not use are ignored and missing ones count as empty.
+        numpy input, or a long batch when numpy is installed, yields numpy
+        arrays; otherwise lists are returned.
+        """
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"batch columns have different lengths: {sorted(lengths)}")
+        rows = lengths.pop() if lengths else 0
+
+        if np is not None and (rows >= NUMPY_MIN_ROWS or any(isinstance(column, np.ndarray) for column in columns.values())):
+            return self._score_numpy(columns, rows)
+        return self._score_python(columns, rows)
+
+    def _score_python(self, columns, rows):
+        totals = [0] * rows
+        for field in self.fields:
+            column = columns.get(field)
+            if column is None:
+                continue
+            points = {value: self.field_points(field, value) for value in set(column)}
+            totals = list(map(operator.add, totals, map(points.__getitem__, column)))
+        levels = {total: self.risk_level(total) for total in set(totals)}
+        return {"risk_factors": totals, "risk_level": [levels[total] for total in totals]}
+
+    def _score_numpy(self, columns, rows):
+        totals = np.zeros(rows, dtype=np.int32)
+        for field in self.fields:
+            column = columns.get(field)
+            if column is None:
+                continue
+            # Factorizing through a dict beats np.unique, which sorts the strings
+            if isinstance(column, np.ndarray):
+                column = column.tolist()
+            points = {value: self.field_points(field, value) for value in set(column)}
+            totals += np.fromiter(map(points.__getitem__, column), dtype=np.int32, count=rows)
+
+        ascending = self.levels[::-1]
+        names = np.array([self.default_level] + [level for _, level in ascending])
+        level_index = np.zeros(rows, dtype=np.int8)
+        for min_score, _ in ascending:
+            level_index += totals >= min_score
+        return {"risk_factors": totals, "risk_level": names[level_index]}
+
+
+def load_rules(path=RULES_PATH):
+    """Read, validate and compile every rule set in path into {name: RiskScorer}"""
+    with open(path, "r") as f:
+        specs = json.load(f)
+    if not isinstance(specs, dict):
+        raise ValueError(f"{path} must map rule set names to rule sets")
+    missing = [name for name in REQUIRED_RULE_SETS if name not in specs]
+    if missing:
+        raise ValueError(f"{path} is missing rule sets: {', '.join(missing)}")
+    return {name: RiskScorer(validate_rule_set(name, spec)) for name, spec in specs.items()}
+
+
+_scorers = None
+_rules_mtime = None
+_rules_checked_at = 0.0
+_rules_lock = threading.Lock()
+
+
+def reload_rules(path=None):
+    """Recompile the rules if the file changed; an invalid edit or missing file keeps the previous rules"""
+    global _scorers, _rules_mtime, _rules_checked_at
+    path = path or RULES_PATH
+    with _rules_lock:
+        _rules_checked_at = time.monotonic()
+        try:
+            # The file can be missing or renamed mid-edit; calls in progress keep the rules they have
+            mtime = os.stat(path).st_mtime
+            if _scorers is not None and mtime == _rules_mtime:
+                return _scorers
+            scorers = load_rules(path)
+        except (OSError, ValueError) as e:
+            if _scorers is None:
+                logger.error(f"Error loading triage rules from {path}: {e}")
+                raise
+            logger.error(f"Error reloading triage rules from {path}, keeping the previous rules: {e}")
+            return _scorers
+        _scorers, _rules_mtime = scorers, mtime
+        logger.info(f"Loaded triage rules from {path}: {', '.join(scorers)}")
+        return scorers
+
+
+def get_scorer(name):
+    """Compiled scorer for a rule set ("chest_pain", "breathing", "emergency")"""
+    scorers = _scorers
+    if scorers is None or time.monotonic() - _rules_checked_at >= RULES_RELOAD_INTERVAL:
+        scorers = reload_rules()
+    return scorers[name]
+
+
+def score_chest_pain_batch(**columns):
+    """Score chest pain assessments given as columns (pain_type, radiation, triggers, duration)"""
+    return get_scorer("chest_pain").score_batch(columns)
+
+
+def score_breathing_batch(**columns):
+    """Score breathing assessments given as columns (severity, timing, associated_symptoms)"""
+    return get_scorer("breathing").score_batch(columns)
+
+
+def rescore_assessments(assessments):
+    """Re-triage stored assessment dicts in place with the current rules; returns how many changed level"""
+    changed = 0
+    for assessment_type in ASSESSMENT_TYPES:
+        records = [record for record in assessments if record.get("type") == assessment_type]
+        if not records:
+            continue
+        scorer = get_scorer(assessment_type)
+        columns = {field: [record.get(field) or "" for record in records] for field in scorer.fields}
+        scores = scorer.score_batch(columns)
+        for record, risk_factors, risk_level in zip(records, scores["risk_factors"], scores["risk_level"]):
+            risk_level = str(risk_level)
+            if record.get("risk_level") != risk_level:
+                changed += 1
+            record["risk_factors"] = int(risk_factors)
+            record["risk_level"] = risk_level
+    return changed
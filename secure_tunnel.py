@@ -10,9 +10,10 @@ import time
 import threading
 import hashlib
 import base64
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 import json
 import os
+from threaded_http import BoundedThreadingHTTPServer
 
 class SecureTunnelHandler(BaseHTTPRequestHandler):
     """HTTP handler with basic authentication"""
@@ -135,7 +136,7 @@ def start_secure_tunnel():
     print("=" * 60)
     
     # Start the authentication server
-    auth_server = HTTPServer(('localhost', 8080), SecureTunnelHandler)
+    auth_server = BoundedThreadingHTTPServer(('localhost', 8080), SecureTunnelHandler)
     print("✅ Authentication server started on http://localhost:8080")
     print("🔑 Default password: 'password'")
     print("📝 Change the password in secure_tunnel.py for production")
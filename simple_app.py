@@ -11,6 +11,7 @@ from datetime import datetime
 from flask import Flask, request, jsonify, render_template_string
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
+from emergency_keywords import GENERAL_EMERGENCY_MATCHER
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -69,9 +70,8 @@ def get_ai_response(user_input, language="english"):
     """Get AI response based on user input and language"""
     user_input_lower = user_input.lower()
     
-    # Emergency keywords
-    emergency_keywords = ['emergency', 'urgent', 'pain', 'bleeding', 'unconscious', 'chest pain', 'heart attack', 'stroke']
-    if any(keyword in user_input_lower for keyword in emergency_keywords):
+    # Emergency keywords (English, Tamil and Hindi)
+    if GENERAL_EMERGENCY_MATCHER.matches(user_input):
         return MEDICAL_RESPONSES[language]["emergency"]
     
     # Common medical concerns
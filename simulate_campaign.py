@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Simulation: outbound call campaign against a local Twilio fake
+Runs a synthetic cohort through the campaign engine and dial queue with
+fake_twilio standing in for the REST API and a simulated media bridge,
+then checks the concurrency, bridge and CPS caps held
+
+Usage:
+    python simulate_campaign.py [--patients N] [--max-concurrent N] [--bridges N]
+                                [--campaign-cps R] [--account-cps R]
+                                [--ring-time S] [--talk-time S] [--answer-rate F]
+                                [--failure-rate F] [--answer-timeout S] [--seed N]
+
+No real calls are placed.
+"""
+
+import argparse
+import logging
+import threading
+import time
+
+from campaign import FINISHED_OUTCOMES, CampaignEngine
+from dial_queue import DialQueue, twilio_call_placer
+from fake_twilio import FakeTwilioClient
+
+
+class MediaBridge:
+    """Counts open media streams the way app.py's active_calls does and reports them to the engine"""
+
+    def __init__(self):
+        self.engine = None
+        self.active = set()
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def connected(self, call_sid):
+        with self._lock:
+            self.active.add(call_sid)
+            self.peak = max(self.peak, len(self.active))
+        self.engine.call_connected(call_sid)
+
+    def ended(self, call_sid):
+        with self._lock:
+            self.active.discard(call_sid)
+        self.engine.call_ended(call_sid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate an outbound call campaign against a Twilio fake")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--max-concurrent", type=int, default=20, help="campaign concurrent call cap")
+    parser.add_argument("--bridges", type=int, default=15, help="media bridges the server can hold")
+    parser.add_argument("--campaign-cps", type=float, default=8.0)
+    parser.add_argument("--account-cps", type=float, default=10.0, help="Twilio account CPS limit enforced by the fake")
+    parser.add_argument("--ring-time", type=float, default=0.5)
+    parser.add_argument("--talk-time", type=float, default=2.0)
+    parser.add_argument("--answer-rate", type=float, default=0.8)
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="share of REST requests answered with 500")
+    parser.add_argument("--answer-timeout", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger("dial_queue").setLevel(logging.CRITICAL)
+
+    bridge = MediaBridge()
+    twilio = FakeTwilioClient(cps=args.account_cps, latency=0.05, failure_rate=args.failure_rate,
+                              answer_rate=args.answer_rate, ring_time=args.ring_time, talk_time=args.talk_time,
+                              on_connect=bridge.connected, on_end=bridge.ended, seed=args.seed)
+    dial_queue = DialQueue(twilio_call_placer(twilio, "+15005550006", "http://localhost/twiml"),
+                           workers=8, cps=args.account_cps, backoff=0.2)
+    engine = CampaignEngine(dial_queue, capacity=lambda: args.bridges - len(bridge.active), tick=0.1,
+                            answer_timeout=args.answer_timeout)
+    bridge.engine = engine
+
+    cohort = [{"patient_id": i, "name": f"Patient {i}", "phone_number": f"+9198{i:08d}"} for i in range(args.patients)]
+    # A few malformed numbers, which Twilio rejects without a retry
+    for entry in cohort[::50]:
+        entry["phone_number"] = "+91-invalid"
+
+    print(f"Campaign simulation: {args.patients} patients, max {args.max_concurrent} concurrent, "
+          f"{args.bridges} media bridges, {args.campaign_cps:g} CPS (account {args.account_cps:g})")
+    start = time.monotonic()
+    campaign = engine.create("simulation", cohort, max_concurrent=args.max_concurrent, cps=args.campaign_cps)
+    peak_concurrent = 0
+    last_report = 0
+    while True:
+        snapshot = engine.get(campaign["id"])
+        counts = snapshot["counts"]
+        peak_concurrent = max(peak_concurrent, counts["dialing"] + counts["ringing"] + counts["connected"])
+        elapsed = time.monotonic() - start
+        if snapshot["status"] == "completed":
+            break
+        if elapsed - last_report >= 1.0:
+            last_report = elapsed
+            print(f"  {elapsed:5.1f} s  {snapshot['progress']:6.1%}  " +
+                  " ".join(f"{outcome}={n}" for outcome, n in counts.items() if n))
+        time.sleep(0.02)
+    engine.shutdown()
+    dial_queue.shutdown()
+
+    elapsed = time.monotonic() - start
+    placed = [call.sid for call in twilio.placed]
+    print(f"  finished in {elapsed:.1f} s: " + " ".join(f"{outcome}={counts[outcome]}" for outcome in FINISHED_OUTCOMES))
+    print(f"  calls placed: {len(placed)} ({len(placed) / elapsed:.2f}/s), REST rejections: {dict(twilio.rejected)}")
+    print(f"  peak concurrent campaign calls: {peak_concurrent} (cap {args.max_concurrent})")
+    print(f"  peak media bridges: {bridge.peak} (cap {args.bridges})")
+
+    assert sum(counts[outcome] for outcome in FINISHED_OUTCOMES) == args.patients, "calls left unfinished"
+    assert peak_concurrent <= args.max_concurrent, "concurrency cap exceeded"
+    assert bridge.peak <= args.bridges, "media bridge capacity exceeded"
+    assert len(placed) <= elapsed * min(args.campaign_cps, args.account_cps) + 1, "CPS cap exceeded"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Pre-rendered Responses
+Pages and TwiML rendered once into bytes with ETag, Content-Length and a
+gzip variant, served from memory by every server flavour
+"""
+
+import functools
+import gzip
+import hashlib
+import http
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 512
+
+
+@functools.lru_cache(maxsize=64)
+def accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header value allows gzip"""
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "x-gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_matches(if_none_match, etags):
+    """True if an If-None-Match header value names one of etags (weak comparison)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") in etags:
+            return True
+    return False
+
+
+class StaticResponse:
+    """A response body fixed at startup.
+
+    The identity and gzip bodies, their ETags and complete header lists are
+    built once; select() only picks one of the prebuilt
+    (HTTPStatus, headers, body) tuples for a request, answering 304 when
+    the client already has the current version.
+    """
+
+    __slots__ = ("content_type", "body", "etag", "identity", "gzipped", "not_modified", "gzip_not_modified", "_etags")
+
+    def __init__(self, content, content_type, cache_control="no-cache"):
+        body = content.encode() if isinstance(content, str) else bytes(content)
+        if content_type.startswith("text/") and "charset" not in content_type:
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.body = body
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        common = [("Cache-Control", cache_control), ("Vary", "Accept-Encoding")]
+
+        self.identity = (http.HTTPStatus.OK, [
+            ("Content-Type", content_type),
+            ("Content-Length", str(len(body))),
+            ("ETag", self.etag),
+            *common,
+        ], body)
+
+        compressed = gzip.compress(body, compresslevel=9, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        if compressed is not None and len(compressed) < len(body):
+            gzip_etag = f'"{digest}-gzip"'
+            self.gzipped = (http.HTTPStatus.OK, [
+                ("Content-Type", content_type),
+                ("Content-Encoding", "gzip"),
+                ("Content-Length", str(len(compressed))),
+                ("ETag", gzip_etag),
+                *common,
+            ], compressed)
+            self._etags = (self.etag, gzip_etag)
+            self.gzip_not_modified = (http.HTTPStatus.NOT_MODIFIED, [("ETag", gzip_etag), *common], b"")
+        else:
+            self.gzipped = self.gzip_not_modified = None
+            self._etags = (self.etag,)
+        self.not_modified = (http.HTTPStatus.NOT_MODIFIED, [("ETag", self.etag), *common], b"")
+
+    def select(self, request_headers):
+        """(HTTPStatus, headers, body) for a request with these headers (anything with .get())"""
+        use_gzip = self.gzipped is not None and accepts_gzip(request_headers.get("Accept-Encoding"))
+        if etag_matches(request_headers.get("If-None-Match"), self._etags):
+            return self.gzip_not_modified if use_gzip else self.not_modified
+        return self.gzipped if use_gzip else self.identity
+
+
+def send_static(handler, response):
+    """Write a StaticResponse from an http.server request handler"""
+    status, headers, body = response.select(handler.headers)
+    handler.send_response(status)
+    for name, value in headers:
+        handler.send_header(name, value)
+    handler.end_headers()
+    if body and handler.command != "HEAD":
+        handler.wfile.write(body)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Bounded Threaded HTTP Server
+Drop-in replacement for http.server.HTTPServer that serves requests
+concurrently on a fixed pool of worker threads
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per server; a request waiting on Twilio only holds its own worker
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "16"))
+# Seconds a connection may stall while sending its request or reading the response
+HTTP_REQUEST_TIMEOUT = float(os.getenv("HTTP_REQUEST_TIMEOUT", "30"))
+# Requests accepted beyond the busy workers before new ones get 503
+HTTP_MAX_PENDING = int(os.getenv("HTTP_MAX_PENDING", str(HTTP_WORKERS * 4)))
+
+_SERVICE_UNAVAILABLE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+
+class BoundedThreadingHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a bounded thread pool.
+
+    Unlike ThreadingHTTPServer, the number of threads is fixed at workers, so
+    a burst of slow requests cannot exhaust memory; once workers +
+    max_pending connections are in flight, new ones are answered with 503.
+    Every client socket gets request_timeout, so a stalled client frees its
+    worker instead of holding it forever.
+    """
+
+    def __init__(self, server_address, handler_class, workers=None, request_timeout=None, max_pending=None):
+        self.workers = workers or HTTP_WORKERS
+        self.request_timeout = request_timeout if request_timeout is not None else HTTP_REQUEST_TIMEOUT
+        pending = max_pending if max_pending is not None else HTTP_MAX_PENDING
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="http-worker")
+        self._slots = threading.BoundedSemaphore(self.workers + pending)
+        self.rejected = 0
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            logger.warning(f"HTTP server saturated, rejecting request from {client_address[0]}")
+            try:
+                request.sendall(_SERVICE_UNAVAILABLE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        request.settimeout(self.request_timeout)
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
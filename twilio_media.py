@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+MedAgg Healthcare Voice Agent - Twilio Media Stream Messages
+Fast-path parsing for the 20 ms inbound media events and pre-serialized
+outbound media messages
+"""
+
+import binascii
+import json
+
+# Twilio serializes media events with a fixed key order and no whitespace:
+# {"event":"media","sequenceNumber":"3","media":{"track":"inbound",...,"payload":"..."},"streamSid":"MZ..."}
+_MEDIA_PREFIX = '{"event":"media"'
+_TRACK_KEY = '"track":"'
+_PAYLOAD_KEY = '"payload":"'
+
+
+def parse_media_message(message):
+    """Return (track, payload) for a compact media event, or None if the message needs full JSON parsing"""
+    if not message.startswith(_MEDIA_PREFIX):
+        return None
+
+    track_start = message.find(_TRACK_KEY, len(_MEDIA_PREFIX))
+    if track_start < 0:
+        return None
+    track_start += len(_TRACK_KEY)
+    track_end = message.find('"', track_start)
+
+    payload_start = message.find(_PAYLOAD_KEY, len(_MEDIA_PREFIX))
+    if payload_start < 0 or track_end < 0:
+        return None
+    payload_start += len(_PAYLOAD_KEY)
+    payload_end = message.find('"', payload_start)
+    if payload_end < 0:
+        return None
+
+    # Base64 never needs escaping; an escape sequence means this is not Twilio's compact form
+    if message.find("\\", track_start, payload_end) >= 0:
+        return None
+
+    return message[track_start:track_end], message[payload_start:payload_end]
+
+
+def parse_twilio_message(message):
+    """Parse a Twilio Media Stream message into (event, track, payload, data).
+
+    Media events are handled by parse_media_message() and return data=None;
+    start, stop, mark and anything unusual fall back to json.loads, with track
+    and payload filled in for media events parsed that way.
+    """
+    media = parse_media_message(message)
+    if media is not None:
+        return "media", media[0], media[1], None
+
+    data = json.loads(message)
+    event = data.get("event")
+    if event == "media":
+        media = data["media"]
+        return event, media.get("track"), media["payload"], data
+    return event, None, None, data
+
+
+class MediaEnvelope:
+    """Pre-serialized outbound media message for one Twilio stream.
+
+    The JSON around the payload never changes during a call, so it is built
+    once and each audio chunk only costs a base64 encode and a string join.
+    """
+
+    def __init__(self, streamsid):
+        self.streamsid = streamsid
+        sid = json.dumps(streamsid)
+        self._prefix = '{"event":"media","streamSid":' + sid + ',"media":{"payload":"'
+        self._suffix = '"}}'
+
+    def encode(self, audio):
+        """Return the Twilio media message for a chunk of mu-law audio"""
+        return self._prefix + binascii.b2a_base64(audio, newline=False).decode("ascii") + self._suffix
+
+
+class OutboundAudioCoalescer:
+    """Accumulates small TTS chunks into larger Twilio frames.
+
+    With min_bytes=0 every chunk passes straight through. Otherwise chunks are
+    held until min_bytes have accumulated; callers flush() at the end of an
+    agent turn and clear() on barge-in so no stale audio is played.
+    """
+
+    def __init__(self, min_bytes=0):
+        self.min_bytes = min_bytes
+        self._pending = bytearray()
+
+    def add(self, chunk):
+        """Buffer a chunk and return the audio to send now, if any"""
+        if not self.min_bytes:
+            return chunk
+        self._pending += chunk
+        if len(self._pending) < self.min_bytes:
+            return None
+        return self.flush()
+
+    def flush(self):
+        """Return and forget any buffered audio"""
+        if not self._pending:
+            return None
+        audio = bytes(self._pending)
+        self._pending.clear()
+        return audio
+
+    def clear(self):
+        """Discard buffered audio without sending it"""
+        self._pending.clear()
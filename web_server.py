@@ -12,8 +12,10 @@ from datetime import datetime
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
 from dotenv import load_dotenv
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 import urllib.parse
+from threaded_http import BoundedThreadingHTTPServer
+from static_response import StaticResponse, send_static
 
 load_dotenv()
 
@@ -42,15 +44,9 @@ appointments = {}
 class WebHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(self.get_home_page().encode())
+            send_static(self, HOME_PAGE)
         elif self.path == '/test':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(self.get_test_page().encode())
+            send_static(self, TEST_PAGE)
         elif self.path == '/appointments':
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
@@ -67,11 +63,7 @@ class WebHandler(BaseHTTPRequestHandler):
     
     def do_POST(self):
         if self.path == '/twiml':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/xml')
-            self.end_headers()
-            twiml = self.get_twiml()
-            self.wfile.write(twiml.encode())
+            send_static(self, TWIML)
         elif self.path == '/register-patient':
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
@@ -113,7 +105,8 @@ class WebHandler(BaseHTTPRequestHandler):
             self.send_response(404)
             self.end_headers()
     
-    def get_home_page(self):
+    @staticmethod
+    def get_home_page():
         return f'''
         <!DOCTYPE html>
         <html>
@@ -178,7 +171,8 @@ class WebHandler(BaseHTTPRequestHandler):
         </html>
         '''
     
-    def get_test_page(self):
+    @staticmethod
+    def get_test_page():
         return f'''
         <!DOCTYPE html>
         <html>
@@ -272,7 +266,8 @@ class WebHandler(BaseHTTPRequestHandler):
         </html>
         '''
     
-    def get_twiml(self):
+    @staticmethod
+    def get_twiml():
         try:
             logger.info("Creating TwiML for Deepgram Agent Voice Agent")
             
@@ -295,6 +290,11 @@ class WebHandler(BaseHTTPRequestHandler):
             response.hangup()
             return str(response)
 
+# Pages and TwiML only depend on PUBLIC_URL: render them once, serve them from memory
+HOME_PAGE = StaticResponse(WebHandler.get_home_page(), 'text/html')
+TEST_PAGE = StaticResponse(WebHandler.get_test_page(), 'text/html')
+TWIML = StaticResponse(WebHandler.get_twiml(), 'text/xml')
+
 def make_twilio_call(patient):
     """Make Twilio call"""
     try:
@@ -342,8 +342,8 @@ def main():
     logger.info(f"Public URL: {PUBLIC_URL}")
     logger.info("=" * 50)
     
-    server = HTTPServer(('0.0.0.0', 5001), WebHandler)
-    logger.info("Web server started on port 5001")
+    server = BoundedThreadingHTTPServer(('0.0.0.0', 5001), WebHandler)
+    logger.info(f"Web server started on port 5001 with {server.workers} workers")
     server.serve_forever()
 
 if __name__ == '__main__':
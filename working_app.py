@@ -15,7 +15,10 @@ import logging
 from datetime import datetime
 from flask import Flask, request, jsonify, render_template_string
 from twilio.rest import Client
+from dial_queue import DialQueue, twilio_call_placer
 from twilio.twiml.voice_response import VoiceResponse
+from agent_config import AgentConfigRegistry
+from cardiology_conversation_flow import CARDIO_FLOW
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,6 +42,15 @@ except Exception as e:
     logger.error(f"❌ Twilio initialization failed: {e}")
     twilio_client = None
 
+# Outbound calls are placed by dial workers, paced to the account's Twilio CPS limit
+dial_queue = DialQueue(
+    twilio_call_placer(twilio_client, TWILIO_PHONE_NUMBER, f"{PUBLIC_URL}/twiml"),
+    account=TWILIO_ACCOUNT_SID,
+)
+
+# Longest long-poll allowed on /calls/<call_id>?wait=N
+MAX_CALL_STATUS_WAIT = 25
+
 # Storage
 patients = []
 conversations = {}
@@ -176,7 +188,10 @@ def load_healthcare_config():
                     "model": "gpt-4o-mini",
                     "temperature": 0.7
                 },
-                "prompt": "You are Dr. MedAgg, a professional cardiology AI specialist from MedAgg Healthcare. You are conducting a UFE (Unified Flow Evaluation) cardiology questionnaire. Follow this conversation flow: 1) Welcome and ask about chest pain/discomfort, 2) Ask about shortness of breath, 3) Get details about pain location and duration, 4) Assess breathing during activity and position, 5) Offer to schedule cardiology appointment, 6) Ask about urgency and preferred time, 7) Confirm appointment booking, 8) Offer to connect with live specialist. Always be empathetic, professional, and thorough. For emergencies (severe chest pain, heart attack symptoms), immediately use emergency_alert function. Ask only 2 questions at a time, wait for responses, then ask 2 more. Keep the conversation natural and human-like. Focus on cardiology and heart health.",
+                "prompt": CARDIO_FLOW.think_prompt(
+                    "You are Dr. MedAgg, a professional cardiology AI specialist from MedAgg Healthcare. You are conducting a UFE (Unified Flow Evaluation) cardiology questionnaire. Always be empathetic, professional, and thorough. Keep the conversation natural and human-like. Focus on cardiology and heart health.",
+                    emergency_function="emergency_alert"
+                ),
                 "functions": [
                     {
                         "name": "get_patient_info",
@@ -262,6 +277,9 @@ def load_healthcare_config():
         }
     }
 
+# Built, validated and serialized once instead of on every call
+healthcare_config = AgentConfigRegistry(path=None, default=load_healthcare_config())
+
 async def handle_barge_in(decoded, twilio_ws, streamsid):
     """Handle user interruption during AI speech"""
     if decoded["type"] == "UserStartedSpeaking":
@@ -390,8 +408,7 @@ async def twilio_handler(twilio_ws, path):
     streamsid_queue = asyncio.Queue()
 
     async with sts_connect() as sts_ws:
-        config_message = load_healthcare_config()
-        await sts_ws.send(json.dumps(config_message))
+        await sts_ws.send(healthcare_config.message())
 
         await asyncio.wait([
             asyncio.ensure_future(sts_sender(sts_ws, audio_queue)),
@@ -577,7 +594,7 @@ def test_page():
                             <div class="result success">
                                 <h3>✅ Registration Successful!</h3>
                                 <p><strong>Patient ID:</strong> ${result.patient_id}</p>
-                                <p><strong>Call Status:</strong> ${result.call_initiated ? 'Initiated' : 'Failed'}</p>
+                                <p><strong>Call Status:</strong> ${result.call_status} (call ID ${result.call_id})</p>
                                 <p><strong>Voice Agent:</strong> Cardiology AI with UFE Questionnaire</p>
                                 <p>You will receive a call with structured cardiology evaluation and appointment booking!</p>
                             </div>
@@ -626,14 +643,21 @@ def register_patient():
         
         patients.append(patient)
         
-        # Make Twilio call
-        call_success = make_twilio_call(patient)
+        # Queue the Twilio call; dial workers place it without holding up the response
+        call_id = dial_queue.submit(phone, patient_id=patient['id'], patient_name=patient['name'])
+        patient['call_id'] = call_id
+        # Queued, or already failed when Twilio isn't configured
+        call = dial_queue.get(call_id)
         
         response = {
             'success': True,
             'patient_id': patient['id'],
             'message': 'Patient registered successfully',
-            'call_initiated': call_success,
+            'call_initiated': call['status'] != 'failed',
+            'call_id': call_id,
+            'call_status': call['status'],
+            'call_error': call['error'],
+            'call_status_url': f"{PUBLIC_URL}/calls/{call_id}",
             'voice_agent': 'Cardiology AI with UFE Questionnaire (English)',
             'public_url': PUBLIC_URL
         }
@@ -653,44 +677,14 @@ def get_conversations():
         'active_calls': len(active_calls)
     })
 
-def make_twilio_call(patient):
-    """Make Twilio call"""
-    try:
-        # Create TwiML URL
-        twiml_url = f"{PUBLIC_URL}/twiml"
-        
-        logger.info(f"📞 Making call to {patient['phone_number']} for {patient['name']}")
-        logger.info(f"🔗 TwiML URL: {twiml_url}")
-        logger.info(f"🔑 Using Twilio Account: {TWILIO_ACCOUNT_SID}")
-        
-        # Check if phone number is verified for trial accounts
-        if patient['phone_number'].startswith('+91'):
-            logger.warning("⚠️ Indian number detected. Trial accounts may need verification.")
-        
-        # Use Twilio client to make the call
-        call = twilio_client.calls.create(
-            url=twiml_url,
-            to=patient['phone_number'],
-            from_=TWILIO_PHONE_NUMBER
-        )
-        
-        logger.info(f"✅ Call initiated successfully!")
-        logger.info(f"📋 Call SID: {call.sid}")
-        
-        return True
-            
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"❌ Error making call: {error_msg}")
-        
-        if "401" in error_msg or "Authenticate" in error_msg:
-            logger.error("🔑 Authentication failed. Check Twilio credentials.")
-        elif "unverified" in error_msg.lower():
-            logger.error("📱 Phone number needs verification for trial accounts.")
-        elif "not a valid phone number" in error_msg.lower():
-            logger.error("📞 Invalid phone number format.")
-        
-        return False
+@app.route('/calls/<call_id>')
+def get_call_status(call_id):
+    """Dial status of a queued call; ?wait=N long-polls up to N seconds for a change"""
+    wait = min(request.args.get('wait', 0, type=float), MAX_CALL_STATUS_WAIT)
+    job = dial_queue.wait(call_id, wait) if wait > 0 else dial_queue.get(call_id)
+    if job is None:
+        return jsonify({'error': f'Unknown call {call_id}'}), 404
+    return jsonify(job)
 
 # WebSocket server for Twilio streaming
 async def start_websocket_server():